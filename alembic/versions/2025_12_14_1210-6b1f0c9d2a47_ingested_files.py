@@ -0,0 +1,37 @@
+"""ingested files registry for incremental loading
+
+Revision ID: 6b1f0c9d2a47
+Revises: 40e2eedd2218
+Create Date: 2025-12-14 12:10:03.118452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1f0c9d2a47'
+down_revision: Union[str, Sequence[str], None] = '40e2eedd2218'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # name      — путь к файлу выгрузки (или имя файла в drop-директории);
+    # size/mtime — чтобы не перечитывать неизменившийся файл;
+    # watermark — максимальный updated_at среди загруженных строк.
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ingested_files (
+            name       TEXT PRIMARY KEY,
+            size       BIGINT NOT NULL,
+            mtime      DOUBLE PRECISION NOT NULL,
+            watermark  TIMESTAMPTZ,
+            loaded_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS ingested_files;")
@@ -0,0 +1,75 @@
+"""daily rollup of video_snapshots
+
+Revision ID: a3d5e8f21c90
+Revises: 6b1f0c9d2a47
+Create Date: 2025-12-16 15:30:41.772310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d5e8f21c90'
+down_revision: Union[str, Sequence[str], None] = '6b1f0c9d2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Одна строка на (день, видео): суммы приростов за день и число замеров с ростом просмотров.
+    # День считается в часовом поясе DB_TIMEZONE — том же, что выставляется сессиям бота.
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS video_daily_stats (
+            day                    DATE NOT NULL,
+            video_id               TEXT NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+            creator_id             TEXT NOT NULL,
+
+            delta_views_count      BIGINT NOT NULL,
+            delta_likes_count      BIGINT NOT NULL,
+            delta_comments_count   BIGINT NOT NULL,
+            delta_reports_count    BIGINT NOT NULL,
+
+            snapshots_count        INTEGER NOT NULL,
+            views_growth_snapshots INTEGER NOT NULL,
+
+            PRIMARY KEY (day, video_id)
+        );
+    """)
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_daily_stats_creator_day
+            ON video_daily_stats (creator_id, day);
+    """)
+
+    # копия построения роллапа на момент миграции (app/ingest/rollup.py может меняться дальше)
+    op.get_bind().execute(
+        sa.text("""
+            INSERT INTO video_daily_stats (
+                day, video_id, creator_id,
+                delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count,
+                snapshots_count, views_growth_snapshots
+            )
+            SELECT (s.created_at AT TIME ZONE :tz)::date AS day,
+                   s.video_id,
+                   v.creator_id,
+                   SUM(s.delta_views_count),
+                   SUM(s.delta_likes_count),
+                   SUM(s.delta_comments_count),
+                   SUM(s.delta_reports_count),
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE s.delta_views_count > 0)
+            FROM video_snapshots s
+            JOIN videos v ON v.id = s.video_id
+            GROUP BY 1, 2, 3
+        """),
+        {"tz": settings.database.db_timezone},
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS video_daily_stats;")
@@ -0,0 +1,43 @@
+"""indexes for range filters on timestamp columns
+
+Revision ID: d41c7b0e9f35
+Revises: a3d5e8f21c90
+Create Date: 2025-12-18 11:05:12.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c7b0e9f35'
+down_revision: Union[str, Sequence[str], None] = 'a3d5e8f21c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # фильтр по дате публикации без creator_id (составной индекс начинается с creator_id)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_videos_video_created_at
+            ON videos (video_created_at);
+    """)
+
+    # покрывающий индекс: дневные SUM(delta_views_count) / COUNT(DISTINCT video_id), которые
+    # не ушли в роллап, выполняются index-only scan по диапазону created_at
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_created_at_cover
+            ON video_snapshots (created_at) INCLUDE (video_id, delta_views_count);
+    """)
+    op.execute("DROP INDEX IF EXISTS idx_snapshots_created_at;")
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_created_at
+            ON video_snapshots (created_at);
+    """)
+    op.execute("DROP INDEX IF EXISTS idx_snapshots_created_at_cover;")
+    op.execute("DROP INDEX IF EXISTS idx_videos_video_created_at;")
@@ -0,0 +1,33 @@
+"""data version counter for result cache invalidation
+
+Revision ID: f2a96c1d7e08
+Revises: d41c7b0e9f35
+Create Date: 2025-12-20 09:40:27.335902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a96c1d7e08'
+down_revision: Union[str, Sequence[str], None] = 'd41c7b0e9f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # одна строка; загрузчик увеличивает version после каждой загрузки и шлёт NOTIFY data_version
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id      BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL
+        );
+    """)
+    op.execute("INSERT INTO data_version (id, version) VALUES (TRUE, 0) ON CONFLICT DO NOTHING;")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS data_version;")
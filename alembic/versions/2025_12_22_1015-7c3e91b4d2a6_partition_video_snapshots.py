@@ -0,0 +1,140 @@
+"""monthly range partitions of video_snapshots with BRIN on created_at
+
+Revision ID: 7c3e91b4d2a6
+Revises: f2a96c1d7e08
+Create Date: 2025-12-22 10:15:41.208337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e91b4d2a6'
+down_revision: Union[str, Sequence[str], None] = 'f2a96c1d7e08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = """
+    id                   TEXT NOT NULL,
+    video_id             TEXT NOT NULL
+        CONSTRAINT video_snapshots_video_id_fkey REFERENCES videos(id) ON DELETE CASCADE,
+
+    views_count          BIGINT NOT NULL,
+    likes_count          BIGINT NOT NULL,
+    comments_count       BIGINT NOT NULL,
+    reports_count        BIGINT NOT NULL,
+
+    delta_views_count    BIGINT NOT NULL,
+    delta_likes_count    BIGINT NOT NULL,
+    delta_comments_count BIGINT NOT NULL,
+    delta_reports_count  BIGINT NOT NULL,
+
+    created_at           TIMESTAMPTZ NOT NULL,
+    updated_at           TIMESTAMPTZ NOT NULL
+"""
+
+# копия функции на момент миграции; загрузчик вызывает её из app/ingest/partitions.py.
+# Создаёт недостающие партиции всех месяцев (UTC), задетых интервалом [from_ts, to_ts]
+CREATE_PARTITIONS_FUNCTION = """
+    CREATE OR REPLACE FUNCTION create_snapshot_partitions(from_ts timestamptz, to_ts timestamptz)
+    RETURNS integer
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        month   timestamp := date_trunc('month', from_ts AT TIME ZONE 'UTC');
+        name    text;
+        created integer := 0;
+    BEGIN
+        WHILE month <= to_ts AT TIME ZONE 'UTC' LOOP
+            name := 'video_snapshots_' || to_char(month, 'YYYY_MM');
+            IF to_regclass(name) IS NULL THEN
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF video_snapshots FOR VALUES FROM (%L) TO (%L)',
+                    name, month AT TIME ZONE 'UTC', (month + interval '1 month') AT TIME ZONE 'UTC'
+                );
+                created := created + 1;
+            END IF;
+            month := month + interval '1 month';
+        END LOOP;
+        RETURN created;
+    END
+    $$;
+"""
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE video_snapshots RENAME TO video_snapshots_old;")
+    op.execute("ALTER INDEX video_snapshots_pkey RENAME TO video_snapshots_old_pkey;")
+    op.execute("""
+        ALTER TABLE video_snapshots_old
+            RENAME CONSTRAINT video_snapshots_video_id_fkey TO video_snapshots_old_video_id_fkey;
+    """)
+    op.execute("DROP INDEX IF EXISTS idx_snapshots_created_at_cover;")
+    op.execute("DROP INDEX IF EXISTS idx_snapshots_video_id;")
+
+    # ключ секционирования обязан входить в первичный ключ
+    op.execute(f"""
+        CREATE TABLE video_snapshots (
+            {COLUMNS},
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+    """)
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+    # месяцы с имеющимися данными и два вперёд; дальше партиции заводит загрузчик
+    op.execute("""
+        SELECT create_snapshot_partitions(
+            COALESCE(min(created_at), now()),
+            GREATEST(max(created_at), now()) + interval '2 months'
+        )
+        FROM video_snapshots_old;
+    """)
+
+    # в порядке времени: так BRIN по created_at сразу получается плотным
+    op.execute("INSERT INTO video_snapshots SELECT * FROM video_snapshots_old ORDER BY created_at;")
+    op.execute("DROP TABLE video_snapshots_old;")
+
+    # BRIN вместо покрывающего B-tree: снапшоты дописываются по времени, и диапазоны страниц
+    # внутри месячной партиции почти не пересекаются, а сам индекс занимает килобайты
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_created_at_brin
+            ON video_snapshots USING brin (created_at);
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_video_id
+            ON video_snapshots (video_id);
+    """)
+    op.execute("ANALYZE video_snapshots;")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE video_snapshots RENAME TO video_snapshots_old;")
+    op.execute("ALTER INDEX video_snapshots_pkey RENAME TO video_snapshots_old_pkey;")
+    op.execute("""
+        ALTER TABLE video_snapshots_old
+            RENAME CONSTRAINT video_snapshots_video_id_fkey TO video_snapshots_old_video_id_fkey;
+    """)
+    op.execute("DROP INDEX IF EXISTS idx_snapshots_created_at_brin;")
+    op.execute("DROP INDEX IF EXISTS idx_snapshots_video_id;")
+
+    op.execute(f"""
+        CREATE TABLE video_snapshots (
+            {COLUMNS},
+            PRIMARY KEY (id)
+        );
+    """)
+    op.execute("INSERT INTO video_snapshots SELECT * FROM video_snapshots_old;")
+    op.execute("DROP TABLE video_snapshots_old;")
+    op.execute("DROP FUNCTION IF EXISTS create_snapshot_partitions(timestamptz, timestamptz);")
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_created_at_cover
+            ON video_snapshots (created_at) INCLUDE (video_id, delta_views_count);
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_video_id
+            ON video_snapshots (video_id);
+    """)
+    op.execute("ANALYZE video_snapshots;")
@@ -0,0 +1,39 @@
+"""indexes and foreign keys dropped by the loader for an initial load
+
+Revision ID: 9e4b2f61a8d3
+Revises: 7c3e91b4d2a6
+Create Date: 2025-12-24 09:15:12.604718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b2f61a8d3'
+down_revision: Union[str, Sequence[str], None] = '7c3e91b4d2a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # name       — имя индекса или ограничения;
+    # kind       — index / foreign_key (индексы восстанавливаются раньше внешних ключей);
+    # statement  — готовый CREATE INDEX / ALTER TABLE ... ADD CONSTRAINT.
+    # Запись делается в одной транзакции с DROP и удаляется в одной транзакции с восстановлением:
+    # если загрузка упала, загрузчик при следующем запуске создаёт всё, что здесь осталось.
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS loader_deferred_ddl (
+            name       TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            kind       TEXT NOT NULL CHECK (kind IN ('index', 'foreign_key')),
+            statement  TEXT NOT NULL,
+            dropped_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS loader_deferred_ddl;")
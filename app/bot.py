@@ -1,15 +1,27 @@
 import asyncio
 import logging
+import signal
 
 from aiogram import Bot, Dispatcher, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import CommandStart
 from aiogram.types import Message
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
+from app.core.columnar import get_columnar_store
 from app.core.config import settings
+from app.core.db import QueryRejectedError, warm_up_pool
 from app.core.logging_conf import setup_logging
+from app.core.metrics import request_trace, stage, start_metrics_server
+from app.llm.factory import get_llm_client
+from app.llm.queue import LLMQueueFullError
+from app.memory_store import start_memory_store
+from app.middlewares import ConcurrencyLimitMiddleware, RateLimitMiddleware
 from app.tg_prepare_message import STARTUP_TEXT
-from app.nlp_sql import natural_language_to_sql
-from app.sql_executor import run_sql_and_get_number
+from app.pipeline import answer_question
+from app.result_cache import start_data_version_listener
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -19,47 +31,153 @@ async def cmd_start(message: Message):
     await message.answer(STARTUP_TEXT)
 
 
+async def _reply(message: Message, text: str) -> None:
+    with stage("telegram_send"):
+        await message.answer(text)
+
+
 async def handle_message(message: Message):
     text = message.text or ""
     if not text.strip():
         await message.answer("Отправь, пожалуйста, текстовый запрос.")
         return
 
+    with request_trace(text) as trace:
+        try:
+            # шаблон или SQL через ИИ + выполнение (асинхронно);
+            # по таймауту запрос к LLM и SQL в базе отменяются
+            result = await asyncio.wait_for(
+                answer_question(text),
+                timeout=settings.bot.bot_request_timeout_seconds,
+            )
+
+
+            if not isinstance(result, (int, float)):
+                raise ValueError("Result is not numeric")
+
+            if isinstance(result, float) and result.is_integer():
+                normalized = str(int(result))
+            else:
+                normalized = str(result)
+
+            await _reply(message, normalized)
+        except QueryRejectedError:
+            trace.status = "rejected"
+            await _reply(message, "Запрос получился слишком тяжёлым, попробуй сузить условия (даты, креатор).")
+        except LLMQueueFullError:
+            trace.status = "queue_full"
+            await _reply(message, "Сейчас очень много вопросов, очередь заполнена — повтори через минуту.")
+        except Exception as e:
+            trace.status = type(e).__name__
+            logger.exception("Error while handling message: %s", e)
+            await _reply(message, "Не смог понять или посчитать твой запрос(")
+
+
+async def run_polling(bot: Bot, dp: Dispatcher) -> None:
+    logger.info("Starting bot polling")
+    # при заполненных слотах новые апдейты не забираются из Telegram
+    await dp.start_polling(bot, tasks_concurrency_limit=settings.bot.bot_max_concurrent_updates)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """
+    aiohttp-сервер, принимающий апдейты от Telegram. Работает до SIGTERM/SIGINT,
+    затем перестаёт принимать запросы, дожидается начатых и закрывает сессию бота.
+    """
+    base_url = settings.bot.webhook_base_url
+    if not base_url:
+        raise RuntimeError("WEBHOOK_BASE_URL is not set")
+    url = base_url.rstrip("/") + settings.bot.webhook_path
+    secret = settings.bot.webhook_secret or None
+
+    async def set_webhook(bot: Bot) -> None:
+        await bot.set_webhook(url, secret_token=secret, allowed_updates=dp.resolve_used_update_types())
+        logger.info("Webhook set to %s", url)
+
+    dp.startup.register(set_webhook)
+
+    app = web.Application()
+    # порядок важен: сначала shutdown диспетчера (drain), потом закрытие сессии бота в обработчике
+    setup_application(app, dp, bot=bot)
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(app, path=settings.bot.webhook_path)
+
+    runner = web.AppRunner(app, handle_signals=False, shutdown_timeout=settings.bot.bot_shutdown_timeout_seconds)
+    await runner.setup()
+    await web.TCPSite(runner, settings.bot.webhook_host, settings.bot.webhook_port).start()
+    logger.info("Webhook server on %s:%d%s", settings.bot.webhook_host, settings.bot.webhook_port, settings.bot.webhook_path)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
     try:
-        # ненерируем SQL через ИИ
-        sql = natural_language_to_sql(text)
-
-        # выполняем SQL (асинхронно)
-        result = await run_sql_and_get_number(sql)
-
+        await stop.wait()
+    finally:
+        logger.info("Stopping webhook server")
+        await runner.cleanup()
 
-        if not isinstance(result, (int, float)):
-            raise ValueError("Result is not numeric")
 
-        if isinstance(result, float) and result.is_integer():
-            normalized = str(int(result))
-        else:
-            normalized = str(result)
-
-        await message.answer(normalized)
-    except Exception as e:
-        logger.exception("Error while handling message: %s", e)
-        await message.answer("Не смог понять или посчитать твой запрос(")
-
-
-async def main():
+def create_bot() -> Bot:
     token = settings.bot.telegram_bot_token
     if not token:
         raise RuntimeError("TELEGRAM_BOT_TOKEN is not set")
-
-    bot = Bot(token=token)
+    if settings.bot.telegram_api_url:
+        # свой Bot API сервер (telegram-bot-api) рядом с ботом
+        api = TelegramAPIServer.from_base(settings.bot.telegram_api_url)
+        return Bot(token=token, session=AiohttpSession(api=api))
+    return Bot(token=token)
+
+
+def create_dispatcher() -> Dispatcher:
+    """
+    Диспетчер с обработчиками и ограничением одновременных апдейтов;
+    при остановке он дожидается уже принятых апдейтов.
+    """
     dp = Dispatcher()
 
+    limiter = ConcurrencyLimitMiddleware(settings.bot.bot_max_concurrent_updates)
+    dp.update.outer_middleware(limiter)
+
+    async def drain() -> None:
+        await limiter.drain(settings.bot.bot_shutdown_timeout_seconds)
+
+    dp.shutdown.register(drain)
+
+    dp.message.middleware(RateLimitMiddleware())
     dp.message.register(cmd_start, CommandStart())
     dp.message.register(handle_message, F.text)
+    return dp
 
-    logger.info("Starting bot polling")
-    await dp.start_polling(bot)
+
+async def start_services(metrics_port: int | None = None) -> None:
+    """
+    То, что нужно до приёма первого апдейта: метрики, прогретый пул, слушатель версии данных,
+    клиент LLM (локальная модель грузится и считает системный промпт здесь, а не на первом вопросе),
+    колоночная копия данных при SQL_BACKEND=duckdb, массивы для шаблонов при MEMORY_STORE=true.
+    """
+    await start_metrics_server(metrics_port)
+    await asyncio.to_thread(get_llm_client)
+    await warm_up_pool()
+    await start_data_version_listener()
+    store = get_columnar_store()
+    if store is not None and store.connection() is None:
+        logger.warning("Columnar copy %s not found, queries go to Postgres until the loader builds it", store.path)
+    await start_memory_store()
+
+
+async def main():
+    mode = settings.bot.bot_mode.lower()
+    if mode not in ("polling", "webhook"):
+        raise ValueError(f"Unknown BOT_MODE={mode!r}")
+
+    bot = create_bot()
+    dp = create_dispatcher()
+    await start_services()
+
+    if mode == "webhook":
+        await run_webhook(bot, dp)
+    else:
+        await run_polling(bot, dp)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """
+    Счётчики кэша.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CacheBackend(ABC):
+    """
+    Абстракция key-value кэша со строковыми значениями, ограниченным размером и TTL.
+    namespace отделяет несовместимые версии данных (например, другой промпт или модель).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, namespace: str = "") -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self._stats = CacheStats()
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            size=len(self),
+        )
+
+    def _count(self, value: str | None) -> str | None:
+        if value is None:
+            self._stats.misses += 1
+        else:
+            self._stats.hits += 1
+        return value
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU-кэш с TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, namespace: str = "") -> None:
+        super().__init__(maxsize, ttl, namespace)
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    async def get(self, key: str) -> str | None:
+        item = self._data.get(key)
+        if item is None:
+            return self._count(None)
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return self._count(None)
+
+        self._data.move_to_end(key)
+        return self._count(value)
+
+    async def set(self, key: str, value: str) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._stats.evictions += 1
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Кэш на диске (sqlite): переживает рестарт бота.
+    Записи другого namespace удаляются при открытии.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int,
+        ttl: float,
+        namespace: str = "",
+        table: str = "cache",
+    ) -> None:
+        super().__init__(maxsize, ttl, namespace)
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key         TEXT PRIMARY KEY,
+                namespace   TEXT NOT NULL,
+                value       TEXT NOT NULL,
+                expires_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(f"DELETE FROM {table} WHERE namespace != ? OR expires_at < ?", (namespace, time.time()))
+
+    # запросы к sqlite (и ожидание занятого другим процессом файла) — в потоке, не в event loop
+
+    def _get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+        return value
+
+    def _set(self, key: str, value: str) -> int:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, namespace, value, expires_at, last_access) "
+                f"VALUES (?, ?, ?, ?, ?)",
+                (key, self.namespace, value, now + self.ttl, now),
+            )
+            overflow = self._size() - self.maxsize
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access LIMIT ?)",
+                    (overflow,),
+                )
+                return overflow
+        return 0
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def _size(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    async def get(self, key: str) -> str | None:
+        return self._count(await asyncio.to_thread(self._get, key))
+
+    async def set(self, key: str, value: str) -> None:
+        self._stats.evictions += await asyncio.to_thread(self._set, key, value)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size()
+
+
+class RedisCache(CacheBackend):
+    """
+    Кэш в Redis, общий для всех воркеров. Записи живут ttl секунд;
+    вытеснение по размеру — на стороне Redis (maxmemory-policy), maxsize не используется.
+    """
+
+    def __init__(self, client, ttl: float, namespace: str = "", table: str = "cache", prefix: str = "") -> None:
+        super().__init__(0, ttl, namespace)
+        self._redis = client
+        self._prefix = f"{prefix}{table}:{namespace}:"
+
+    async def get(self, key: str) -> str | None:
+        return self._count(await self._redis.get(self._prefix + key))
+
+    async def set(self, key: str, value: str) -> None:
+        await self._redis.set(self._prefix + key, value, px=max(1, int(self.ttl * 1000)))
+
+    async def clear(self) -> None:
+        keys = [key async for key in self._redis.scan_iter(match=self._prefix + "*", count=1000)]
+        for i in range(0, len(keys), 1000):
+            await self._redis.delete(*keys[i:i + 1000])
+
+    def __len__(self) -> int:
+        # размер живёт в Redis, синхронно его не узнать
+        return 0
+
+
+def create_cache(
+    maxsize: int,
+    ttl: float,
+    namespace: str = "",
+    path: str = "",
+    table: str = "cache",
+) -> CacheBackend:
+    """
+    Фабрика кэша: sqlite, если задан путь, иначе по STATE_BACKEND (memory / sqlite / redis).
+    """
+    backend = settings.state.state_backend.lower()
+    if not path and backend == "sqlite":
+        path = settings.state.state_sqlite_path
+    if path:
+        logger.info("Using sqlite cache %s (table %s)", path, table)
+        return SQLiteCache(path, maxsize=maxsize, ttl=ttl, namespace=namespace, table=table)
+    if backend == "redis":
+        from app.core.state import redis_client
+
+        logger.info("Using redis cache (table %s)", table)
+        return RedisCache(
+            redis_client(), ttl=ttl, namespace=namespace, table=table, prefix=settings.state.state_key_prefix
+        )
+    return MemoryCache(maxsize=maxsize, ttl=ttl, namespace=namespace)
@@ -0,0 +1,183 @@
+"""
+Выполнение запросов в колоночной копии данных (SQL_BACKEND=duckdb).
+
+Загрузчик после каждой загрузки пересобирает файл DuckDB с копией videos, video_snapshots
+и video_daily_stats (app/ingest/columnar.py) и записывает в него data_version, по которому
+копия построена. Бот открывает файл только на чтение и переоткрывает, когда загрузчик его заменил.
+Запрос выполняется в копии, только если её версия совпадает с текущей версией данных
+(бот узнаёт её через LISTEN data_version, см. app/result_cache.py). Если копии нет, она отстала
+или DuckDB не понимает запрос (другой диалект: нет to_char и т.п.), запрос уходит в Postgres.
+Туда же сразу уходят запросы, которые DuckDB выполнил бы, но с другим результатом (см. postgres_only).
+
+Агрегаты по всей истории DuckDB считает по нужным столбцам пачками векторов, поэтому оценка
+через EXPLAIN здесь не делается: тяжёлые запросы ограничивает SQL_STATEMENT_TIMEOUT_MS.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+
+from app.core.config import settings
+from app.core.db import QueryRejectedError, row_to_number
+from app.core.metrics import COLUMNAR_QUERIES
+from app.sql_validator import replace_params, tokenize
+
+logger = logging.getLogger(__name__)
+
+# служебная таблица копии: data_version, по которому она построена
+META_TABLE = "columnar_meta"
+
+
+def import_duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise RuntimeError("SQL_BACKEND=duckdb requires the 'duckdb' package (pip install duckdb)") from e
+    return duckdb
+
+
+def postgres_only(sql: str) -> bool:
+    """
+    Запрос выполнится в DuckDB, но результат может отличаться от Postgres.
+    Деление "/": в Postgres int / int — целое (7 / 2 = 3), а SUM(bigint) — numeric, и деление дробное;
+    в DuckDB / всегда дробное, а с integer_division целочисленное и для SUM (HUGEINT).
+    Без типов выражений не различить, поэтому запросы с делением выполняются в Postgres.
+    """
+    return any(token.kind == "op" and token.value == "/" for token in tokenize(sql))
+
+
+# под этим именем файл копии подключается к соединению бота
+CATALOG = "columnar"
+
+
+def _quote(value: str) -> str:
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def connect(path: str = ":memory:"):
+    """
+    Соединение DuckDB с настройками из DBSettings и часовым поясом DB_TIMEZONE:
+    в нём считаются created_at::date, как в сессиях Postgres.
+    """
+    duckdb = import_duckdb()
+    config = {}
+    if settings.database.duckdb_threads:
+        config["threads"] = settings.database.duckdb_threads
+    if settings.database.duckdb_memory_limit:
+        config["memory_limit"] = settings.database.duckdb_memory_limit
+    con = duckdb.connect(path, config=config)
+
+    timezone = settings.database.db_timezone
+    if timezone.upper() != "UTC":
+        # без расширения icu TIMESTAMPTZ в DuckDB всегда в UTC
+        try:
+            con.execute("LOAD icu")
+        except duckdb.Error:
+            con.execute("INSTALL icu")
+            con.execute("LOAD icu")
+        # GLOBAL — чтобы действовало и в курсорах соединения
+        con.execute(f"SET GLOBAL TimeZone = {_quote(timezone)}")
+    return con
+
+
+class ColumnarStore:
+    """
+    Колоночная копия данных в файле DuckDB, только на чтение.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.version: int | None = None
+        self._con = None
+        self._file_id: tuple[int, int] | None = None
+
+    def connection(self):
+        """
+        Соединение с текущим файлом копии; если файл заменён — открывает новый.
+        None — копии ещё нет.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        file_id = (st.st_ino, st.st_mtime_ns)
+        if file_id != self._file_id:
+            # duckdb.connect(path) в одном процессе отдаёт уже открытую базу по тому же пути, т.е. старый файл;
+            # файл, подключённый к новой базе в памяти, открывается заново
+            con = connect()
+            con.execute(f"ATTACH {_quote(self.path)} AS {CATALOG} (READ_ONLY)")
+            con.execute(f"USE {CATALOG}")
+            version = con.execute(f"SELECT version FROM {META_TABLE}").fetchone()[0]
+            # старое соединение не закрываем: курсоры начатых на нём запросов держат его сами
+            self._con, self._file_id, self.version = con, file_id, version
+            logger.info("Columnar copy %s opened, data version %s", self.path, version)
+        return self._con
+
+    @staticmethod
+    def _fetch(cursor, sql: str, params: dict | None):
+        try:
+            # каталог по умолчанию у курсора свой, USE соединения он не наследует
+            cursor.execute(f"USE {CATALOG}")
+            return cursor.execute(sql, params or None).fetchone()
+        finally:
+            cursor.close()
+
+    async def execute(self, sql: str, params: dict | None, version: int | None) -> int | float | None:
+        """
+        Выполняет запрос в копии данных версии version.
+        None — копия для запроса не подходит и его нужно выполнить в Postgres.
+        """
+        con = self.connection()
+        if con is None:
+            COLUMNAR_QUERIES.inc(result="missing")
+            return None
+        if version is None or self.version != version:
+            COLUMNAR_QUERIES.inc(result="stale")
+            return None
+        if postgres_only(sql):
+            COLUMNAR_QUERIES.inc(result="postgres_only")
+            return None
+
+        duckdb = import_duckdb()
+        timeout = settings.database.sql_statement_timeout_ms / 1000
+        cursor = con.cursor()
+        try:
+            row = await asyncio.wait_for(
+                asyncio.to_thread(self._fetch, cursor, replace_params(sql, "${name}"), params),
+                timeout=timeout,
+            )
+        except duckdb.Error as e:
+            COLUMNAR_QUERIES.inc(result="fallback")
+            logger.info("Columnar copy cannot run query, falling back to Postgres: %s", e)
+            return None
+        except BaseException as e:
+            # таймаут или отмена запроса пользователя: останавливаем запрос в DuckDB
+            with contextlib.suppress(duckdb.Error):
+                cursor.interrupt()
+            if isinstance(e, asyncio.TimeoutError):
+                raise QueryRejectedError(f"Query exceeded {timeout:.1f}s in columnar copy") from e
+            raise
+
+        COLUMNAR_QUERIES.inc(result="ok")
+        value = row_to_number(row)
+        logger.info("Columnar result: %s", value)
+        return value
+
+
+_store: ColumnarStore | None = None
+
+
+def get_columnar_store() -> ColumnarStore | None:
+    """
+    Колоночная копия при SQL_BACKEND=duckdb, иначе None.
+    """
+    global _store
+    backend = settings.database.sql_backend
+    if backend == "postgres":
+        return None
+    if backend != "duckdb":
+        raise ValueError(f"Unknown SQL_BACKEND={backend!r}")
+    if _store is None:
+        import_duckdb()
+        _store = ColumnarStore(settings.database.duckdb_path)
+    return _store
@@ -19,6 +19,33 @@ class DBSettings(BaseSettings):
     db_host: str = Field(alias="DB_HOST")
     db_name: str = Field(alias="DB_NAME")
     db_show_query: bool = Field(default=False, alias="DB_SHOW_QUERY")
+    # часовой пояс сессий: в нём считаются created_at::date и дни в video_daily_stats
+    db_timezone: str = Field(default="UTC", alias="DB_TIMEZONE")
+
+    # пул соединений бота
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=5, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(default=10.0, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(default=True, alias="DB_POOL_PRE_PING")
+    # сколько подготовленных statements asyncpg держит на одно соединение
+    db_statement_cache_size: int = Field(default=256, alias="DB_STATEMENT_CACHE_SIZE")
+
+    # защита от тяжёлых запросов от LLM
+    sql_statement_timeout_ms: int = Field(default=5000, alias="SQL_STATEMENT_TIMEOUT_MS")
+    # запросы с оценкой стоимости (EXPLAIN) выше порога не выполняются
+    sql_max_cost: float = Field(default=1_000_000.0, alias="SQL_MAX_COST")
+
+    # postgres | duckdb — считать в колоночной копии данных (app/core/columnar.py), иначе в Postgres
+    sql_backend: str = Field(default="postgres", alias="SQL_BACKEND")
+    # файл DuckDB с копией; его пересобирает загрузчик, бот открывает только на чтение
+    duckdb_path: str = Field(default="analytics.duckdb", alias="DUCKDB_PATH")
+    # 0 — по числу ядер
+    duckdb_threads: int = Field(default=0, alias="DUCKDB_THREADS")
+    # например "2GB"; пусто — значение DuckDB по умолчанию (80% памяти)
+    duckdb_memory_limit: str = Field(default="", alias="DUCKDB_MEMORY_LIMIT")
+    # шаблонные вопросы считаются по массивам NumPy в памяти бота (app/memory_store.py), без запроса в БД
+    memory_store: bool = Field(default=False, alias="MEMORY_STORE")
 
     @property
     def postgres_url_sync(self) -> str:
@@ -28,6 +55,14 @@ class DBSettings(BaseSettings):
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
+    @property
+    def postgres_dsn(self) -> str:
+        """DSN для чистого asyncpg (bulk-загрузка через COPY)."""
+        return (
+            f"postgresql://{self.db_user}:{self.db_password}"
+            f"@{self.db_host}:{self.db_port}/{self.db_name}"
+        )
+
     @property
     def postgres_url_async(self) -> str:
         """URL для async SQLAlchemy (asyncpg)."""
@@ -42,9 +77,93 @@ class LLMSettings(BaseSettings):
     """
     Настройки LLM (сейчас использую Mistral).
     """
+    # mistral | openai | local | fake | router (маршруты из LLM_ROUTES)
     llm_provider: str = Field(default="mistral", alias="LLM_PROVIDER")
-    mistral_api_key: str = Field(alias="MISTRAL_API_KEY")
+    mistral_api_key: str = Field(default="", alias="MISTRAL_API_KEY")
     mistral_model: str = Field(default="mistral-small-latest", alias="MISTRAL_MODEL")
+    # OpenAI-совместимый сервер (vLLM, llama.cpp server, Ollama, OpenAI)
+    openai_base_url: str = Field(default="http://localhost:8000/v1", alias="OPENAI_BASE_URL")
+    openai_api_key: str = Field(default="", alias="OPENAI_API_KEY")
+    openai_model: str = Field(default="gpt-4o-mini", alias="OPENAI_MODEL")
+    # локальная квантованная модель (GGUF) через llama-cpp-python
+    local_model_path: str = Field(default="", alias="LOCAL_MODEL_PATH")
+    local_model_ctx: int = Field(default=8192, alias="LOCAL_MODEL_CTX")
+    # 0 — по числу ядер
+    local_model_threads: int = Field(default=0, alias="LOCAL_MODEL_THREADS")
+    # файл с сохранённым KV-кэшем системного промпта; пусто — считать при каждом старте
+    local_model_state_path: str = Field(default="", alias="LOCAL_MODEL_STATE_PATH")
+    # selective — неизменный префикс + подсказки под вопрос (app/prompt_builder.py), full — весь промпт
+    llm_prompt_mode: str = Field(default="selective", alias="LLM_PROMPT_MODE")
+    # предел длины ответа: SQL из корпуса укладывается в ~100 токенов
+    llm_max_output_tokens: int = Field(default=256, alias="LLM_MAX_OUTPUT_TOKENS")
+    # маршруты для LLM_PROVIDER=router через запятую, в порядке предпочтения: provider[:model]
+    llm_routes: str = Field(default="", alias="LLM_ROUTES")
+    llm_hedge: bool = Field(default=True, alias="LLM_HEDGE")
+    # задержка перед hedge-запросом, пока у маршрута мало замеров для p95
+    llm_hedge_delay_seconds: float = Field(default=2.0, alias="LLM_HEDGE_DELAY_SECONDS")
+    llm_breaker_error_rate: float = Field(default=0.5, alias="LLM_BREAKER_ERROR_RATE")
+    llm_breaker_min_calls: int = Field(default=10, alias="LLM_BREAKER_MIN_CALLS")
+    llm_breaker_cooldown_seconds: float = Field(default=30.0, alias="LLM_BREAKER_COOLDOWN_SECONDS")
+    llm_max_concurrency: int = Field(default=8, alias="LLM_MAX_CONCURRENCY")
+    llm_timeout_seconds: float = Field(default=30.0, alias="LLM_TIMEOUT_SECONDS")
+    # сколько запросов может ждать очереди к LLM; сверх этого пользователю сразу отвечаем «перегружен»
+    llm_queue_size: int = Field(default=100, alias="LLM_QUEUE_SIZE")
+    fake_llm_latency_seconds: float = Field(default=1.0, alias="FAKE_LLM_LATENCY_SECONDS")
+
+
+class CacheSettings(BaseSettings):
+    """
+    Настройки кэшей: вопрос -> SQL и SQL -> результат.
+    """
+    question_cache_size: int = Field(default=1024, alias="QUESTION_CACHE_SIZE")
+    question_cache_ttl_seconds: float = Field(default=86400.0, alias="QUESTION_CACHE_TTL_SECONDS")
+    # путь к sqlite-файлу; пусто — кэш только в памяти процесса
+    question_cache_path: str = Field(default="", alias="QUESTION_CACHE_PATH")
+    # кэш результатов SQL; сбрасывается при каждой загрузке данных (data_version)
+    result_cache_size: int = Field(default=4096, alias="RESULT_CACHE_SIZE")
+    result_cache_ttl_seconds: float = Field(default=3600.0, alias="RESULT_CACHE_TTL_SECONDS")
+
+
+class StateSettings(BaseSettings):
+    """
+    Общее состояние воркеров: кэши, блокировки single-flight, лимиты частоты.
+    """
+    # memory — в процессе, sqlite — файл на одной машине, redis — общий для машин
+    state_backend: str = Field(default="memory", alias="STATE_BACKEND")
+    state_sqlite_path: str = Field(default="bot_state.sqlite3", alias="STATE_SQLITE_PATH")
+    redis_url: str = Field(default="redis://localhost:6379/0", alias="REDIS_URL")
+    state_key_prefix: str = Field(default="vabot:", alias="STATE_KEY_PREFIX")
+
+
+class RateLimitSettings(BaseSettings):
+    """
+    Лимиты частоты вопросов (token bucket, общий для воркеров через STATE_BACKEND). 0 — без лимита.
+    """
+    rate_limit_user_per_minute: float = Field(default=20.0, alias="RATE_LIMIT_USER_PER_MINUTE")
+    rate_limit_user_burst: int = Field(default=5, alias="RATE_LIMIT_USER_BURST")
+    rate_limit_global_per_second: float = Field(default=30.0, alias="RATE_LIMIT_GLOBAL_PER_SECOND")
+    rate_limit_global_burst: int = Field(default=60, alias="RATE_LIMIT_GLOBAL_BURST")
+
+
+class LoaderSettings(BaseSettings):
+    """
+    Настройки загрузчика данных.
+    """
+    loader_path: str = Field(default="/app/data/videos.json", alias="LOADER_PATH")
+    # сколько строк (videos + snapshots) уходит в БД одной пачкой COPY
+    loader_batch_size: int = Field(default=20000, alias="LOADER_BATCH_SIZE")
+    # incremental — грузить только новое/изменившееся, full — перечитать всё
+    loader_mode: str = Field(default="incremental", alias="LOADER_MODE")
+    # директория с почасовыми файлами; если задана, LOADER_PATH не используется
+    loader_drop_dir: str = Field(default="", alias="LOADER_DROP_DIR")
+    # сколько процессов параллельно разбирают и пишут файл JSON Lines (по диапазонам байт); 0 — по числу ядер
+    loader_workers: int = Field(default=1, alias="LOADER_WORKERS")
+    # читать несжатые выгрузки через mmap, а не буферизованным чтением файла
+    loader_mmap: bool = Field(default=False, alias="LOADER_MMAP")
+    # на сколько месяцев вперёд загрузчик заранее создаёт партиции video_snapshots
+    snapshot_partitions_ahead: int = Field(default=2, alias="SNAPSHOT_PARTITIONS_AHEAD")
+    # хранить замеры за столько последних месяцев (старые партиции удаляются); 0 — хранить всё
+    snapshot_retention_months: int = Field(default=0, alias="SNAPSHOT_RETENTION_MONTHS")
 
 
 class BotSettings(BaseSettings):
@@ -52,6 +171,36 @@ class BotSettings(BaseSettings):
     Настройки бота.
     """
     telegram_bot_token: str = Field(alias="TELEGRAM_BOT_TOKEN")
+    # адрес своего Bot API сервера (telegram-bot-api); пусто — api.telegram.org
+    telegram_api_url: str = Field(default="", alias="TELEGRAM_API_URL")
+    # сколько секунд ждём ответа на один вопрос, после чего LLM-запрос и SQL отменяются
+    bot_request_timeout_seconds: float = Field(default=60.0, alias="BOT_REQUEST_TIMEOUT_SECONDS")
+    # polling — long polling getUpdates, webhook — aiohttp-сервер, куда Telegram присылает апдейты
+    bot_mode: str = Field(default="polling", alias="BOT_MODE")
+    # число процессов-обработчиков в app.workers (апдейты забирает главный процесс)
+    bot_workers: int = Field(default=1, alias="BOT_WORKERS")
+    # сколько апдейтов обрабатывается одновременно; остальные ждут своей очереди
+    bot_max_concurrent_updates: int = Field(default=64, alias="BOT_MAX_CONCURRENT_UPDATES")
+    # сколько секунд при остановке ждём завершения уже принятых запросов
+    bot_shutdown_timeout_seconds: float = Field(default=30.0, alias="BOT_SHUTDOWN_TIMEOUT_SECONDS")
+    # публичный адрес (https://bot.example.com), на который Telegram шлёт апдейты в режиме webhook
+    webhook_base_url: str = Field(default="", alias="WEBHOOK_BASE_URL")
+    webhook_path: str = Field(default="/telegram/webhook", alias="WEBHOOK_PATH")
+    # проверяется в заголовке X-Telegram-Bot-Api-Secret-Token; пусто — без проверки
+    webhook_secret: str = Field(default="", alias="WEBHOOK_SECRET")
+    webhook_host: str = Field(default="0.0.0.0", alias="WEBHOOK_HOST")
+    webhook_port: int = Field(default=8080, alias="WEBHOOK_PORT")
+
+
+class MetricsSettings(BaseSettings):
+    """
+    Настройки метрик и журнала медленных запросов.
+    """
+    metrics_host: str = Field(default="0.0.0.0", alias="METRICS_HOST")
+    # порт HTTP-эндпоинта /metrics в формате Prometheus; 0 — не поднимать
+    metrics_port: int = Field(default=9100, alias="METRICS_PORT")
+    # запросы дольше порога пишутся в журнал медленных запросов (вопрос, SQL, время по стадиям)
+    slow_request_threshold_ms: float = Field(default=3000.0, alias="SLOW_REQUEST_THRESHOLD_MS")
 
 
 class Settings(BaseSettings):
@@ -60,7 +209,12 @@ class Settings(BaseSettings):
     """
     database: DBSettings = Field(default_factory=DBSettings)
     llm: LLMSettings = Field(default_factory=LLMSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    state: StateSettings = Field(default_factory=StateSettings)
+    rate_limit: RateLimitSettings = Field(default_factory=RateLimitSettings)
+    loader: LoaderSettings = Field(default_factory=LoaderSettings)
     bot: BotSettings = Field(default_factory=BotSettings)
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
 
 
 @lru_cache
@@ -1,20 +1,38 @@
+import asyncio
+import json
 import logging
-from collections.abc import AsyncGenerator
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
+import asyncpg
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
 from .config import settings
+from .metrics import DB_POOL_ACQUIRED, DB_POOL_WAIT_SECONDS
 
 logger = logging.getLogger(__name__)
 
 engine = create_async_engine(
     url=settings.database.postgres_url_async,
     echo=settings.database.db_show_query,
+    pool_size=settings.database.db_pool_size,
+    max_overflow=settings.database.db_max_overflow,
+    pool_timeout=settings.database.db_pool_timeout,
+    pool_recycle=settings.database.db_pool_recycle,
+    pool_pre_ping=settings.database.db_pool_pre_ping,
+    connect_args={
+        "server_settings": {"timezone": settings.database.db_timezone},
+        # кэш подготовленных запросов SQLAlchemy-адаптера asyncpg (на соединение)
+        "prepared_statement_cache_size": settings.database.db_statement_cache_size,
+    },
 )
 
 async_session_maker = async_sessionmaker(
@@ -23,6 +41,126 @@ async_session_maker = async_sessionmaker(
 )
 
 
+@dataclass
+class PoolStats:
+    """
+    Состояние пула соединений бота.
+    """
+    size: int = 0
+    checked_out: int = 0
+    checked_in: int = 0
+    overflow: int = 0
+    waiting: int = 0
+    acquired: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+_pool_stats = PoolStats()
+
+
+def get_pool_stats() -> PoolStats:
+    """
+    Снимок статистики пула: занятые/свободные соединения, ожидающие и время ожидания соединения.
+    """
+    pool = engine.pool
+    return PoolStats(
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=pool.overflow(),
+        waiting=_pool_stats.waiting,
+        acquired=_pool_stats.acquired,
+        wait_seconds_total=_pool_stats.wait_seconds_total,
+        wait_seconds_max=_pool_stats.wait_seconds_max,
+    )
+
+
+@asynccontextmanager
+async def read_connection() -> AsyncIterator[AsyncConnection]:
+    """
+    Соединение из пула без ORM-сессии — для read-only запросов бота.
+    Транзакция откатывается при возврате соединения, commit не нужен.
+    """
+    _pool_stats.waiting += 1
+    started = time.perf_counter()
+    try:
+        conn = await engine.connect()
+    finally:
+        _pool_stats.waiting -= 1
+
+    waited = time.perf_counter() - started
+    _pool_stats.acquired += 1
+    _pool_stats.wait_seconds_total += waited
+    _pool_stats.wait_seconds_max = max(_pool_stats.wait_seconds_max, waited)
+    DB_POOL_ACQUIRED.inc()
+    DB_POOL_WAIT_SECONDS.inc(waited)
+
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+class QueryRejectedError(ValueError):
+    """
+    Запрос не прошёл admission control (слишком дорогой по оценке планировщика).
+    """
+
+
+async def _prepare_transaction(conn: AsyncConnection) -> None:
+    """
+    Транзакция только на чтение с ограничением времени выполнения — одним round trip.
+    """
+    await conn.execute(
+        text(
+            "SELECT set_config('transaction_read_only', 'on', true), "
+            "set_config('statement_timeout', :timeout, true)"
+        ),
+        {"timeout": str(settings.database.sql_statement_timeout_ms)},
+    )
+
+
+async def _admit(conn: AsyncConnection, sql: str) -> None:
+    """
+    Оценивает запрос через EXPLAIN (без ANALYZE) и отклоняет слишком дорогие.
+    """
+    result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql.strip().rstrip(';')}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]["Plan"]
+    cost, rows = top["Total Cost"], top["Plan Rows"]
+
+    if cost > settings.database.sql_max_cost:
+        logger.warning("Query rejected: cost %.0f > %.0f: %s", cost, settings.database.sql_max_cost, sql)
+        raise QueryRejectedError(f"Query cost {cost:.0f} exceeds limit")
+    logger.info("Query admitted: cost %.0f, rows %s", cost, rows)
+
+
+async def warm_up_pool() -> None:
+    """
+    Заранее открывает pool_size соединений, чтобы первый пользователь не ждал подключения к БД.
+    """
+    async def ping() -> None:
+        async with read_connection() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(ping() for _ in range(settings.database.db_pool_size)))
+    logger.info("DB pool warmed up in %.3fs: %s", time.perf_counter() - started, get_pool_stats())
+
+
+async def connect_raw() -> asyncpg.Connection:
+    """
+    Отдельное соединение asyncpg в обход SQLAlchemy (COPY и прочие bulk-операции).
+    """
+    return await asyncpg.connect(
+        settings.database.postgres_dsn,
+        server_settings={"timezone": settings.database.db_timezone},
+    )
+
+
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """
     генератор сессий.
@@ -38,31 +176,35 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
-async def execute_sql_and_get_number(sql: str):
+def row_to_number(row) -> int | float:
+    """
+    Первое значение строки результата как число; пустой результат и NULL — 0.
+    """
+    if row is None or row[0] is None:
+        return 0
+    val = row[0]
+    if isinstance(val, (int, float)):
+        return val
+    try:
+        return float(val)
+    except Exception:
+        logger.error("Non-numeric result from DB: %r", val)
+        raise ValueError("DB returned non-numeric result")
+
+
+async def execute_sql_and_get_number(sql: str, params: dict | None = None, trusted: bool = False):
     """
     функция выполняет SQL запрос и возвращает одно числовое значение.
+    params — значения для bind-параметров (:name) шаблонных запросов.
+    trusted — запрос из заранее заготовленных шаблонов, EXPLAIN для него не нужен.
     """
-    async with async_session_maker() as session:
-        try:
-            result = await session.execute(text(sql))
-            row = result.first()
-
-            if row is None or row[0] is None:
-                value = 0
-            else:
-                val = row[0]
-                if isinstance(val, (int, float)):
-                    value = val
-                else:
-                    try:
-                        value = float(val)
-                    except Exception:
-                        logger.error("Non-numeric result from DB: %r", val)
-                        raise ValueError("DB returned non-numeric result")
+    async with read_connection() as conn:
+        await _prepare_transaction(conn)
+        if not trusted:
+            await _admit(conn, sql)
+        result = await conn.execute(text(sql), params or {})
+        row = result.first()
 
-            await session.commit()
-            logger.info("DB result: %s", value)
-            return value
-        except Exception:
-            await session.rollback()
-            raise
+    value = row_to_number(row)
+    logger.info("DB result: %s", value)
+    return value
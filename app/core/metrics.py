@@ -0,0 +1,346 @@
+"""
+Метрики бота в текстовом формате Prometheus без внешних зависимостей.
+
+- stage(name) — замер стадии запроса: гистограмма времени, счётчик ошибок по стадии
+  и запись в трассу текущего запроса;
+- request_trace() — трасса одного запроса (время по стадиям, SQL); по завершении пишется
+  одной строкой в лог, а медленные запросы — в журнал медленных запросов;
+- start_metrics_server() — HTTP-эндпоинт /metrics (aiohttp уже есть в зависимостях aiogram).
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("app.slow_requests")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Базовая метрика с набором меток.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: expected labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    Монотонный счётчик.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def total(self, **labels: str) -> float:
+        """
+        Сумма по всем значениям меток или только по заданным.
+        """
+        wanted = [(self.labels.index(name), value) for name, value in labels.items()]
+        return sum(
+            value for key, value in self._values.items()
+            if all(key[index] == expected for index, expected in wanted)
+        )
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """
+    Текущее значение.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+@dataclass
+class _HistogramState:
+    buckets: list[int]
+    count: int = 0
+    total: float = 0.0
+
+
+class Histogram(Metric):
+    """
+    Гистограмма с кумулятивными бакетами, как у клиентов Prometheus.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.bounds = tuple(sorted(buckets)) + (math.inf,)
+        self._states: dict[tuple[str, ...], _HistogramState] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _HistogramState(buckets=[0] * len(self.bounds))
+            for i, bound in enumerate(self.bounds):
+                if value <= bound:
+                    state.buckets[i] += 1
+            state.count += 1
+            state.total += value
+
+    def samples(self) -> Iterator[str]:
+        for key, state in sorted(self._states.items()):
+            for bound, count in zip(self.bounds, state.buckets):
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(state.total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {state.count}"
+
+
+REGISTRY: list[Metric] = []
+_collectors: list[Callable[[], None]] = []
+
+
+def register_collector(fn: Callable[[], None]) -> None:
+    """
+    fn вызывается перед каждой выдачей метрик — для значений, которые снимаются по запросу (пул БД).
+    """
+    _collectors.append(fn)
+
+
+def render() -> str:
+    """
+    Все метрики в текстовом формате Prometheus.
+    """
+    for collect in _collectors:
+        try:
+            collect()
+        except Exception:
+            logger.exception("Metrics collector failed")
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+STAGE_SECONDS = Histogram("bot_stage_seconds", "Time spent in a request stage", ("stage",))
+STAGE_ERRORS = Counter("bot_stage_errors_total", "Errors by request stage", ("stage", "error"))
+REQUEST_SECONDS = Histogram("bot_request_seconds", "End-to-end request time", ("path",))
+REQUESTS = Counter("bot_requests_total", "Handled requests", ("path", "status"))
+SLOW_REQUESTS = Counter("bot_slow_requests_total", "Requests above SLOW_REQUEST_THRESHOLD_MS")
+LLM_TOKENS = Counter("llm_tokens_total", "LLM token usage", ("provider", "kind"))
+LLM_REQUEST_TOKENS = Histogram(
+    "llm_request_tokens", "Tokens per LLM request", ("provider", "kind"),
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+UPDATES_IN_FLIGHT = Gauge("bot_updates_in_flight", "Telegram updates being handled or waiting for a slot")
+RATE_LIMITED = Counter("bot_rate_limited_total", "Messages rejected by rate limits", ("scope",))
+LLM_QUEUE = Gauge("llm_queue_requests", "LLM requests by queue state", ("state",))
+LLM_QUEUE_REJECTED = Counter("llm_queue_rejected_total", "LLM requests rejected because the queue was full")
+DB_POOL = Gauge("db_pool_connections", "DB pool connections by state", ("state",))
+DB_POOL_WAIT_SECONDS = Counter("db_pool_wait_seconds_total", "Time spent waiting for a pooled connection")
+DB_POOL_WAIT_MAX = Gauge("db_pool_wait_seconds_max", "Longest wait for a pooled connection since start")
+DB_POOL_ACQUIRED = Counter("db_pool_acquired_total", "Connections acquired from the pool")
+COLUMNAR_QUERIES = Counter(
+    "sql_columnar_queries_total", "Queries sent to the columnar copy (SQL_BACKEND=duckdb)", ("result",)
+)
+
+
+@dataclass
+class RequestTrace:
+    """
+    Время по стадиям и SQL одного запроса.
+    """
+    question: str
+    stages: dict[str, float] = field(default_factory=dict)
+    path: str = "unknown"
+    status: str = "ok"
+    sql: str | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.stages.items()]
+        if self.prompt_tokens or self.completion_tokens:
+            parts.append(f"tokens={self.prompt_tokens}+{self.completion_tokens}")
+        return " ".join(parts)
+
+
+_trace: contextvars.ContextVar[RequestTrace | None] = contextvars.ContextVar("request_trace", default=None)
+
+
+def annotate(path: str | None = None, sql: str | None = None) -> None:
+    """
+    Дополняет трассу текущего запроса путём обработки (template / llm / question_cache) и SQL.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return
+    if path is not None:
+        trace.path = path
+    if sql is not None:
+        trace.sql = sql
+
+
+def record_llm_usage(provider: str, prompt_tokens: int | None, completion_tokens: int | None) -> None:
+    """
+    Токены одного вызова LLM: счётчик и гистограмма по провайдеру, сумма в трассе запроса.
+    """
+    prompt_tokens, completion_tokens = prompt_tokens or 0, completion_tokens or 0
+    LLM_TOKENS.inc(prompt_tokens, provider=provider, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, provider=provider, kind="completion")
+    LLM_REQUEST_TOKENS.observe(prompt_tokens, provider=provider, kind="prompt")
+    LLM_REQUEST_TOKENS.observe(completion_tokens, provider=provider, kind="completion")
+    trace = _trace.get()
+    if trace is not None:
+        trace.prompt_tokens += prompt_tokens
+        trace.completion_tokens += completion_tokens
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Замер одной стадии запроса; исключение засчитывается как ошибка этой стадии.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        STAGE_ERRORS.inc(stage=name, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.stages[name] = trace.stages.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def request_trace(question: str) -> Iterator[RequestTrace]:
+    """
+    Трасса запроса: по завершении — строка с таймингами в лог, метрики и журнал медленных запросов.
+    """
+    trace = RequestTrace(question=question)
+    token = _trace.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.status = type(e).__name__
+        raise
+    finally:
+        _trace.reset(token)
+        total = time.perf_counter() - trace.started
+        REQUEST_SECONDS.observe(total, path=trace.path)
+        REQUESTS.inc(path=trace.path, status=trace.status)
+        logger.info("Request %s (%s) in %.1fms: %s", trace.path, trace.status, total * 1000, trace.summary())
+
+        if total * 1000 >= settings.metrics.slow_request_threshold_ms:
+            SLOW_REQUESTS.inc()
+            slow_logger.warning(
+                "Slow request %.1fms (%s): question=%r sql=%r stages: %s",
+                total * 1000, trace.status, trace.question, trace.sql, trace.summary(),
+            )
+
+
+def _collect_pool_stats() -> None:
+    from app.core.db import get_pool_stats
+
+    pool = get_pool_stats()
+    DB_POOL.set(pool.checked_out, state="checked_out")
+    DB_POOL.set(pool.checked_in, state="checked_in")
+    DB_POOL.set(pool.overflow, state="overflow")
+    DB_POOL.set(pool.waiting, state="waiting")
+    DB_POOL_WAIT_MAX.set(pool.wait_seconds_max)
+
+
+register_collector(_collect_pool_stats)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(port: int | None = None) -> web.AppRunner | None:
+    """
+    Поднимает /metrics на METRICS_HOST:METRICS_PORT (METRICS_PORT=0 — выключено).
+    port переопределяет порт (у каждого воркера app.workers — свой).
+    """
+    if port is None:
+        port = settings.metrics.metrics_port
+    if not port:
+        return None
+
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, settings.metrics.metrics_host, port).start()
+    logger.info("Metrics endpoint on http://%s:%d/metrics", settings.metrics.metrics_host, port)
+    return runner
@@ -0,0 +1,314 @@
+"""
+Общее состояние для нескольких процессов/реплик бота: блокировки single-flight и token bucket
+для ограничения частоты запросов.
+
+STATE_BACKEND:
+- memory — внутри процесса (по умолчанию, один воркер);
+- sqlite — файл STATE_SQLITE_PATH, общий для процессов на одной машине;
+- redis — REDIS_URL, общий для процессов и машин (нужен пакет redis).
+Тот же выбор действует для кэшей вопросов и результатов (см. app/core/cache.py).
+"""
+import asyncio
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def refill_bucket(
+    tokens: float | None,
+    updated: float,
+    now: float,
+    rate: float,
+    capacity: float,
+) -> tuple[float, float]:
+    """
+    Один шаг token bucket: пополняет ведро и пытается взять токен.
+    Возвращает (токенов осталось, сколько секунд ждать; 0 — токен выдан).
+    """
+    if tokens is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class StateBackend(ABC):
+    """
+    Примитивы общего состояния.
+    """
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        """
+        Берёт блокировку на ttl секунд. Возвращает токен владельца или None, если она занята.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_lock(self, key: str, token: str) -> None:
+        """
+        Снимает блокировку, только если она всё ещё принадлежит владельцу token.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def take_token(self, key: str, rate: float, capacity: float) -> float:
+        """
+        Token bucket: rate токенов в секунду, не больше capacity.
+        0 — запрос разрешён, иначе — через сколько секунд появится токен.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def return_token(self, key: str, rate: float, capacity: float) -> None:
+        """
+        Возвращает в ведро токен, взятый take_token, если запрос всё-таки не был выполнен.
+        """
+        raise NotImplementedError
+
+
+class MemoryState(StateBackend):
+    """
+    Состояние внутри одного процесса.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[str, tuple[str, float]] = {}
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        now = time.monotonic()
+        held = self._locks.get(key)
+        if held is not None and held[1] > now:
+            return None
+        token = secrets.token_hex(8)
+        self._locks[key] = (token, now + ttl)
+        return token
+
+    async def release_lock(self, key: str, token: str) -> None:
+        held = self._locks.get(key)
+        if held is not None and held[0] == token:
+            del self._locks[key]
+
+    async def take_token(self, key: str, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (None, now))
+        tokens, wait = refill_bucket(tokens, updated, now, rate, capacity)
+        self._buckets[key] = (tokens, now)
+        return wait
+
+    async def return_token(self, key: str, rate: float, capacity: float) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            self._buckets[key] = (min(capacity, bucket[0] + 1), bucket[1])
+
+
+class SQLiteState(StateBackend):
+    """
+    Состояние в sqlite-файле; атомарность между процессами — через BEGIN IMMEDIATE.
+    Вызовы sqlite3 (и ожидание занятого файла до 5 с) идут в потоке, не блокируя event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS shared_state (
+                key        TEXT PRIMARY KEY,
+                value      TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(time.time())
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _get(self, key: str, now: float) -> str | None:
+        row = self._conn.execute(
+            "SELECT value FROM shared_state WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _put(self, key: str, value: str, expires_at: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at),
+        )
+
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        token = secrets.token_hex(8)
+
+        def acquire(now: float) -> str | None:
+            if self._get(f"lock:{key}", now) is not None:
+                return None
+            self._put(f"lock:{key}", token, now + ttl)
+            return token
+
+        return await asyncio.to_thread(self._transaction, acquire)
+
+    def _release(self, key: str, token: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_state WHERE key = ? AND value = ?", (f"lock:{key}", token))
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await asyncio.to_thread(self._release, key, token)
+
+    async def take_token(self, key: str, rate: float, capacity: float) -> float:
+        def take(now: float) -> float:
+            raw = self._get(f"bucket:{key}", now)
+            tokens, updated = json.loads(raw) if raw else (None, now)
+            tokens, wait = refill_bucket(tokens, updated, now, rate, capacity)
+            # полное ведро не хранится дольше, чем нужно на его пополнение
+            self._put(f"bucket:{key}", json.dumps([tokens, now]), now + capacity / rate + 1)
+            return wait
+
+        return await asyncio.to_thread(self._transaction, take)
+
+    async def return_token(self, key: str, rate: float, capacity: float) -> None:
+        def give_back(now: float) -> None:
+            raw = self._get(f"bucket:{key}", now)
+            if raw:
+                tokens, updated = json.loads(raw)
+                tokens = min(capacity, tokens + 1)
+                self._put(f"bucket:{key}", json.dumps([tokens, updated]), now + capacity / rate + 1)
+
+        await asyncio.to_thread(self._transaction, give_back)
+
+
+# Lua-скрипты выполняются в Redis атомарно; время — часы Redis (TIME), а не воркеров:
+# у воркеров на разных машинах часы расходятся, и ведро пополнялось бы по-разному
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_TAKE_TOKEN_LUA = """
+local rate, capacity = tonumber(ARGV[1]), tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+end
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', string.format('%.6f', now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity / rate + 1) * 1000))
+return tostring(wait)
+"""
+
+_RETURN_TOKEN_LUA = """
+local capacity = tonumber(ARGV[1])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens ~= nil then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(capacity, tokens + 1)))
+end
+return 0
+"""
+
+
+@lru_cache
+def redis_client():
+    """
+    Асинхронный клиент Redis по REDIS_URL (пакет redis — опциональная зависимость).
+    """
+    try:
+        import redis.asyncio as redis
+    except ImportError as e:
+        raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+    return redis.from_url(settings.state.redis_url, decode_responses=True)
+
+
+class RedisState(StateBackend):
+    """
+    Состояние в Redis: общее для всех процессов и машин.
+    """
+
+    def __init__(self, client, prefix: str) -> None:
+        self._redis = client
+        self._prefix = prefix
+        self._release = client.register_script(_RELEASE_LOCK_LUA)
+        self._take = client.register_script(_TAKE_TOKEN_LUA)
+        self._return = client.register_script(_RETURN_TOKEN_LUA)
+
+    async def acquire_lock(self, key: str, ttl: float) -> str | None:
+        token = secrets.token_hex(8)
+        ok = await self._redis.set(f"{self._prefix}lock:{key}", token, nx=True, px=max(1, int(ttl * 1000)))
+        return token if ok else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self._release(keys=[f"{self._prefix}lock:{key}"], args=[token])
+
+    async def take_token(self, key: str, rate: float, capacity: float) -> float:
+        wait = await self._take(keys=[f"{self._prefix}bucket:{key}"], args=[rate, capacity])
+        return float(wait)
+
+    async def return_token(self, key: str, rate: float, capacity: float) -> None:
+        await self._return(keys=[f"{self._prefix}bucket:{key}"], args=[capacity])
+
+
+_state: StateBackend | None = None
+
+
+def get_state() -> StateBackend:
+    """
+    Бэкенд общего состояния по STATE_BACKEND.
+    """
+    global _state
+    if _state is None:
+        backend = settings.state.state_backend.lower()
+        if backend == "memory":
+            _state = MemoryState()
+        elif backend == "sqlite":
+            _state = SQLiteState(settings.state.state_sqlite_path)
+        elif backend == "redis":
+            _state = RedisState(redis_client(), settings.state.state_key_prefix)
+        else:
+            raise ValueError(f"Unknown STATE_BACKEND={backend!r}")
+        logger.info("Shared state backend: %s", backend)
+    return _state
+
+
+async def wait_for_value(get, timeout: float, interval: float = 0.05):
+    """
+    Опрашивает get() с растущим интервалом, пока не вернётся значение или не истечёт timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        value = await get()
+        if value is not None:
+            return value
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 2, 0.2)
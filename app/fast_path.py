@@ -0,0 +1,134 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from app.question_normalizer import normalize_question
+from app.sql_rewrite import day_start
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TemplateQuery:
+    """
+    Распознанный шаблонный вопрос: интент, значения слотов и готовый параметризованный SQL.
+    """
+    intent: str
+    sql: str
+    params: dict = field(default_factory=dict)
+
+
+# Все шаблоны сопоставляются с нормализованным вопросом (см. normalize_question):
+# нижний регистр, без пунктуации, даты в YYYY-MM-DD, "id <hex>".
+DATE = r"(\d{4}-\d{2}-\d{2})"
+CREATOR_ID = r"id ([0-9a-f]{8,})"
+NUMBER = r"(\d{1,3}(?: \d{3})+|\d+)"
+ANY_VIDEOS = r"(?:все |всех )?(?:видео|ролик(?:и|ов)?)"
+
+TOTAL_VIDEOS_RE = re.compile(
+    rf"^сколько (?:всего )?{ANY_VIDEOS}(?: (?:всего|есть|в системе|в базе))*$"
+)
+CREATOR_VIDEOS_RE = re.compile(
+    rf"^сколько {ANY_VIDEOS} у (?:креатора|автора)(?: с)? {CREATOR_ID} "
+    rf"(?:вышло|вышли|опубликовано|было опубликовано|выпущено) "
+    rf"(?:с|за период с) {DATE} (?:по|до) {DATE}(?: включительно)?$"
+)
+VIDEOS_OVER_VIEWS_RE = re.compile(
+    rf"^сколько {ANY_VIDEOS} (?:набрало|набрали|имеет|имеют|получило|получили) "
+    rf"(больше|более|свыше|не менее|от) {NUMBER} просмотров(?: за все время)?$"
+)
+SUM_DELTA_VIEWS_RE = re.compile(
+    rf"^на сколько просмотров (?:в сумме |суммарно )?выросл(?:и|о) {ANY_VIDEOS} (?:за )?{DATE}$"
+)
+DISTINCT_VIDEOS_WITH_VIEWS_RE = re.compile(
+    rf"^сколько (?:разных |уникальных )?{ANY_VIDEOS} (?:получали|получили) новые просмотры (?:за )?{DATE}$"
+)
+
+
+SQL_TOTAL_VIDEOS = "SELECT COUNT(*) AS result FROM videos"
+
+SQL_CREATOR_VIDEOS = """
+SELECT COUNT(*) AS result
+FROM videos
+WHERE creator_id = :creator_id
+  AND video_created_at >= :created_from
+  AND video_created_at < :created_to
+"""
+
+SQL_VIDEOS_OVER_VIEWS = "SELECT COUNT(*) AS result FROM videos WHERE views_count > :threshold"
+
+# дневные агрегаты берутся из роллапа video_daily_stats, а не из почасовых video_snapshots
+SQL_SUM_DELTA_VIEWS = """
+SELECT COALESCE(SUM(delta_views_count), 0) AS result
+FROM video_daily_stats
+WHERE day = :day
+"""
+
+SQL_DISTINCT_VIDEOS_WITH_VIEWS = """
+SELECT COUNT(*) AS result
+FROM video_daily_stats
+WHERE day = :day
+  AND views_growth_snapshots > 0
+"""
+
+
+def _number(raw: str) -> int:
+    return int(raw.replace(" ", ""))
+
+
+def match_template(question: str) -> TemplateQuery | None:
+    """
+    Пытается разобрать вопрос без LLM. Возвращает None, если вопрос не похож ни на один шаблон.
+    """
+    text = normalize_question(question)
+
+    try:
+        if TOTAL_VIDEOS_RE.match(text):
+            return TemplateQuery("total_videos", SQL_TOTAL_VIDEOS)
+
+        m = CREATOR_VIDEOS_RE.match(text)
+        if m:
+            date_from, date_to = date.fromisoformat(m.group(2)), date.fromisoformat(m.group(3))
+            if date_from > date_to:
+                return None
+            return TemplateQuery(
+                "creator_videos_in_range",
+                SQL_CREATOR_VIDEOS,
+                {
+                    "creator_id": m.group(1),
+                    # полуинтервал по timestamptz, чтобы работал индекс (creator_id, video_created_at)
+                    "created_from": day_start(date_from),
+                    "created_to": day_start(date_to + timedelta(days=1)),
+                },
+            )
+
+        m = VIDEOS_OVER_VIEWS_RE.match(text)
+        if m:
+            threshold = _number(m.group(2))
+            # "не менее N" / "от N" — нестрогое сравнение
+            if m.group(1) in ("не менее", "от"):
+                threshold -= 1
+            return TemplateQuery("videos_over_views", SQL_VIDEOS_OVER_VIEWS, {"threshold": threshold})
+
+        m = SUM_DELTA_VIEWS_RE.match(text)
+        if m:
+            return TemplateQuery(
+                "sum_delta_views_on_date",
+                SQL_SUM_DELTA_VIEWS,
+                {"day": date.fromisoformat(m.group(1))},
+            )
+
+        m = DISTINCT_VIDEOS_WITH_VIEWS_RE.match(text)
+        if m:
+            return TemplateQuery(
+                "distinct_videos_with_views_on_date",
+                SQL_DISTINCT_VIDEOS_WITH_VIEWS,
+                {"day": date.fromisoformat(m.group(1))},
+            )
+    except ValueError:
+        # некорректная дата — пусть разбирается LLM
+        logger.debug("Template slot parsing failed for %r", text)
+        return None
+
+    return None
@@ -0,0 +1,120 @@
+"""
+Сборка колоночной копии данных для SQL_BACKEND=duckdb (см. app/core/columnar.py).
+
+Копия строится целиком из одного снимка Postgres (транзакция REPEATABLE READ): таблицы
+выгружаются COPY в CSV рядом с файлом копии, DuckDB читает их в новый файл и записывает
+data_version этого снимка. Готовый файл атомарно заменяет старый (os.replace), поэтому боты
+видят либо старую копию, либо новую целиком. video_snapshots сортируется по created_at:
+DuckDB хранит min/max каждой группы строк и пропускает группы вне фильтра по датам.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import asyncpg
+
+from app.core.columnar import META_TABLE, connect
+
+logger = logging.getLogger(__name__)
+
+_TIMESTAMP = "TIMESTAMPTZ"
+
+COLUMNAR_TABLES: dict[str, dict[str, str]] = {
+    "videos": {
+        "id": "TEXT",
+        "creator_id": "TEXT",
+        "video_created_at": _TIMESTAMP,
+        "views_count": "BIGINT",
+        "likes_count": "BIGINT",
+        "comments_count": "BIGINT",
+        "reports_count": "BIGINT",
+        "created_at": _TIMESTAMP,
+        "updated_at": _TIMESTAMP,
+    },
+    "video_snapshots": {
+        "id": "TEXT",
+        "video_id": "TEXT",
+        "views_count": "BIGINT",
+        "likes_count": "BIGINT",
+        "comments_count": "BIGINT",
+        "reports_count": "BIGINT",
+        "delta_views_count": "BIGINT",
+        "delta_likes_count": "BIGINT",
+        "delta_comments_count": "BIGINT",
+        "delta_reports_count": "BIGINT",
+        "created_at": _TIMESTAMP,
+        "updated_at": _TIMESTAMP,
+    },
+    "video_daily_stats": {
+        "day": "DATE",
+        "video_id": "TEXT",
+        "creator_id": "TEXT",
+        "delta_views_count": "BIGINT",
+        "delta_likes_count": "BIGINT",
+        "delta_comments_count": "BIGINT",
+        "delta_reports_count": "BIGINT",
+        "snapshots_count": "INTEGER",
+        "views_growth_snapshots": "INTEGER",
+    },
+}
+
+# порядок строк в копии: по нему DuckDB отсекает группы строк при фильтрах
+_ORDER_BY = {
+    "videos": "video_created_at",
+    "video_snapshots": "created_at",
+    "video_daily_stats": "day",
+}
+
+
+def _write_copy(path: str, csv_dir: str, version: int) -> None:
+    con = connect(path)
+    try:
+        for table, columns in COLUMNAR_TABLES.items():
+            types = ", ".join(f"'{name}': '{type_}'" for name, type_ in columns.items())
+            csv_path = os.path.join(csv_dir, f"{table}.csv").replace("'", "''")
+            con.execute(
+                f"CREATE TABLE {table} AS "
+                f"SELECT * FROM read_csv('{csv_path}', header = false, columns = {{{types}}}) "
+                f"ORDER BY {_ORDER_BY[table]}"
+            )
+        con.execute(f"CREATE TABLE {META_TABLE} AS SELECT ?::BIGINT AS version", [version])
+    finally:
+        con.close()
+
+
+async def build_columnar_copy(conn: asyncpg.Connection, path: str) -> int:
+    """
+    Пересобирает файл копии по текущему состоянию Postgres. Возвращает data_version копии.
+    """
+    started = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(path))
+    csv_dir = tempfile.mkdtemp(prefix="columnar-", dir=directory)
+    tmp_path = f"{path}.tmp"
+    try:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            # время в CSV — с явным смещением UTC, DuckDB читает его без расширения icu
+            await conn.execute("SET LOCAL timezone TO 'UTC'")
+            version = await conn.fetchval("SELECT version FROM data_version")
+            for table, columns in COLUMNAR_TABLES.items():
+                await conn.copy_from_query(
+                    f"SELECT {', '.join(columns)} FROM {table}",
+                    output=os.path.join(csv_dir, f"{table}.csv"),
+                    format="csv",
+                )
+
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        await asyncio.to_thread(_write_copy, tmp_path, csv_dir, version)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(csv_dir, ignore_errors=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    logger.info(
+        "Columnar copy %s built in %.1fs, data version %d", path, time.perf_counter() - started, version,
+    )
+    return version
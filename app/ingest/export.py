@@ -0,0 +1,232 @@
+"""
+Компактная колоночная выгрузка для загрузчика: файл DuckDB (*.duckdb) с нормализованными строками
+videos и video_snapshots — теми же, что загрузчик пишет в Postgres.
+
+Выгрузка делается один раз из JSON / JSON Lines (в том числе сжатых):
+    python -m app.ingest.export /app/data/videos.jsonl.zst /app/data/videos.duckdb
+и занимает в разы меньше исходного JSON. Повторная загрузка такого файла (LOADER_PATH или LOADER_DROP_DIR)
+не разбирает JSON в Python: для каждой пачки DuckDB пишет CSV, который Postgres читает COPY сам.
+Строки разбиты на пачки по LOADER_BATCH_SIZE ещё при выгрузке (столбец batch), видео и его snapshots —
+в одной пачке, как и при загрузке JSON. Время хранится как TIMESTAMP в UTC: так оно не зависит
+от часового пояса процесса и расширения icu.
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.ingest.columnar import COLUMNAR_TABLES
+from app.ingest.reader import SNAPSHOT_COLUMNS, VIDEO_COLUMNS, iter_batches, iter_videos
+from app.ingest.writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+EXPORT_SUFFIX = ".duckdb"
+# служебная таблица выгрузки с версией формата
+META_TABLE = "loader_export"
+FORMAT_VERSION = 1
+
+_TABLES = {"videos": VIDEO_COLUMNS, "video_snapshots": SNAPSHOT_COLUMNS}
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f+00"
+
+
+def _import_duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise RuntimeError("Loader export files require the 'duckdb' package (pip install duckdb)") from e
+    return duckdb
+
+
+def is_export(path: str) -> bool:
+    return path.endswith(EXPORT_SUFFIX)
+
+
+def _select_utc(table: str) -> str:
+    # TIMESTAMPTZ → TIMESTAMP через микросекунды эпохи: без участия часового пояса сессии
+    columns = ", ".join(
+        f"make_timestamp(epoch_us({name})) AS {name}" if type_ == "TIMESTAMPTZ" else name
+        for name, type_ in COLUMNAR_TABLES[table].items()
+    )
+    return f"batch, {columns}"
+
+
+def _write_export(path: str, csv_dir: str) -> None:
+    con = _import_duckdb().connect(path)
+    try:
+        for table in _TABLES:
+            types = ", ".join(
+                f"'{name}': '{type_}'" for name, type_ in {"batch": "INTEGER", **COLUMNAR_TABLES[table]}.items()
+            )
+            csv_path = os.path.join(csv_dir, f"{table}.csv").replace("'", "''")
+            order = "batch, created_at" if table == "video_snapshots" else "batch"
+            con.execute(
+                f"CREATE TABLE {table} AS "
+                f"SELECT {_select_utc(table)} FROM read_csv('{csv_path}', header = false, columns = {{{types}}}) "
+                f"ORDER BY {order}"
+            )
+        con.execute(f"CREATE TABLE {META_TABLE} AS SELECT ?::INTEGER AS format_version", [FORMAT_VERSION])
+    finally:
+        con.close()
+
+
+def export_dump(source: str, target: str, batch_size: int, use_mmap: bool = False) -> tuple[int, int]:
+    """
+    Переписывает выгрузку source в колоночный файл target. Возвращает число видео и snapshots.
+    """
+    started = time.perf_counter()
+    videos = snapshots = 0
+    csv_dir = tempfile.mkdtemp(prefix="export-", dir=os.path.dirname(os.path.abspath(target)))
+    tmp_path = f"{target}.tmp"
+    try:
+        with (
+            open(os.path.join(csv_dir, "videos.csv"), "w", newline="", encoding="utf-8") as videos_file,
+            open(os.path.join(csv_dir, "video_snapshots.csv"), "w", newline="", encoding="utf-8") as snapshots_file,
+        ):
+            videos_csv, snapshots_csv = csv.writer(videos_file), csv.writer(snapshots_file)
+            batches = iter_batches(iter_videos(source, use_mmap=use_mmap), batch_size)
+            for batch, (video_rows, snapshot_rows) in enumerate(batches):
+                videos_csv.writerows((batch, *row) for row in video_rows)
+                snapshots_csv.writerows((batch, *row) for row in snapshot_rows)
+                videos += len(video_rows)
+                snapshots += len(snapshot_rows)
+
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        _write_export(tmp_path, csv_dir)
+        os.replace(tmp_path, target)
+    finally:
+        shutil.rmtree(csv_dir, ignore_errors=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    logger.info(
+        "Exported %d videos, %d snapshots from %s to %s (%.1f MB) in %.1fs",
+        videos, snapshots, source, target, os.path.getsize(target) / 2**20, time.perf_counter() - started,
+    )
+    return videos, snapshots
+
+
+def _utc_literal(value: datetime) -> str:
+    return f"TIMESTAMP '{value.astimezone(timezone.utc).replace(tzinfo=None).isoformat(sep=' ')}'"
+
+
+class _ExportReader:
+    """
+    Выбирает из файла выгрузки строки одной пачки в CSV для COPY.
+    """
+
+    def __init__(self, path: str, since: datetime | None, cutoff: datetime | None) -> None:
+        self.con = _import_duckdb().connect(path, read_only=True)
+        version = self.con.execute(f"SELECT max(format_version) FROM {META_TABLE}").fetchone()[0]
+        if version != FORMAT_VERSION:
+            self.con.close()
+            raise ValueError(f"{path}: unsupported export format version {version}")
+        self.since = since
+        self.cutoff = cutoff
+
+    def _video_filter(self, batch: int) -> str:
+        conditions = [f"batch = {batch}"]
+        if self.since is not None:
+            conditions.append(f"updated_at > {_utc_literal(self.since)}")
+        return " AND ".join(conditions)
+
+    def _snapshot_filter(self, batch: int) -> str:
+        conditions = [f"batch = {batch}"]
+        if self.since is not None:
+            # как в iter_changed_videos: только новые snapshots обновлённых видео
+            conditions.append(f"updated_at > {_utc_literal(self.since)}")
+            conditions.append(f"video_id IN (SELECT id FROM videos WHERE {self._video_filter(batch)})")
+        if self.cutoff is not None:
+            conditions.append(f"created_at >= {_utc_literal(self.cutoff)}")
+        return " AND ".join(conditions)
+
+    def batches(self) -> int:
+        last = self.con.execute("SELECT max(batch) FROM videos").fetchone()[0]
+        return 0 if last is None else last + 1
+
+    def _copy(self, table: str, where: str, path: str) -> int:
+        columns = ", ".join(_TABLES[table])
+        escaped = path.replace("'", "''")
+        return self.con.execute(
+            f"COPY (SELECT {columns} FROM {table} WHERE {where}) TO '{escaped}' "
+            f"(FORMAT csv, HEADER false, TIMESTAMPFORMAT '{_TIMESTAMP_FORMAT}')"
+        ).fetchone()[0]
+
+    def write_batch(self, batch: int, csv_dir: str) -> tuple[str | None, str | None, int, int, set, datetime | None]:
+        videos_csv = os.path.join(csv_dir, "videos.csv")
+        snapshots_csv = os.path.join(csv_dir, "video_snapshots.csv")
+        video_filter, snapshot_filter = self._video_filter(batch), self._snapshot_filter(batch)
+        videos = self._copy("videos", video_filter, videos_csv)
+        snapshots = self._copy("video_snapshots", snapshot_filter, snapshots_csv)
+        months = {
+            row[0].replace(tzinfo=timezone.utc)
+            for row in self.con.execute(
+                f"SELECT DISTINCT date_trunc('month', created_at) FROM video_snapshots WHERE {snapshot_filter}"
+            ).fetchall()
+        }
+        # watermark — по всем строкам пачки, как и при загрузке JSON
+        watermark = self.con.execute(
+            "SELECT greatest("
+            f"(SELECT max(updated_at) FROM videos WHERE {video_filter}), "
+            f"(SELECT max(updated_at) FROM video_snapshots WHERE {snapshot_filter}))"
+        ).fetchone()[0]
+        return (
+            videos_csv if videos else None,
+            snapshots_csv if snapshots else None,
+            videos,
+            snapshots,
+            months,
+            watermark.replace(tzinfo=timezone.utc) if watermark is not None else None,
+        )
+
+    def close(self) -> None:
+        self.con.close()
+
+
+async def write_export(
+    writer: BatchWriter,
+    path: str,
+    since: datetime | None,
+) -> AsyncIterator[tuple[int, int, datetime | None]]:
+    """
+    Загружает файл выгрузки пачками; после каждой отдаёт (видео, snapshots, watermark) пачки.
+    """
+    reader = _ExportReader(path, since, writer.partitions.cutoff)
+    csv_dir = tempfile.mkdtemp(prefix="export-load-")
+    try:
+        for batch in range(reader.batches()):
+            videos_csv, snapshots_csv, videos, snapshots, months, watermark = await asyncio.to_thread(
+                reader.write_batch, batch, csv_dir,
+            )
+            if videos_csv or snapshots_csv:
+                await writer.write_csv(videos_csv, snapshots_csv, months)
+            yield videos, snapshots, watermark
+    finally:
+        reader.close()
+        shutil.rmtree(csv_dir, ignore_errors=True)
+
+
+def main() -> None:
+    from app.core.logging_conf import setup_logging
+
+    parser = argparse.ArgumentParser(description="Export a JSON / JSON Lines dump to the loader's columnar format")
+    parser.add_argument("source", help="*.json, *.jsonl, optionally .gz / .zst")
+    parser.add_argument("target", help=f"*{EXPORT_SUFFIX}")
+    parser.add_argument("--batch-size", type=int, default=settings.loader.loader_batch_size)
+    args = parser.parse_args()
+    if not is_export(args.target):
+        parser.error(f"target must end with {EXPORT_SUFFIX}")
+    setup_logging()
+    export_dump(args.source, args.target, args.batch_size, settings.loader.loader_mmap)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Месячные партиции video_snapshots (по created_at, границы — начала месяцев в UTC).
+
+Партиция месяца называется video_snapshots_YYYY_MM и создаётся функцией БД
+create_snapshot_partitions (её ставит миграция): загрузчик при каждом запуске заводит партиции
+на SNAPSHOT_PARTITIONS_AHEAD месяцев вперёд, а для пачек с более старыми замерами — недостающие
+месяцы перед записью пачки, вне её транзакции (DDL на родительской таблице берёт сильную блокировку).
+
+SNAPSHOT_RETENTION_MONTHS > 0 — хранить замеры только за столько последних месяцев: старые
+партиции отсоединяются и удаляются целиком (без DELETE и VACUUM), замеры старше срока загрузчик
+пропускает, а из роллапа video_daily_stats убираются те же дни — иначе ответ на вопрос о старой
+дате зависел бы от того, переписан ли запрос на роллап.
+"""
+import logging
+import re
+from datetime import datetime, timezone
+
+import asyncpg
+
+from app.core.config import settings
+from app.ingest.reader import SNAPSHOT_COLUMNS
+from app.ingest.rollup import trim_daily_stats
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_SQL = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'video_snapshots'::regclass
+"""
+
+_PARTITION_NAME_RE = re.compile(r"^video_snapshots_(\d{4})_(\d{2})$")
+
+_CREATED_AT = SNAPSHOT_COLUMNS.index("created_at")
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def retention_cutoff(now: datetime | None = None) -> datetime | None:
+    """
+    Начало самого старого хранимого месяца; None — хранить всё.
+    """
+    months = settings.loader.snapshot_retention_months
+    if months <= 0:
+        return None
+    return add_months(month_start(now or datetime.now(timezone.utc)), -(months - 1))
+
+
+def _partition_month(name: str) -> datetime | None:
+    m = _PARTITION_NAME_RE.match(name)
+    if m is None:
+        return None
+    return datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=timezone.utc)
+
+
+async def create_partitions(conn: asyncpg.Connection, first: datetime, last: datetime) -> int:
+    # параллельные загрузчики могут одновременно захотеть один и тот же месяц
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock(hashtext('create_snapshot_partitions'))")
+        created = await conn.fetchval("SELECT create_snapshot_partitions($1, $2)", first, last)
+    if created:
+        logger.info("Created %d video_snapshots partitions for %s..%s", created, first.date(), last.date())
+    return created
+
+
+async def ensure_future_partitions(conn: asyncpg.Connection) -> int:
+    """
+    Партиции текущего месяца и SNAPSHOT_PARTITIONS_AHEAD следующих.
+    """
+    current = month_start(datetime.now(timezone.utc))
+    return await create_partitions(conn, current, add_months(current, settings.loader.snapshot_partitions_ahead))
+
+
+async def drop_expired_partitions(conn: asyncpg.Connection) -> list[str]:
+    """
+    Удаляет партиции месяцев старше SNAPSHOT_RETENTION_MONTHS. Возвращает имена удалённых.
+    """
+    cutoff = retention_cutoff()
+    if cutoff is None:
+        return []
+    expired = sorted(
+        name for name in (row[0] for row in await conn.fetch(PARTITIONS_SQL))
+        if (month := _partition_month(name)) is not None and month < cutoff
+    )
+    for name in expired:
+        async with conn.transaction():
+            await conn.execute(f"ALTER TABLE video_snapshots DETACH PARTITION {name}")
+            await conn.execute(f"DROP TABLE {name}")
+    if expired:
+        await trim_daily_stats(conn, cutoff)
+        logger.info("Retention: dropped video_snapshots partitions %s", ", ".join(expired))
+    return expired
+
+
+class SnapshotPartitions:
+    """
+    Партиции для пачек загрузчика: отбрасывает замеры старше срока хранения
+    и создаёт недостающие месяцы, помня уже существующие.
+    """
+
+    def __init__(self, conn: asyncpg.Connection) -> None:
+        self.conn = conn
+        self.cutoff = retention_cutoff()
+        self._months: set[datetime] = set()
+
+    async def load(self) -> None:
+        self._months = {
+            month for month in (_partition_month(row[0]) for row in await self.conn.fetch(PARTITIONS_SQL))
+            if month is not None
+        }
+
+    def keep(self, snapshot_rows: list[tuple]) -> list[tuple]:
+        if self.cutoff is None:
+            return snapshot_rows
+        return [row for row in snapshot_rows if row[_CREATED_AT] >= self.cutoff]
+
+    async def ensure(self, snapshot_rows: list[tuple]) -> None:
+        await self.ensure_months({month_start(row[_CREATED_AT]) for row in snapshot_rows})
+
+    async def ensure_months(self, months: set[datetime]) -> None:
+        for month in sorted(months - self._months):
+            await create_partitions(self.conn, month, month)
+            self._months.add(month)
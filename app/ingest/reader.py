@@ -0,0 +1,284 @@
+import codecs
+import gzip
+import io
+import json
+import mmap
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import IO
+
+CHUNK_SIZE = 1 << 20
+
+VIDEO_COLUMNS = (
+    "id", "creator_id", "video_created_at",
+    "views_count", "likes_count", "comments_count", "reports_count",
+    "created_at", "updated_at",
+)
+
+SNAPSHOT_COLUMNS = (
+    "id", "video_id",
+    "views_count", "likes_count", "comments_count", "reports_count",
+    "delta_views_count", "delta_likes_count",
+    "delta_comments_count", "delta_reports_count",
+    "created_at", "updated_at",
+)
+
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+DUMP_SUFFIXES = (".json",) + JSON_LINES_SUFFIXES
+# сжатые выгрузки читаются потоком, без распаковки на диск
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_dt(value: str) -> datetime:
+    """
+    функция для приведения к datetime;
+    замеры почасовые, и одни и те же отметки времени повторяются у всех видео — разбор кэшируется
+    """
+    return datetime.fromisoformat(value)
+
+
+def _iter_array_items(f: IO[str]) -> Iterator[dict]:
+    """
+    Потоково читает JSON вида [...] или {"videos": [...]} и отдаёт элементы массива по одному.
+    В памяти держится только текущий кусок файла, а не весь документ.
+    """
+    buf = f.read(CHUNK_SIZE)
+    eof = not buf
+    pos = 0
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip(chars: str) -> str:
+        # пропускает символы chars и возвращает следующий значимый символ ("" на EOF)
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not more():
+                return ""
+
+    first = skip(_WHITESPACE)
+    if first == "{":
+        # ищем ключ "videos" на верхнем уровне
+        while True:
+            idx = buf.find('"videos"', pos)
+            if idx != -1:
+                pos = idx + len('"videos"')
+                break
+            pos = max(pos, len(buf) - len('"videos"'))
+            if not more():
+                raise ValueError('JSON object has no "videos" key')
+        if skip(_WHITESPACE) != ":":
+            raise ValueError('Expected ":" after "videos"')
+        pos += 1
+        first = skip(_WHITESPACE)
+
+    if first != "[":
+        raise ValueError("Expected JSON array of videos")
+    pos += 1
+
+    while True:
+        ch = skip(_WHITESPACE + ",")
+        if ch == "]":
+            return
+        if ch == "":
+            raise ValueError("Unexpected end of JSON input")
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                # объект не поместился в буфер — дочитываем
+                if not more():
+                    raise
+        pos = end
+        yield item
+
+
+def _split_compression(path: str) -> tuple[str, str | None]:
+    for suffix, compression in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return path[:-len(suffix)], compression
+    return path, None
+
+
+def is_dump(path: str) -> bool:
+    """
+    Файл выгрузки JSON или JSON Lines, возможно сжатый gzip/zstd.
+    """
+    return _split_compression(path)[0].endswith(DUMP_SUFFIXES)
+
+
+def is_compressed(path: str) -> bool:
+    return _split_compression(path)[1] is not None
+
+
+def is_json_lines(path: str) -> bool:
+    """
+    Выгрузка в формате JSON Lines: одна строка — одно видео вместе со своими snapshots.
+    """
+    return _split_compression(path)[0].endswith(JSON_LINES_SUFFIXES)
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("Reading .zst dumps requires the 'zstandard' package (pip install zstandard)") from e
+    return zstandard
+
+
+@contextmanager
+def open_dump(path: str, use_mmap: bool = False) -> Iterator[IO[bytes] | mmap.mmap]:
+    """
+    Открывает выгрузку как поток байт: сжатую — с распаковкой на лету,
+    несжатую при use_mmap — отображением в память (чтение без копий в буфер файла).
+    """
+    compression = _split_compression(path)[1]
+    with open(path, "rb") as raw:
+        if compression == "gzip":
+            with gzip.GzipFile(fileobj=raw) as f:
+                yield f
+        elif compression == "zstd":
+            zstandard = _import_zstandard()
+            with zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+                yield io.BufferedReader(reader, CHUNK_SIZE)
+        elif use_mmap and os.fstat(raw.fileno()).st_size:
+            with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+                yield mm
+        else:
+            yield raw
+
+
+def split_line_ranges(path: str, parts: int) -> list[tuple[int, int]]:
+    """
+    Делит несжатый файл JSON Lines на parts диапазонов байт [start, end), границы — начала строк.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            # с позиции на байт раньше: если она сама — начало строки, readline съест только "\n"
+            f.seek(max(size * i // parts - 1, 0))
+            f.readline()
+            bound = f.tell()
+            if bounds[-1] < bound < size:
+                bounds.append(bound)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _iter_json_lines(f: IO[bytes] | mmap.mmap, start: int, end: int | None) -> Iterator[dict]:
+    if start:
+        f.seek(start)
+    pos = start
+    while end is None or pos < end:
+        line = f.readline()
+        if not line:
+            return
+        pos += len(line)
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_videos(path: str, start: int = 0, end: int | None = None, use_mmap: bool = False) -> Iterator[dict]:
+    """
+    Генератор видео (вместе со snapshots) из файла выгрузки.
+    Для несжатого JSON Lines можно прочитать только строки, начинающиеся в диапазоне байт [start, end).
+    """
+    json_lines = is_json_lines(path)
+    if (start or end is not None) and (not json_lines or is_compressed(path)):
+        raise ValueError("Byte ranges are supported only for uncompressed JSON Lines input")
+    with open_dump(path, use_mmap) as f:
+        if json_lines:
+            yield from _iter_json_lines(f, start, end)
+        elif isinstance(f, mmap.mmap):
+            yield from _iter_array_items(codecs.getreader("utf-8")(f))
+        else:
+            yield from _iter_array_items(io.TextIOWrapper(f, encoding="utf-8"))
+
+
+def iter_changed_videos(videos: Iterator[dict], since: datetime) -> Iterator[dict]:
+    """
+    Инкрементальный режим: пропускает видео, не обновлявшиеся после since, и уже загруженные snapshots.
+    Новый снапшот всегда сопровождается обновлением итогов видео, поэтому у пропущенного видео новых snapshots нет.
+    """
+    for video in videos:
+        if parse_dt(video["updated_at"]) <= since:
+            continue
+        snapshots = video.get("snapshots")
+        if snapshots:
+            video["snapshots"] = [s for s in snapshots if parse_dt(s["updated_at"]) > since]
+        yield video
+
+
+def video_record(video: dict) -> tuple:
+    return (
+        video["id"],
+        video["creator_id"],
+        parse_dt(video["video_created_at"]),
+        video["views_count"],
+        video["likes_count"],
+        video["comments_count"],
+        video["reports_count"],
+        parse_dt(video["created_at"]),
+        parse_dt(video["updated_at"]),
+    )
+
+
+def snapshot_record(video_id: str, snap: dict) -> tuple:
+    return (
+        snap["id"],
+        video_id,
+        snap["views_count"],
+        snap["likes_count"],
+        snap["comments_count"],
+        snap["reports_count"],
+        snap["delta_views_count"],
+        snap["delta_likes_count"],
+        snap["delta_comments_count"],
+        snap["delta_reports_count"],
+        parse_dt(snap["created_at"]),
+        parse_dt(snap["updated_at"]),
+    )
+
+
+def iter_batches(videos: Iterator[dict], batch_size: int) -> Iterator[tuple[list[tuple], list[tuple]]]:
+    """
+    Нарезает поток видео на пачки (videos, snapshots) примерно по batch_size строк.
+    Видео и все его snapshots всегда попадают в одну пачку — внешний ключ не нарушается.
+    """
+    video_rows: list[tuple] = []
+    snapshot_rows: list[tuple] = []
+
+    for video in videos:
+        video_rows.append(video_record(video))
+        for snap in video.get("snapshots", ()):
+            snapshot_rows.append(snapshot_record(video["id"], snap))
+
+        if len(video_rows) + len(snapshot_rows) >= batch_size:
+            yield video_rows, snapshot_rows
+            video_rows, snapshot_rows = [], []
+
+    if video_rows:
+        yield video_rows, snapshot_rows
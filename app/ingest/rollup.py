@@ -0,0 +1,108 @@
+"""
+Поддержка дневного роллапа video_daily_stats.
+
+День снапшота — дата created_at в часовом поясе DB_TIMEZONE, т.е. ровно то,
+что возвращает created_at::date в сессиях бота.
+"""
+from datetime import datetime
+
+import asyncpg
+
+from app.core.config import settings
+
+_DAILY_STATS_COLUMNS = """
+    day, video_id, creator_id,
+    delta_views_count, delta_likes_count, delta_comments_count, delta_reports_count,
+    snapshots_count, views_growth_snapshots
+"""
+
+_DAILY_STATS_SELECT = """
+    SELECT (s.created_at AT TIME ZONE :tz)::date AS day,
+           s.video_id,
+           v.creator_id,
+           SUM(s.delta_views_count),
+           SUM(s.delta_likes_count),
+           SUM(s.delta_comments_count),
+           SUM(s.delta_reports_count),
+           COUNT(*),
+           COUNT(*) FILTER (WHERE s.delta_views_count > 0)
+"""
+
+# построение с нуля по всей истории (первичная загрузка); параметр :tz
+BUILD_DAILY_STATS_SQL = f"""
+    INSERT INTO video_daily_stats ({_DAILY_STATS_COLUMNS})
+    {_DAILY_STATS_SELECT}
+    FROM video_snapshots s
+    JOIN videos v ON v.id = s.video_id
+    GROUP BY 1, 2, 3
+"""
+
+# пересчёт только тех (видео, день), которые затронуты пачкой в video_snapshots_stage
+REFRESH_DAILY_STATS_SQL = f"""
+    WITH affected AS (
+        SELECT DISTINCT video_id, (created_at AT TIME ZONE :tz)::date AS day
+        FROM video_snapshots_stage
+    )
+    INSERT INTO video_daily_stats ({_DAILY_STATS_COLUMNS})
+    {_DAILY_STATS_SELECT}
+    FROM affected a
+    JOIN video_snapshots s
+      ON s.video_id = a.video_id
+     AND s.created_at >= a.day::timestamp AT TIME ZONE :tz
+     AND s.created_at < (a.day + 1)::timestamp AT TIME ZONE :tz
+    JOIN videos v ON v.id = s.video_id
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, video_id) DO UPDATE SET
+        delta_views_count = EXCLUDED.delta_views_count,
+        delta_likes_count = EXCLUDED.delta_likes_count,
+        delta_comments_count = EXCLUDED.delta_comments_count,
+        delta_reports_count = EXCLUDED.delta_reports_count,
+        snapshots_count = EXCLUDED.snapshots_count,
+        views_growth_snapshots = EXCLUDED.views_growth_snapshots
+"""
+
+# после удаления старых партиций: дни до срока хранения убираются, а день, на который пришлась
+# граница (в DB_TIMEZONE он может начаться раньше начала месяца в UTC), пересчитывается по остатку
+TRIM_DAILY_STATS_SQL = """
+    DELETE FROM video_daily_stats
+    WHERE day <= ($2::timestamptz AT TIME ZONE :tz)::date
+"""
+
+BUILD_BOUNDARY_DAY_SQL = f"""
+    INSERT INTO video_daily_stats ({_DAILY_STATS_COLUMNS})
+    {_DAILY_STATS_SELECT}
+    FROM video_snapshots s
+    JOIN videos v ON v.id = s.video_id
+    WHERE s.created_at >= $2::timestamptz
+      AND s.created_at < (($2::timestamptz AT TIME ZONE :tz)::date + 1)::timestamp AT TIME ZONE :tz
+    GROUP BY 1, 2, 3
+"""
+
+
+def _asyncpg(sql: str) -> str:
+    return sql.replace(":tz", "$1::text")
+
+
+async def refresh_daily_stats(conn: asyncpg.Connection) -> None:
+    """
+    Инкрементально обновляет роллап по содержимому video_snapshots_stage (в транзакции пачки).
+    """
+    await conn.execute(_asyncpg(REFRESH_DAILY_STATS_SQL), settings.database.db_timezone)
+
+
+async def rebuild_daily_stats(conn: asyncpg.Connection) -> None:
+    """
+    Полностью пересчитывает роллап.
+    """
+    async with conn.transaction():
+        await conn.execute("TRUNCATE video_daily_stats")
+        await conn.execute(_asyncpg(BUILD_DAILY_STATS_SQL), settings.database.db_timezone)
+
+
+async def trim_daily_stats(conn: asyncpg.Connection, cutoff: datetime) -> None:
+    """
+    Убирает из роллапа всё, что раньше cutoff (срок хранения замеров).
+    """
+    async with conn.transaction():
+        await conn.execute(_asyncpg(TRIM_DAILY_STATS_SQL), settings.database.db_timezone, cutoff)
+        await conn.execute(_asyncpg(BUILD_BOUNDARY_DAY_SQL), settings.database.db_timezone, cutoff)
@@ -0,0 +1,62 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import asyncpg
+
+
+@dataclass(frozen=True)
+class FileState:
+    """
+    Что мы помним о ранее загруженном файле.
+    """
+    size: int
+    mtime: float
+    watermark: datetime | None
+
+    def matches(self, path: str) -> bool:
+        st = os.stat(path)
+        return st.st_size == self.size and st.st_mtime == self.mtime
+
+
+async def get_file_state(conn: asyncpg.Connection, name: str) -> FileState | None:
+    row = await conn.fetchrow(
+        "SELECT size, mtime, watermark FROM ingested_files WHERE name = $1", name
+    )
+    if row is None:
+        return None
+    return FileState(size=row["size"], mtime=row["mtime"], watermark=row["watermark"])
+
+
+async def save_file_state(
+    conn: asyncpg.Connection,
+    name: str,
+    path: str,
+    watermark: datetime | None,
+) -> None:
+    st = os.stat(path)
+    await conn.execute(
+        """
+        INSERT INTO ingested_files (name, size, mtime, watermark, loaded_at)
+        VALUES ($1, $2, $3, $4, now())
+        ON CONFLICT (name) DO UPDATE
+            SET size = EXCLUDED.size,
+                mtime = EXCLUDED.mtime,
+                watermark = GREATEST(ingested_files.watermark, EXCLUDED.watermark),
+                loaded_at = now()
+        """,
+        name, st.st_size, st.st_mtime, watermark,
+    )
+
+
+DATA_VERSION_CHANNEL = "data_version"
+
+
+async def bump_data_version(conn: asyncpg.Connection) -> int:
+    """
+    Отмечает, что данные изменились: увеличивает data_version и уведомляет ботов через NOTIFY.
+    """
+    async with conn.transaction():
+        version = await conn.fetchval("UPDATE data_version SET version = version + 1 RETURNING version")
+        await conn.execute("SELECT pg_notify($1, $2)", DATA_VERSION_CHANNEL, str(version))
+    return version
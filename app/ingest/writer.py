@@ -0,0 +1,200 @@
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import asyncpg
+
+from app.ingest.partitions import SnapshotPartitions
+from app.ingest.reader import SNAPSHOT_COLUMNS, VIDEO_COLUMNS
+from app.ingest.rollup import refresh_daily_stats
+
+logger = logging.getLogger(__name__)
+
+# временные staging-таблицы живут в рамках соединения и очищаются на каждом коммите
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS videos_stage
+        (LIKE videos INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+    CREATE TEMP TABLE IF NOT EXISTS video_snapshots_stage
+        (LIKE video_snapshots INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+"""
+
+VIDEO_TOTALS = ("views_count", "likes_count", "comments_count", "reports_count")
+
+# итоги по видео обновляются, только если что-то действительно изменилось и версия не старее записанной
+# (параллельные загрузчики могут закоммитить пачки не по порядку);
+# DISTINCT ON — на случай нескольких версий одного видео в пачке, ORDER BY id — строки видео
+# блокируются в одном порядке во всех транзакциях, без взаимоблокировок
+UPSERT_VIDEOS_SQL = f"""
+    INSERT INTO videos ({", ".join(VIDEO_COLUMNS)})
+    SELECT DISTINCT ON (id) {", ".join(VIDEO_COLUMNS)} FROM videos_stage
+    ORDER BY id, updated_at DESC
+    ON CONFLICT (id) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in VIDEO_TOTALS + ("updated_at",))}
+    WHERE ({", ".join(f"videos.{c}" for c in VIDEO_TOTALS)})
+        IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in VIDEO_TOTALS)})
+      AND videos.updated_at <= EXCLUDED.updated_at
+"""
+
+UPSERT_SNAPSHOTS_SQL = f"""
+    INSERT INTO video_snapshots ({", ".join(SNAPSHOT_COLUMNS)})
+    SELECT {", ".join(SNAPSHOT_COLUMNS)} FROM video_snapshots_stage
+    ON CONFLICT (id, created_at) DO NOTHING
+"""
+
+
+# вторичные (не уникальные) индексы и внешние ключи, которые можно перестроить после загрузки
+SECONDARY_INDEXES_SQL = """
+    SELECT i.indexname, i.indexdef
+    FROM pg_indexes i
+    JOIN pg_class c ON c.relname = i.indexname
+    JOIN pg_index x ON x.indexrelid = c.oid
+    WHERE i.schemaname = current_schema()
+      AND i.tablename = $1
+      AND NOT x.indisunique
+"""
+
+FOREIGN_KEYS_SQL = """
+    SELECT conname, pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE conrelid = $1::regclass AND contype = 'f'
+"""
+
+
+# снятые индексы и FK (таблица из миграции): переживают падение загрузки
+RECORD_DEFERRED_SQL = """
+    INSERT INTO loader_deferred_ddl (name, table_name, kind, statement) VALUES ($1, $2, $3, $4)
+"""
+PENDING_DEFERRED_SQL = """
+    SELECT name, table_name, statement FROM loader_deferred_ddl ORDER BY kind = 'foreign_key', name
+"""
+# одна первичная загрузка за раз: другой загрузчик не должен восстановить индексы посреди неё
+DEFERRED_LOCK_SQL = "SELECT pg_advisory_lock(hashtext('loader_deferred_ddl'))"
+DEFERRED_UNLOCK_SQL = "SELECT pg_advisory_unlock(hashtext('loader_deferred_ddl'))"
+
+
+async def _restore_pending(conn: asyncpg.Connection) -> int:
+    restored = 0
+    for name, table, statement in await conn.fetch(PENDING_DEFERRED_SQL):
+        async with conn.transaction():
+            await conn.execute(statement)
+            await conn.execute("DELETE FROM loader_deferred_ddl WHERE name = $1", name)
+        logger.info("Restored %s on %s", name, table)
+        restored += 1
+    return restored
+
+
+async def restore_deferred_indexes(conn: asyncpg.Connection) -> int:
+    """
+    Создаёт индексы и внешние ключи, оставшиеся снятыми после прерванной первичной загрузки.
+    Возвращает число восстановленных.
+    """
+    await conn.execute(DEFERRED_LOCK_SQL)
+    try:
+        restored = await _restore_pending(conn)
+    finally:
+        await conn.execute(DEFERRED_UNLOCK_SQL)
+    if restored:
+        logger.warning("Restored %d indexes and foreign keys left by an interrupted initial load", restored)
+    return restored
+
+
+@asynccontextmanager
+async def deferred_indexes(conn: asyncpg.Connection, tables: tuple[str, ...]) -> AsyncIterator[None]:
+    """
+    Режим первичной загрузки в пустые таблицы: вторичные индексы и внешние ключи снимаются
+    на время загрузки и создаются заново одним проходом в конце — это в разы дешевле
+    построчного обновления индексов и построчной проверки FK.
+    Определения снятых сохраняются в loader_deferred_ddl в той же транзакции, что и DROP,
+    поэтому после падения их восстанавливает restore_deferred_indexes при следующем запуске.
+    """
+    await conn.execute(DEFERRED_LOCK_SQL)
+    try:
+        indexes = foreign_keys = 0
+        async with conn.transaction():
+            for table in tables:
+                for name, definition in await conn.fetch(FOREIGN_KEYS_SQL, table):
+                    statement = f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"
+                    await conn.execute(RECORD_DEFERRED_SQL, name, table, "foreign_key", statement)
+                    await conn.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+                    foreign_keys += 1
+                for name, definition in await conn.fetch(SECONDARY_INDEXES_SQL, table):
+                    # у секционированной таблицы определение — «ON ONLY»: такой индекс не строится на партициях
+                    statement = definition.replace(" ON ONLY ", " ON ", 1)
+                    await conn.execute(RECORD_DEFERRED_SQL, name, table, "index", statement)
+                    await conn.execute(f"DROP INDEX {name}")
+                    indexes += 1
+
+        logger.info("Initial load: deferred %d indexes and %d foreign keys", indexes, foreign_keys)
+        try:
+            yield
+        finally:
+            await _restore_pending(conn)
+            logger.info("Initial load: indexes and foreign keys restored")
+    finally:
+        await conn.execute(DEFERRED_UNLOCK_SQL)
+
+
+class BatchWriter:
+    """
+    Пишет пачки строк через COPY в staging-таблицы и переносит их в основные таблицы одним set-based INSERT.
+    Каждая пачка — отдельная транзакция; в ней же обновляется дневной роллап.
+    Замеры старше срока хранения отбрасываются, партиции для их месяцев создаются до транзакции пачки.
+    """
+
+    def __init__(self, conn: asyncpg.Connection, refresh_rollup: bool = True) -> None:
+        self.conn = conn
+        self.refresh_rollup = refresh_rollup
+        self.partitions = SnapshotPartitions(conn)
+
+    async def setup(self) -> None:
+        # загрузка идемпотентна, поэтому ждать fsync на каждой пачке не нужно
+        await self.conn.execute("SET synchronous_commit = off")
+        await self.conn.execute(CREATE_STAGING_SQL)
+        await self.partitions.load()
+
+    async def is_empty(self) -> bool:
+        return not await self.conn.fetchval("SELECT EXISTS (SELECT 1 FROM videos)")
+
+    async def write(self, video_rows: list[tuple], snapshot_rows: list[tuple]) -> int:
+        """
+        Возвращает число записанных замеров (без отброшенных по сроку хранения).
+        """
+        snapshot_rows = self.partitions.keep(snapshot_rows)
+        await self.partitions.ensure(snapshot_rows)
+        async with self.conn.transaction():
+            if video_rows:
+                await self.conn.copy_records_to_table(
+                    "videos_stage", records=video_rows, columns=VIDEO_COLUMNS
+                )
+                await self.conn.execute(UPSERT_VIDEOS_SQL)
+            if snapshot_rows:
+                await self.conn.copy_records_to_table(
+                    "video_snapshots_stage", records=snapshot_rows, columns=SNAPSHOT_COLUMNS
+                )
+                await self._merge_snapshots()
+        return len(snapshot_rows)
+
+    async def write_csv(self, videos_csv: str | None, snapshots_csv: str | None, months: set[datetime]) -> None:
+        """
+        Та же пачка, но готовыми CSV-файлами (строки уже отфильтрованы по сроку хранения):
+        Postgres разбирает их сам, без построчной работы в Python.
+        months — месяцы created_at замеров пачки, для них создаются партиции.
+        """
+        await self.partitions.ensure_months(months)
+        async with self.conn.transaction():
+            if videos_csv:
+                await self.conn.copy_to_table(
+                    "videos_stage", source=videos_csv, columns=VIDEO_COLUMNS, format="csv"
+                )
+                await self.conn.execute(UPSERT_VIDEOS_SQL)
+            if snapshots_csv:
+                await self.conn.copy_to_table(
+                    "video_snapshots_stage", source=snapshots_csv, columns=SNAPSHOT_COLUMNS, format="csv"
+                )
+                await self._merge_snapshots()
+
+    async def _merge_snapshots(self) -> None:
+        await self.conn.execute(UPSERT_SNAPSHOTS_SQL)
+        if self.refresh_rollup:
+            await refresh_daily_stats(self.conn)
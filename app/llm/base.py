@@ -1,6 +1,21 @@
+import asyncio
+import re
 from abc import ABC, abstractmethod
 
 
+SQL_BLOCK_RE = re.compile(r"```sql(.*?)```", re.DOTALL | re.IGNORECASE) # регулярка для вытаскивания SQL из ответа llm.
+
+
+def extract_sql(text: str) -> str:
+    """
+    Достаем чистый SQL из ответа llm.
+    """
+    m = SQL_BLOCK_RE.search(text or "")
+    if not m:
+        return text.strip()
+    return m.group(1).strip()
+
+
 class LLMClient(ABC):
     @abstractmethod
     def generate_sql(self, question: str) -> str:
@@ -8,3 +23,15 @@ class LLMClient(ABC):
         Абстрактный метод для генерации sql запроса
         """
         raise NotImplementedError
+
+    async def agenerate_sql(self, question: str) -> str:
+        """
+        Асинхронная генерация sql запроса.
+        По умолчанию синхронный generate_sql уходит в пул потоков, чтобы не блокировать event loop бота.
+        """
+        return await asyncio.to_thread(self.generate_sql, question)
+
+    async def aclose(self) -> None:
+        """
+        Освобождает ресурсы клиента (HTTP-сессии и т.п.).
+        """
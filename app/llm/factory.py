@@ -2,13 +2,40 @@ from functools import lru_cache
 
 from app.core.config import settings
 from app.llm.base import LLMClient
-from app.llm.mistral_client import MistralLLMClient
+
+
+def create_llm_client(spec: str) -> LLMClient:
+    """
+    Клиент по описанию provider[:model], например "mistral:mistral-large-latest", "openai:qwen2.5-7b"
+    или "local:/models/sqlcoder-7b.Q4_K_M.gguf".
+    """
+    provider, _, model = spec.strip().partition(":")
+    provider = provider.lower()
+
+    if provider == "mistral":
+        from app.llm.mistral_client import MistralLLMClient
+        return MistralLLMClient(model=model or None)
+    if provider == "openai":
+        from app.llm.openai_compat_client import OpenAICompatLLMClient
+        return OpenAICompatLLMClient(model=model or None)
+    if provider == "local":
+        from app.llm.local_client import LocalLLMClient
+        return LocalLLMClient(model_path=model or None)
+    if provider == "fake":
+        from app.llm.fake_client import FakeLLMClient
+        return FakeLLMClient(latency=settings.llm.fake_llm_latency_seconds)
+    raise ValueError(f"Unknown LLM provider {provider!r}")
 
 
 @lru_cache
 def get_llm_client() -> LLMClient:
     provider = settings.llm.llm_provider.lower()
 
-    if provider == "mistral":
-        return MistralLLMClient()
-    raise ValueError(f"Unknown LLM_PROVIDER={provider!r}")
+    if provider == "router":
+        from app.llm.router import RouterLLMClient
+
+        specs = [spec.strip() for spec in settings.llm.llm_routes.split(",") if spec.strip()]
+        if not specs:
+            raise ValueError("LLM_PROVIDER=router requires LLM_ROUTES")
+        return RouterLLMClient([(spec, create_llm_client(spec)) for spec in specs], hedge=settings.llm.llm_hedge)
+    return create_llm_client(provider)
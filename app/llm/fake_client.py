@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+from app.llm.base import LLMClient
+
+DEFAULT_FAKE_SQL = "SELECT COUNT(*) AS result FROM videos;"
+
+
+class FakeLLMClient(LLMClient):
+    """
+    Локальная заглушка LLM для нагрузочных тестов и бенчмарков.
+    Ждёт latency секунд (как сетевой запрос) и возвращает фиксированный SQL.
+    """
+
+    def __init__(self, latency: float = 1.0, sql: str = DEFAULT_FAKE_SQL) -> None:
+        self.latency = latency
+        self.sql = sql
+
+    def generate_sql(self, question: str) -> str:
+        time.sleep(self.latency)
+        return self.sql
+
+    async def agenerate_sql(self, question: str) -> str:
+        await asyncio.sleep(self.latency)
+        return self.sql
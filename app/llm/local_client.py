@@ -0,0 +1,168 @@
+"""
+Генерация SQL локальной квантованной моделью (GGUF) на CPU через llama-cpp-python.
+
+Модель загружается один раз. Системный промпт одинаков для всех вопросов, поэтому его KV-кэш
+считается при старте (или читается из LOCAL_MODEL_STATE_PATH), а на каждый вопрос модель
+досчитывает только токены вопроса: llama.cpp сам переиспользует общий префикс уже посчитанных
+токенов. Поэтому здесь всегда полный SYSTEM_PROMPT (подсказки под вопрос из app/prompt_builder.py
+пришлось бы каждый раз считать заново).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import record_llm_usage, stage
+from app.llm.base import LLMClient, extract_sql
+from app.prompts import SYSTEM_PROMPT
+from app.sql_validator import validate_sql
+
+logger = logging.getLogger(__name__)
+
+# место вопроса в отрендеренном шаблоне чата: всё до него — общий префикс
+_QUESTION_MARKER = "\x00QUESTION\x00"
+
+# шаблон ChatML — если в GGUF нет своего chat_template
+_CHATML_TEMPLATE = (
+    "{% for message in messages %}"
+    "<|im_start|>{{ message.role }}\n{{ message.content }}<|im_end|>\n"
+    "{% endfor %}"
+    "{% if add_generation_prompt %}<|im_start|>assistant\n{% endif %}"
+)
+
+
+def _load_llama(model_path: str):
+    try:
+        from llama_cpp import Llama
+    except ImportError as e:
+        raise RuntimeError(
+            "LLM_PROVIDER=local requires the 'llama-cpp-python' package (pip install llama-cpp-python)"
+        ) from e
+    if not os.path.exists(model_path):
+        raise RuntimeError(f"LOCAL_MODEL_PATH={model_path!r} does not exist")
+    return Llama(
+        model_path=model_path,
+        n_ctx=settings.llm.local_model_ctx,
+        n_threads=settings.llm.local_model_threads or None,
+        verbose=False,
+    )
+
+
+class LocalLLMClient(LLMClient):
+    """
+    LLM-клиент на локальной модели: без сетевых запросов.
+    Модель не потокобезопасна, поэтому вопросы обрабатываются по одному.
+    """
+
+    def __init__(self, model_path: str | None = None) -> None:
+        self.model_path = model_path or settings.llm.local_model_path
+        if not self.model_path:
+            raise RuntimeError("LOCAL_MODEL_PATH is not set")
+        self.max_tokens = settings.llm.llm_max_output_tokens
+
+        started = time.perf_counter()
+        self.llm = _load_llama(self.model_path)
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+        self._prefix, self._suffix, self._stop = self._split_prompt()
+        self._prefix_tokens = self._tokenize(self._prefix, bos=True)
+        self._warm_up_prefix()
+        logger.info(
+            "Local LLM %s loaded in %.1fs, system prompt: %d tokens",
+            os.path.basename(self.model_path), time.perf_counter() - started, len(self._prefix_tokens),
+        )
+
+    def _special_text(self, token: int) -> str:
+        if token < 0:
+            return ""
+        return self.llm.detokenize([token], special=True).decode("utf-8", errors="ignore")
+
+    def _split_prompt(self) -> tuple[str, str, list[str]]:
+        """
+        Рендерит шаблон чата модели и делит его на префикс (системный промпт) и хвост после вопроса.
+        """
+        from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+
+        eos = self._special_text(self.llm.token_eos())
+        formatter = Jinja2ChatFormatter(
+            template=self.llm.metadata.get("tokenizer.chat_template") or _CHATML_TEMPLATE,
+            eos_token=eos,
+            bos_token=self._special_text(self.llm.token_bos()),
+            add_generation_prompt=True,
+        )
+        rendered = formatter(messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": _QUESTION_MARKER},
+        ])
+        prefix, _, suffix = rendered.prompt.partition(_QUESTION_MARKER)
+        stop = rendered.stop or []
+        stop = [stop] if isinstance(stop, str) else list(stop)
+        return prefix, suffix, [token for token in {*stop, eos, "<|im_end|>"} if token]
+
+    def _tokenize(self, text: str, bos: bool = False) -> list[int]:
+        bos_text = self._special_text(self.llm.token_bos())
+        # BOS добавляем сами, только если шаблон не вписал его текстом
+        add_bos = bos and not (bos_text and text.startswith(bos_text))
+        return self.llm.tokenize(text.encode("utf-8"), add_bos=add_bos, special=True)
+
+    def _state_fingerprint(self) -> str:
+        stat = os.stat(self.model_path)
+        payload = "\0".join((self.model_path, str(stat.st_size), str(stat.st_mtime), self._prefix))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _warm_up_prefix(self) -> None:
+        """
+        Заполняет KV-кэш системным промптом: из файла состояния, если он от той же модели и промпта,
+        иначе считает его и сохраняет.
+        """
+        path = settings.llm.local_model_state_path
+        fingerprint = self._state_fingerprint()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    saved_fingerprint, state = pickle.load(f)
+                if saved_fingerprint == fingerprint:
+                    self.llm.load_state(state)
+                    logger.info("Local LLM: system prompt KV cache loaded from %s", path)
+                    return
+            except Exception as e:
+                logger.warning("Local LLM: cannot load KV cache from %s: %s", path, e)
+
+        self.llm.reset()
+        self.llm.eval(self._prefix_tokens)
+        if path:
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump((fingerprint, self.llm.save_state()), f)
+            os.replace(tmp, path)
+            logger.info("Local LLM: system prompt KV cache saved to %s", path)
+
+    def generate_sql(self, question: str) -> str:
+        tokens = self._prefix_tokens + self._tokenize(question + self._suffix)
+        with self._lock:
+            # префикс уже в KV-кэше, досчитываются только токены вопроса
+            resp = self.llm.create_completion(
+                prompt=tokens,
+                max_tokens=self.max_tokens,
+                temperature=0.0,
+                stop=self._stop,
+            )
+
+        usage = resp.get("usage") or {}
+        record_llm_usage("local", usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+        raw = resp["choices"][0]["text"]
+        with stage("sql_validate"):
+            sql = validate_sql(extract_sql(raw))
+
+        logger.info("[Local] SQL: %s", sql.replace("\n", " "))
+        return sql
+
+    async def agenerate_sql(self, question: str) -> str:
+        # очередь ждёт здесь, а не занимая потоки пула
+        async with self._async_lock:
+            return await asyncio.to_thread(self.generate_sql, question)
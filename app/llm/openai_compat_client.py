@@ -0,0 +1,66 @@
+import logging
+
+import aiohttp
+import requests
+
+from app.core.config import settings
+from app.core.metrics import record_llm_usage, stage
+from app.llm.base import LLMClient, extract_sql
+from app.prompt_builder import build_messages
+from app.sql_validator import validate_sql
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAICompatLLMClient(LLMClient):
+    """
+    Клиент для OpenAI-совместимого API (/chat/completions): vLLM, llama.cpp server, Ollama, OpenAI и т.п.
+    """
+
+    def __init__(self, model: str | None = None, base_url: str | None = None, api_key: str | None = None) -> None:
+        self.model = model or settings.llm.openai_model
+        self.url = (base_url or settings.llm.openai_base_url).rstrip("/") + "/chat/completions"
+        key = settings.llm.openai_api_key if api_key is None else api_key
+        self.headers = {"Authorization": f"Bearer {key}"} if key else {}
+        self.timeout = settings.llm.llm_timeout_seconds
+        self._session: aiohttp.ClientSession | None = None
+
+    def _payload(self, question: str) -> dict:
+        return {
+            "model": self.model,
+            "messages": build_messages(question),
+            "temperature": 0.0,
+            "max_tokens": settings.llm.llm_max_output_tokens,
+        }
+
+    def _process_response(self, data: dict) -> str:
+        usage = data.get("usage") or {}
+        record_llm_usage(self.model, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+        raw = data["choices"][0]["message"]["content"]
+        with stage("sql_validate"):
+            sql = validate_sql(extract_sql(raw))
+
+        logger.info("[%s] SQL: %s", self.model, sql.replace("\n", " "))
+        return sql
+
+    def generate_sql(self, question: str) -> str:
+        resp = requests.post(self.url, json=self._payload(question), headers=self.headers, timeout=self.timeout)
+        resp.raise_for_status()
+        return self._process_response(resp.json())
+
+    async def agenerate_sql(self, question: str) -> str:
+        # одна сессия на клиент: соединения с сервером переиспользуются (keep-alive)
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        async with self._session.post(self.url, json=self._payload(question)) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        return self._process_response(data)
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
@@ -0,0 +1,101 @@
+"""
+Ограниченная очередь с приоритетами перед LLM (вместо простого семафора).
+
+Одновременно к LLM уходит не больше concurrency запросов; ещё не больше max_waiting ждут
+в очереди. Меньший приоритет — раньше, при равном — в порядке прихода. Если очередь полна,
+новый запрос вытесняет худшего ожидающего (если тот хуже по приоритету), иначе сразу
+получает LLMQueueFullError. Кэш и шаблонный путь очередь не проходят.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+
+from app.core.metrics import LLM_QUEUE_REJECTED
+
+logger = logging.getLogger(__name__)
+
+# приоритет текущего запроса (выставляет бот: чем больше у пользователя запросов в работе, тем дальше)
+request_priority: ContextVar[int] = ContextVar("llm_request_priority", default=0)
+# вызывается, если запросу пришлось встать в очередь, с его позицией — чтобы сказать пользователю «подождите»
+queue_notice: ContextVar[Callable[[int], Awaitable[None]] | None] = ContextVar("llm_queue_notice", default=None)
+
+
+class LLMQueueFullError(RuntimeError):
+    """
+    Очередь к LLM переполнена.
+    """
+
+
+class PriorityLimiter:
+    """
+    Семафор с ограниченной очередью ожидающих и приоритетами.
+    """
+
+    def __init__(self, concurrency: int, max_waiting: int) -> None:
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.active = 0
+        self._heap: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._heap if not fut.done())
+
+    async def acquire(self, priority: int = 0) -> None:
+        if self.active < self.concurrency and not self.waiting:
+            self.active += 1
+            return
+
+        waiting = self.waiting
+        if waiting >= self.max_waiting:
+            # в полной очереди место уступает худший по приоритету ожидающий, если он хуже нового
+            worst = max((entry for entry in self._heap if not entry[2].done()), default=None)
+            if worst is None or worst[0] <= priority:
+                LLM_QUEUE_REJECTED.inc()
+                raise LLMQueueFullError(f"LLM queue is full ({waiting} waiting)")
+            LLM_QUEUE_REJECTED.inc()
+            worst[2].set_exception(LLMQueueFullError("Displaced by a higher-priority request"))
+            waiting -= 1
+
+        fut = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), fut)
+        heapq.heappush(self._heap, entry)
+
+        try:
+            # уведомление — тоже внутри try: отмена во время него не должна оставить запись в очереди
+            notice = queue_notice.get()
+            if notice is not None:
+                position = 1 + sum(1 for p, seq, f in self._heap if not f.done() and (p, seq) < entry[:2])
+                try:
+                    await notice(position)
+                except Exception:
+                    logger.exception("Queue notice failed")
+            # слот передаётся ожидающему в release(), active при этом не меняется
+            await fut
+        except asyncio.CancelledError:
+            if not fut.done():
+                fut.cancel()
+                self._remove(entry)
+            elif not fut.cancelled() and fut.exception() is None:
+                # слот уже передан этому запросу — отдаём следующему
+                self.release()
+            raise
+
+    def _remove(self, entry: tuple[int, int, asyncio.Future]) -> None:
+        try:
+            self._heap.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._heap)
+
+    def release(self) -> None:
+        while self._heap:
+            _, _, fut = heapq.heappop(self._heap)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
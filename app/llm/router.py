@@ -0,0 +1,283 @@
+"""
+Маршрутизатор LLM: несколько провайдеров/моделей за одним LLMClient.
+
+- Порядок маршрутов — порядок предпочтения (например, быстрая маленькая модель, затем большая).
+- Ошибка или невалидный SQL у маршрута — сразу пробуем следующий (fallback).
+- Hedging: если маршрут не ответил за p95 своей латентности, параллельно запускается следующий;
+  берётся первый валидный SQL, остальные запросы отменяются.
+- Circuit breaker: маршрут с долей сетевых ошибок и таймаутов выше порога выключается на время остывания.
+  Невалидный SQL breaker не учитывает: провайдер ответил, маршрут исправен.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+from app.llm.base import LLMClient
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_SECONDS = Histogram("llm_provider_seconds", "Successful LLM call latency by route", ("route",))
+PROVIDER_ERRORS = Counter("llm_provider_errors_total", "Failed LLM calls by route", ("route", "error"))
+HEDGED = Counter("llm_hedged_requests_total", "Extra requests started because a route was slow", ("route",))
+BREAKER_OPENED = Counter("llm_breaker_opened_total", "Circuit breaker openings by route", ("route",))
+
+# сколько успешных замеров нужно, чтобы считать hedge-задержку по p95, а не брать LLM_HEDGE_DELAY_SECONDS
+MIN_LATENCY_SAMPLES = 20
+
+
+@lru_cache
+def transport_errors() -> tuple[type[BaseException], ...]:
+    """
+    Ошибки сети и таймауты клиентов LLM — только они считаются отказами маршрута.
+    """
+    import aiohttp
+    import requests
+
+    errors: list[type[BaseException]] = [TimeoutError, ConnectionError, aiohttp.ClientError, requests.RequestException]
+    try:
+        import httpx
+    except ImportError:
+        pass
+    else:
+        errors.append(httpx.HTTPError)
+    try:
+        from mistralai.models import SDKError
+    except ImportError:
+        pass
+    else:
+        errors.append(SDKError)
+    return tuple(errors)
+
+
+class LatencyTracker:
+    """
+    Латентность последних успешных вызовов маршрута.
+    """
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    closed — вызовы идут; open — маршрут пропускается до конца остывания;
+    после остывания пропускается один пробный вызов (half-open).
+    """
+
+    def __init__(self, error_rate: float, min_calls: int, cooldown: float, window: int = 50) -> None:
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def available(self) -> bool:
+        """
+        Можно ли сейчас вызвать маршрут (без захвата пробного вызова).
+        """
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def cancel_trial(self) -> None:
+        """
+        Пробный вызов отменён, не завершившись: следующий вызов снова может стать пробным.
+        """
+        self._trial = False
+
+    def record(self, ok: bool) -> bool:
+        """
+        Учитывает результат вызова. True — breaker только что открылся.
+        """
+        if self._opened_at is not None:
+            self._trial = False
+            if ok:
+                self._opened_at = None
+                self._outcomes.clear()
+            else:
+                self._opened_at = time.monotonic()
+            return False
+
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) > self.error_rate:
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+
+@dataclass
+class Route:
+    """
+    Один провайдер/модель в маршрутизаторе.
+    """
+    name: str
+    client: LLMClient
+    breaker: CircuitBreaker
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+
+    def hedge_delay(self) -> float:
+        if len(self.latency) < MIN_LATENCY_SAMPLES:
+            return settings.llm.llm_hedge_delay_seconds
+        return self.latency.percentile(95)
+
+
+class RouterLLMClient(LLMClient):
+    """
+    LLMClient поверх нескольких маршрутов с fallback, hedging и circuit breaker.
+    """
+
+    def __init__(self, routes: list[tuple[str, LLMClient]], hedge: bool = True) -> None:
+        if not routes:
+            raise ValueError("Router needs at least one LLM route")
+        llm = settings.llm
+        self.routes = [
+            Route(
+                name=name,
+                client=client,
+                breaker=CircuitBreaker(
+                    llm.llm_breaker_error_rate, llm.llm_breaker_min_calls, llm.llm_breaker_cooldown_seconds
+                ),
+            )
+            for name, client in routes
+        ]
+        self.hedge = hedge
+
+    async def _call(self, route: Route, question: str) -> str:
+        started = time.perf_counter()
+        try:
+            sql = await route.client.agenerate_sql(question)
+        except asyncio.CancelledError:
+            # проиграл hedge-гонку или запрос отменён целиком — это не ошибка маршрута
+            route.breaker.cancel_trial()
+            raise
+        except Exception as e:
+            PROVIDER_ERRORS.inc(route=route.name, error=type(e).__name__)
+            self._record_failure(route, e)
+            raise
+        elapsed = time.perf_counter() - started
+        route.latency.add(elapsed)
+        route.breaker.record(True)
+        PROVIDER_SECONDS.observe(elapsed, route=route.name)
+        return sql
+
+    @staticmethod
+    def _record_failure(route: Route, error: Exception) -> None:
+        if not isinstance(error, transport_errors()):
+            # невалидный SQL и т.п.: маршрут ответил, пробный вызов не засчитывается ни в какую сторону
+            route.breaker.cancel_trial()
+            return
+        if route.breaker.record(False):
+            BREAKER_OPENED.inc(route=route.name)
+            logger.warning("LLM route %s: circuit breaker opened", route.name)
+
+    async def agenerate_sql(self, question: str) -> str:
+        pending: dict[asyncio.Task, Route] = {}
+        errors: list[str] = []
+        next_index = 0
+
+        def has_next() -> bool:
+            return any(route.breaker.available() for route in self.routes[next_index:])
+
+        def start_next() -> Route | None:
+            nonlocal next_index
+            while next_index < len(self.routes):
+                route = self.routes[next_index]
+                next_index += 1
+                if route.breaker.allow():
+                    pending[asyncio.ensure_future(self._call(route, question))] = route
+                    return route
+            return None
+
+        last = start_next()
+        if last is None:
+            raise RuntimeError("All LLM routes are unavailable (circuit breakers open)")
+        try:
+            while pending:
+                can_hedge = self.hedge and has_next()
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=last.hedge_delay() if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # текущий маршрут медлит — параллельно спрашиваем следующий
+                    hedge = start_next()
+                    if hedge is not None:
+                        HEDGED.inc(route=hedge.name)
+                        logger.info("LLM route %s is slow, hedging with %s", last.name, hedge.name)
+                        last = hedge
+                    continue
+
+                results = [(pending.pop(task), task) for task in done]
+                for route, task in results:
+                    if task.exception() is not None:
+                        errors.append(f"{route.name}: {task.exception()!r}")
+                        logger.warning("LLM route %s failed: %r", route.name, task.exception())
+                for route, task in results:
+                    if task.exception() is None:
+                        return task.result()
+
+                if not pending:
+                    last = start_next() or last
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise RuntimeError("All LLM routes failed: " + "; ".join(errors))
+
+    async def aclose(self) -> None:
+        for route in self.routes:
+            await route.client.aclose()
+
+    def generate_sql(self, question: str) -> str:
+        """
+        Синхронный вариант: маршруты по очереди, без hedging.
+        """
+        errors = []
+        for route in self.routes:
+            if not route.breaker.allow():
+                continue
+            try:
+                sql = route.client.generate_sql(question)
+            except Exception as e:
+                self._record_failure(route, e)
+                errors.append(f"{route.name}: {e!r}")
+                continue
+            route.breaker.record(True)
+            return sql
+        raise RuntimeError("All LLM routes failed: " + "; ".join(errors))
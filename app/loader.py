@@ -1,112 +1,283 @@
 import asyncio
-import json
 import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from datetime import datetime  # <-- добавляем
 
-from sqlalchemy import text
+import asyncpg
 
-from app.core.db import async_session_maker
+from app.core.columnar import get_columnar_store
+from app.core.config import settings
+from app.core.db import connect_raw
+from app.ingest.columnar import build_columnar_copy
+from app.ingest.partitions import drop_expired_partitions, ensure_future_partitions
+from app.ingest.export import is_export, write_export
+from app.ingest.reader import (
+    is_compressed,
+    is_dump,
+    is_json_lines,
+    iter_batches,
+    iter_changed_videos,
+    iter_videos,
+    split_line_ranges,
+)
+from app.ingest.rollup import rebuild_daily_stats
+from app.ingest.state import bump_data_version, get_file_state, save_file_state
+from app.ingest.writer import BatchWriter, deferred_indexes, restore_deferred_indexes
 
 logger = logging.getLogger(__name__)
 
 
-def parse_dt(value: str) -> datetime:
+@dataclass
+class LoadStats:
     """
-    функция для приведения к datetime
+    Итоги загрузки.
     """
-    return datetime.fromisoformat(value)
-
-
-async def load_json(path: str = "/app/data/videos.json") -> None:
-    logger.info("Loading JSON from %s", path)
-    raw = Path(path).read_text(encoding="utf-8")
-    data = json.loads(raw)
-
-    videos_rows = []
-    snapshots_rows = []
-
-    items = data.get("videos", data)
-
-    for video in items:
-        videos_rows.append(
-            {
-                "id": video["id"],
-                "creator_id": video["creator_id"],
-                "video_created_at": parse_dt(video["video_created_at"]),
-                "views_count": video["views_count"],
-                "likes_count": video["likes_count"],
-                "comments_count": video["comments_count"],
-                "reports_count": video["reports_count"],
-                "created_at": parse_dt(video["created_at"]),
-                "updated_at": parse_dt(video["updated_at"]),
-            }
-        )
+    videos: int = 0
+    snapshots: int = 0
+    seconds: float = 0.0
+    watermark: datetime | None = None
 
-        for snap in video["snapshots"]:
-            snapshots_rows.append(
-                {
-                    "id": snap["id"],
-                    "video_id": video["id"],
-                    "views_count": snap["views_count"],
-                    "likes_count": snap["likes_count"],
-                    "comments_count": snap["comments_count"],
-                    "reports_count": snap["reports_count"],
-                    "delta_views_count": snap["delta_views_count"],
-                    "delta_likes_count": snap["delta_likes_count"],
-                    "delta_comments_count": snap["delta_comments_count"],
-                    "delta_reports_count": snap["delta_reports_count"],
-                    "created_at": parse_dt(snap["created_at"]),
-                    "updated_at": parse_dt(snap["updated_at"]),
-                }
-            )
+    @property
+    def rows(self) -> int:
+        return self.videos + self.snapshots
 
-    insert_videos_sql = text("""
-        INSERT INTO videos (
-            id, creator_id, video_created_at,
-            views_count, likes_count, comments_count, reports_count,
-            created_at, updated_at
-        )
-        VALUES (
-            :id, :creator_id, :video_created_at,
-            :views_count, :likes_count, :comments_count, :reports_count,
-            :created_at, :updated_at
-        )
-        ON CONFLICT (id) DO NOTHING
-    """)
-
-    insert_snapshots_sql = text("""
-        INSERT INTO video_snapshots (
-            id, video_id,
-            views_count, likes_count, comments_count, reports_count,
-            delta_views_count, delta_likes_count,
-            delta_comments_count, delta_reports_count,
-            created_at, updated_at
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def add(self, videos: int, snapshots: int, watermark: datetime | None) -> None:
+        self.videos += videos
+        self.snapshots += snapshots
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+
+
+def loader_workers() -> int:
+    workers = settings.loader.loader_workers
+    return workers if workers > 0 else os.cpu_count() or 1
+
+
+async def write_batches(
+    writer: BatchWriter,
+    videos: Iterator[dict],
+    batch_size: int,
+    stats: LoadStats,
+    started: float,
+) -> None:
+    """
+    Пишет поток видео пачками, накапливая итоги в stats.
+    """
+    for video_rows, snapshot_rows in iter_batches(videos, batch_size):
+        written = await writer.write(video_rows, snapshot_rows)
+        # последний столбец в обеих таблицах — updated_at
+        stats.add(len(video_rows), written, max(row[-1] for rows in (video_rows, snapshot_rows) for row in rows))
+        stats.seconds = time.perf_counter() - started
+        logger.info(
+            "Loaded %d videos, %d snapshots (%.0f rows/sec)",
+            stats.videos, stats.snapshots, stats.rows_per_sec,
         )
-        VALUES (
-            :id, :video_id,
-            :views_count, :likes_count, :comments_count, :reports_count,
-            :delta_views_count, :delta_likes_count,
-            :delta_comments_count, :delta_reports_count,
-            :created_at, :updated_at
+
+
+async def _load_range(
+    path: str,
+    start: int,
+    end: int,
+    batch_size: int,
+    since: datetime | None,
+    refresh_rollup: bool,
+) -> LoadStats:
+    conn = await connect_raw()
+    try:
+        writer = BatchWriter(conn, refresh_rollup)
+        await writer.setup()
+        videos = iter_videos(path, start, end, settings.loader.loader_mmap)
+        if since is not None:
+            videos = iter_changed_videos(videos, since)
+        stats = LoadStats()
+        await write_batches(writer, videos, batch_size, stats, time.perf_counter())
+        return stats
+    finally:
+        await conn.close()
+
+
+def _load_range_process(*args) -> LoadStats:
+    from app.core.logging_conf import setup_logging
+    setup_logging()
+    return asyncio.run(_load_range(*args))
+
+
+async def load_ranges(
+    path: str,
+    ranges: list[tuple[int, int]],
+    batch_size: int,
+    since: datetime | None,
+    refresh_rollup: bool,
+    stats: LoadStats,
+) -> None:
+    """
+    Загружает диапазоны файла JSON Lines параллельно: каждый разбирает отдельный процесс
+    и пишет через своё соединение. Видео и его snapshots — одна строка, т.е. всегда в одном диапазоне
+    и в одной пачке, поэтому внешний ключ и роллап по (видео, день) не зависят от порядка коммитов.
+    """
+    loop = asyncio.get_running_loop()
+    # не fork: в родителе уже работают event loop и соединение с БД. forkserver один раз импортирует
+    # загрузчик (~1 с) и дальше порождает процессы копией себя — пул на каждый файл обходится дёшево
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["app.loader"])
+    with ProcessPoolExecutor(len(ranges), mp_context=ctx) as pool:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _load_range_process, path, start, end, batch_size, since, refresh_rollup)
+            for start, end in ranges
+        ))
+    for result in results:
+        stats.add(result.videos, result.snapshots, result.watermark)
+
+
+async def load_file(
+    conn: asyncpg.Connection,
+    path: str,
+    batch_size: int,
+    since: datetime | None = None,
+) -> LoadStats:
+    """
+    Потоково загружает выгрузку в videos и video_snapshots пачками через COPY.
+    Память ограничена размером одной пачки, а не всего файла.
+    since — пропустить всё, что не обновлялось после этого момента.
+    Несжатый файл JSON Lines при LOADER_WORKERS > 1 делится на диапазоны, которые грузятся параллельно.
+    Файл колоночной выгрузки (*.duckdb, app/ingest/export.py) грузится пачками, заданными при выгрузке.
+    """
+    workers = loader_workers()
+    splittable = is_json_lines(path) and not is_compressed(path)
+    ranges = split_line_ranges(path, workers) if workers > 1 and splittable else []
+    logger.info(
+        "Loading %s (batch size %d, since %s, %d workers)",
+        path, batch_size, since, max(len(ranges), 1),
+    )
+
+    stats = LoadStats()
+    started = time.perf_counter()
+
+    writer = BatchWriter(conn)
+    await writer.setup()
+    # прошлая первичная загрузка могла упасть, не вернув индексы и FK
+    await restore_deferred_indexes(conn)
+
+    initial = await writer.is_empty()
+    async with AsyncExitStack() as stack:
+        if initial:
+            # роллап при первичной загрузке строится один раз в конце, а не по пачкам
+            writer.refresh_rollup = False
+            await stack.enter_async_context(deferred_indexes(conn, ("video_snapshots", "videos")))
+
+        if is_export(path):
+            async for videos, snapshots, watermark in write_export(writer, path, since):
+                stats.add(videos, snapshots, watermark)
+                stats.seconds = time.perf_counter() - started
+                logger.info(
+                    "Loaded %d videos, %d snapshots (%.0f rows/sec)",
+                    stats.videos, stats.snapshots, stats.rows_per_sec,
+                )
+        elif len(ranges) > 1:
+            await load_ranges(path, ranges, batch_size, since, writer.refresh_rollup, stats)
+        else:
+            videos = iter_videos(path, use_mmap=settings.loader.loader_mmap)
+            if since is not None:
+                videos = iter_changed_videos(videos, since)
+            await write_batches(writer, videos, batch_size, stats, started)
+
+    if initial:
+        await rebuild_daily_stats(conn)
+
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        "Data loaded successfully: %d rows in %.1fs (%.0f rows/sec)",
+        stats.rows, stats.seconds, stats.rows_per_sec,
+    )
+    return stats
+
+
+async def load_json(path: str | None = None, batch_size: int | None = None) -> LoadStats:
+    """
+    Полная загрузка одного файла.
+    """
+    conn = await connect_raw()
+    try:
+        return await load_file(
+            conn,
+            path or settings.loader.loader_path,
+            batch_size or settings.loader.loader_batch_size,
         )
-        ON CONFLICT (id) DO NOTHING
-    """)
+    finally:
+        await conn.close()
+
+
+async def ingest_file(conn: asyncpg.Connection, path: str, name: str, incremental: bool) -> LoadStats | None:
+    """
+    Загружает файл с учётом того, что уже было загружено раньше.
+    Неизменившийся файл пропускается целиком, изменившийся — начиная с его watermark.
+    """
+    since = None
+    if incremental:
+        state = await get_file_state(conn, name)
+        if state is not None and state.matches(path):
+            logger.info("Skipping unchanged %s", name)
+            return None
+        since = state.watermark if state is not None else None
+
+    stats = await load_file(conn, path, settings.loader.loader_batch_size, since=since)
+    await save_file_state(conn, name, path, stats.watermark)
+    if stats.rows:
+        version = await bump_data_version(conn)
+        logger.info("Data version bumped to %d", version)
+    return stats
 
-    async with async_session_maker() as session:
-        async with session.begin():
-            logger.info("Inserting %d videos", len(videos_rows))
-            if videos_rows:
-                await session.execute(insert_videos_sql, videos_rows)
 
-            logger.info("Inserting %d snapshots", len(snapshots_rows))
-            if snapshots_rows:
-                await session.execute(insert_snapshots_sql, snapshots_rows)
+async def run_ingest() -> None:
+    """
+    Точка входа загрузчика: один файл (LOADER_PATH) или все новые файлы из LOADER_DROP_DIR.
+    Заранее создаёт партиции video_snapshots на ближайшие месяцы, после загрузки удаляет
+    партиции старше SNAPSHOT_RETENTION_MONTHS.
+    При SQL_BACKEND=duckdb после загрузки пересобирается колоночная копия данных.
+    """
+    incremental = settings.loader.loader_mode == "incremental"
+    drop_dir = settings.loader.loader_drop_dir
+
+    conn = await connect_raw()
+    try:
+        await ensure_future_partitions(conn)
+        if drop_dir:
+            files = sorted(
+                file for file in Path(drop_dir).iterdir()
+                if file.is_file() and (is_dump(file.name) or is_export(file.name))
+            )
+            logger.info("Found %d files in %s", len(files), drop_dir)
+            loaded = [await ingest_file(conn, str(file), file.name, incremental) for file in files]
+        else:
+            path = settings.loader.loader_path
+            loaded = [await ingest_file(conn, path, str(Path(path).resolve()), incremental)]
+
+        changed = any(stats is not None and stats.rows for stats in loaded)
+        if await drop_expired_partitions(conn):
+            changed = True
+            version = await bump_data_version(conn)
+            logger.info("Data version bumped to %d", version)
 
-    logger.info("JSON data loaded successfully")
+        if get_columnar_store() is not None:
+            # копия пересобирается один раз за запуск, после всех файлов
+            if changed or not os.path.exists(settings.database.duckdb_path):
+                await build_columnar_copy(conn, settings.database.duckdb_path)
+    finally:
+        await conn.close()
 
 
 if __name__ == "__main__":
     from app.core.logging_conf import setup_logging
     setup_logging()
-    asyncio.run(load_json())
+    asyncio.run(run_ingest())
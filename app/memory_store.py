@@ -0,0 +1,269 @@
+"""
+Ответы на шаблонные вопросы (app/fast_path.py) из памяти процесса, без запроса в БД.
+
+Для шаблонов нужно немного данных: по видео — креатор, время публикации и просмотры,
+по дням — сумма приростов просмотров и число видео с ростом (из роллапа video_daily_stats).
+Они лежат в отсортированных массивах NumPy:
+- видео отсортированы по (creator_id, video_created_at), у каждого креатора свой срез, и число видео
+  за период — два searchsorted по времени публикации внутри среза;
+- просмотры отсортированы отдельно: «больше K просмотров» — один searchsorted;
+- дни отсортированы, агрегат за день — searchsorted по дню.
+
+Массивы строятся при старте бота и обновляются после каждой загрузки (NOTIFY data_version):
+дочитываются только видео с updated_at новее прошлого watermark загрузчика (как и загрузчик,
+считаем, что изменённые строки получают updated_at новее watermark). Дневные итоги каждый раз
+пересчитываются из роллапа: он в разы меньше video_snapshots, а найти дни с новыми snapshots
+можно только полным проходом по ним (индекса по updated_at нет).
+Ответ даётся, только если массивы построены по текущей версии данных; иначе шаблон выполняется SQL.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.db import connect_raw
+from app.fast_path import TemplateQuery
+from app.result_cache import on_data_version_change
+
+if TYPE_CHECKING:
+    import numpy
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_DAY = date(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("MEMORY_STORE=true requires the 'numpy' package (pip install numpy)") from e
+    return numpy
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _day_number(value: date) -> int:
+    return (value - _EPOCH_DAY).days
+
+
+# время — в микросекундах от эпохи, дни — номер дня от 1970-01-01: в массивах только целые числа
+_VIDEOS_SQL = """
+    SELECT id, creator_id,
+           (extract(epoch FROM video_created_at) * 1000000)::bigint,
+           views_count
+    FROM videos
+    WHERE $1::timestamptz IS NULL OR updated_at > $1
+"""
+
+_DAYS_SQL = """
+    SELECT day - DATE '1970-01-01',
+           SUM(delta_views_count),
+           COUNT(*) FILTER (WHERE views_growth_snapshots > 0)
+    FROM video_daily_stats
+    GROUP BY day
+"""
+
+
+@dataclass(frozen=True)
+class StoreSnapshot:
+    """
+    Неизменяемый набор массивов одной версии данных; обновление строит новый и подменяет ссылку.
+    """
+    version: int
+    # ingested_files.watermark на момент построения; None — дочитывать нечего, только полная загрузка
+    watermark: datetime | None
+    video_ids: "numpy.ndarray"
+    creator_ids: "numpy.ndarray"
+    published: "numpy.ndarray"
+    views: "numpy.ndarray"
+    views_sorted: "numpy.ndarray"
+    # creator_id -> [start, end) в массивах, отсортированных по (creator_id, published)
+    creators: dict[str, tuple[int, int]]
+    days: "numpy.ndarray"
+    day_delta_views: "numpy.ndarray"
+    day_growth_videos: "numpy.ndarray"
+
+    def count_creator_videos(self, creator_id: str, start: datetime, end: datetime) -> int:
+        np = _import_numpy()
+        bounds = self.creators.get(creator_id)
+        if bounds is None:
+            return 0
+        published = self.published[bounds[0]:bounds[1]]
+        left, right = np.searchsorted(published, (_micros(start), _micros(end)), side="left")
+        return int(right - left)
+
+    def count_videos_over_views(self, threshold: int) -> int:
+        np = _import_numpy()
+        return int(len(self.views_sorted) - np.searchsorted(self.views_sorted, threshold, side="right"))
+
+    def _day_index(self, day: date) -> int | None:
+        np = _import_numpy()
+        number = _day_number(day)
+        index = int(np.searchsorted(self.days, number))
+        if index < len(self.days) and self.days[index] == number:
+            return index
+        return None
+
+    def sum_delta_views(self, day: date) -> int:
+        index = self._day_index(day)
+        return 0 if index is None else int(self.day_delta_views[index])
+
+    def count_growth_videos(self, day: date) -> int:
+        index = self._day_index(day)
+        return 0 if index is None else int(self.day_growth_videos[index])
+
+
+def _build(version, watermark, video_ids, creator_ids, published, views, days, day_delta_views, day_growth_videos):
+    np = _import_numpy()
+    order = np.lexsort((published, creator_ids))
+    video_ids, creator_ids, published, views = (a[order] for a in (video_ids, creator_ids, published, views))
+    unique, starts, counts = np.unique(creator_ids, return_index=True, return_counts=True)
+    creators = {
+        creator: (int(start), int(start + count))
+        for creator, start, count in zip(unique.tolist(), starts, counts)
+    }
+    day_order = np.argsort(days, kind="stable")
+    return StoreSnapshot(
+        version=version,
+        watermark=watermark,
+        video_ids=video_ids,
+        creator_ids=creator_ids,
+        published=published,
+        views=views,
+        views_sorted=np.sort(views),
+        creators=creators,
+        days=days[day_order],
+        day_delta_views=day_delta_views[day_order],
+        day_growth_videos=day_growth_videos[day_order],
+    )
+
+
+class MemoryStore:
+    """
+    Массивы для шаблонных вопросов и их обновление по версиям данных.
+    """
+
+    def __init__(self) -> None:
+        self.snapshot: StoreSnapshot | None = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def _load(self, conn: asyncpg.Connection, previous: StoreSnapshot | None) -> StoreSnapshot:
+        np = _import_numpy()
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            version = await conn.fetchval("SELECT version FROM data_version")
+            watermark = await conn.fetchval("SELECT max(watermark) FROM ingested_files")
+            since = previous.watermark if previous is not None else None
+            if since is None:
+                previous = None
+            videos = await conn.fetch(_VIDEOS_SQL, since)
+            days = await conn.fetch(_DAYS_SQL)
+            total_videos = await conn.fetchval("SELECT count(*) FROM videos") if previous is not None else None
+
+        video_ids = np.array([row[0] for row in videos], dtype=object)
+        creator_ids = np.array([row[1] for row in videos], dtype=object)
+        published = np.array([row[2] for row in videos], dtype=np.int64)
+        views = np.array([row[3] for row in videos], dtype=np.int64)
+        day_numbers = np.array([row[0] for row in days], dtype=np.int64)
+        day_delta_views = np.array([row[1] for row in days], dtype=np.int64)
+        day_growth_videos = np.array([row[2] for row in days], dtype=np.int64)
+
+        if previous is not None:
+            # обновлённые видео заменяют старые строки
+            keep = ~np.isin(previous.video_ids, video_ids)
+            video_ids = np.concatenate((previous.video_ids[keep], video_ids))
+            creator_ids = np.concatenate((previous.creator_ids[keep], creator_ids))
+            published = np.concatenate((previous.published[keep], published))
+            views = np.concatenate((previous.views[keep], views))
+
+        snapshot = _build(
+            version, watermark, video_ids, creator_ids, published, views,
+            day_numbers, day_delta_views, day_growth_videos,
+        )
+        if total_videos is not None and total_videos != len(snapshot.video_ids):
+            logger.warning(
+                "Memory store: %d videos after incremental refresh, %d in DB; reloading",
+                len(snapshot.video_ids), total_videos,
+            )
+            return await self._load(conn, None)
+        return snapshot
+
+    async def refresh(self) -> None:
+        """
+        Строит массивы заново или дочитывает изменения после прошлой загрузки.
+        """
+        async with self._refresh_lock:
+            previous = self.snapshot
+            started = time.perf_counter()
+            conn = await connect_raw()
+            try:
+                snapshot = await self._load(conn, previous)
+            finally:
+                await conn.close()
+            self.snapshot = snapshot
+            logger.info(
+                "Memory store %s in %.3fs: version %d, %d videos, %d days",
+                "updated" if previous is not None and previous.watermark is not None else "loaded",
+                time.perf_counter() - started, snapshot.version, len(snapshot.video_ids), len(snapshot.days),
+            )
+
+    def answer(self, template: TemplateQuery, version: int | None) -> int | None:
+        """
+        Ответ на шаблонный вопрос из массивов версии version.
+        None — массивы не той версии или шаблон им не поддерживается: нужен SQL.
+        """
+        snapshot = self.snapshot
+        if snapshot is None or version is None or snapshot.version != version:
+            return None
+        params = template.params
+        if template.intent == "total_videos":
+            return len(snapshot.video_ids)
+        if template.intent == "creator_videos_in_range":
+            return snapshot.count_creator_videos(params["creator_id"], params["created_from"], params["created_to"])
+        if template.intent == "videos_over_views":
+            return snapshot.count_videos_over_views(params["threshold"])
+        if template.intent == "sum_delta_views_on_date":
+            return snapshot.sum_delta_views(params["day"])
+        if template.intent == "distinct_videos_with_views_on_date":
+            return snapshot.count_growth_videos(params["day"])
+        return None
+
+
+_store: MemoryStore | None = None
+
+
+def get_memory_store() -> MemoryStore | None:
+    """
+    Хранилище при MEMORY_STORE=true, иначе None.
+    """
+    global _store
+    if not settings.database.memory_store:
+        return None
+    if _store is None:
+        _import_numpy()
+        _store = MemoryStore()
+    return _store
+
+
+async def start_memory_store() -> None:
+    """
+    Строит массивы при старте и подписывает их на обновление после загрузок (нужен слушатель data_version).
+    """
+    store = get_memory_store()
+    if store is None:
+        return
+    await store.refresh()
+
+    async def on_version(version: int) -> None:
+        await store.refresh()
+
+    on_data_version_change(on_version)
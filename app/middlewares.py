@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import math
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMITED, UPDATES_IN_FLIGHT
+from app.core.state import get_state
+from app.llm.queue import queue_notice, request_priority
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Ограничивает число одновременно обрабатываемых апдейтов и считает принятые,
+    чтобы при остановке дождаться их завершения (drain).
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(limit)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        self.in_flight += 1
+        self._idle.clear()
+        UPDATES_IN_FLIGHT.set(self.in_flight)
+        try:
+            async with self._semaphore:
+                return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            UPDATES_IN_FLIGHT.set(self.in_flight)
+            if self.in_flight == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Ждёт, пока все принятые апдейты будут обработаны. False — не успели за timeout.
+        """
+        if self.in_flight:
+            logger.info("Draining %d in-flight updates (timeout %.0fs)", self.in_flight, timeout)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Shutdown with %d updates still in flight", self.in_flight)
+            return False
+        return True
+
+
+class RateLimitMiddleware(BaseMiddleware):
+    """
+    Token bucket на пользователя и на всех: при превышении пользователь сразу получает ответ
+    «подожди», а не ждёт таймаута. Заодно задаёт приоритет в очереди к LLM: чем больше
+    у пользователя вопросов уже в работе, тем дальше в очереди новый.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: dict[int, int] = {}
+
+    async def _limited(self, key: str, per_second: float, burst: int) -> float:
+        if per_second <= 0:
+            return 0.0
+        return await get_state().take_token(key, per_second, max(1, burst))
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: dict[str, Any],
+    ) -> Any:
+        limits = settings.rate_limit
+        user_id = event.from_user.id if event.from_user else event.chat.id
+
+        user_key = f"rate:user:{user_id}"
+        user_rate, user_burst = limits.rate_limit_user_per_minute / 60, max(1, limits.rate_limit_user_burst)
+        wait = await self._limited(user_key, user_rate, user_burst)
+        if wait:
+            RATE_LIMITED.inc(scope="user")
+            await event.answer(f"Слишком много вопросов подряд, подожди {math.ceil(wait)} с.")
+            return None
+
+        # сначала ведро пользователя: иначе один пользователь, упёршийся в свой лимит, тратил бы общие токены
+        wait = await self._limited("rate:global", limits.rate_limit_global_per_second, limits.rate_limit_global_burst)
+        if wait:
+            # вопрос не принят — токен пользователя возвращается
+            if user_rate > 0:
+                await get_state().return_token(user_key, user_rate, user_burst)
+            RATE_LIMITED.inc(scope="global")
+            await event.answer(f"Сейчас очень много вопросов, повтори через {math.ceil(wait)} с.")
+            return None
+
+        async def notice(position: int) -> None:
+            await event.answer(f"Вопрос в очереди ({position}-й), подожди немного…")
+
+        active = self._in_flight.get(user_id, 0)
+        self._in_flight[user_id] = active + 1
+        priority_token = request_priority.set(active)
+        notice_token = queue_notice.set(notice)
+        try:
+            return await handler(event, data)
+        finally:
+            queue_notice.reset(notice_token)
+            request_priority.reset(priority_token)
+            if self._in_flight[user_id] <= 1:
+                del self._in_flight[user_id]
+            else:
+                self._in_flight[user_id] -= 1
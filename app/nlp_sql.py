@@ -1,9 +1,111 @@
+import asyncio
+import hashlib
+import logging
+
+from app.core.cache import CacheBackend, create_cache
+from app.core.config import settings
+from app.core.metrics import LLM_QUEUE, annotate, register_collector, stage
+from app.core.state import get_state, wait_for_value
 from app.llm.factory import get_llm_client
+from app.llm.queue import PriorityLimiter, request_priority
+from app.prompt_builder import prompt_version
+from app.question_normalizer import normalize_question
+
+logger = logging.getLogger(__name__)
+
+_llm_queue: PriorityLimiter | None = None
+_question_cache: CacheBackend | None = None
+
+
+def get_llm_queue() -> PriorityLimiter:
+    """
+    Очередь к LLM: LLM_MAX_CONCURRENCY одновременных запросов, не больше LLM_QUEUE_SIZE ожидающих.
+    """
+    global _llm_queue
+    if _llm_queue is None:
+        _llm_queue = PriorityLimiter(settings.llm.llm_max_concurrency, settings.llm.llm_queue_size)
+    return _llm_queue
+
+
+def _collect_queue_stats() -> None:
+    if _llm_queue is not None:
+        LLM_QUEUE.set(_llm_queue.active, state="active")
+        LLM_QUEUE.set(_llm_queue.waiting, state="waiting")
+
+
+register_collector(_collect_queue_stats)
+
 
+def prompt_fingerprint() -> str:
+    """
+    Отпечаток всего, от чего зависит ответ LLM: при смене промпта или модели старые записи кэша не используются.
+    """
+    llm = settings.llm
+    payload = "\0".join((llm.llm_provider, llm.mistral_model, llm.openai_model, llm.local_model_path, llm.llm_routes, prompt_version()))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def get_question_cache() -> CacheBackend:
+    """
+    Кэш вопрос -> проверенный SQL.
+    """
+    global _question_cache
+    if _question_cache is None:
+        _question_cache = create_cache(
+            maxsize=settings.cache.question_cache_size,
+            ttl=settings.cache.question_cache_ttl_seconds,
+            namespace=prompt_fingerprint(),
+            path=settings.cache.question_cache_path,
+            table="question_cache",
+        )
+    return _question_cache
 
-def natural_language_to_sql(question: str) -> str:
+
+async def natural_language_to_sql(question: str) -> str:
     """
     превращает вопрос на естественном языке в SQL
     """
+    cache = get_question_cache()
+    key = f"{cache.namespace}:{normalize_question(question)}"
+
+    sql = await cache.get(key)
+    if sql is not None:
+        logger.info("Question cache hit (%s)", cache.stats())
+        annotate(path="question_cache")
+        return sql
+
+    # single-flight между воркерами: LLM спрашивает тот, кто взял блокировку,
+    # остальные ждут его ответ в общем кэше (внутри процесса это уже делает app.pipeline)
+    state = get_state()
+    timeout = settings.llm.llm_timeout_seconds
+    token = await state.acquire_lock(f"llm:{key}", ttl=timeout)
+    if token is None:
+        with stage("llm_shared_wait"):
+            sql = await wait_for_value(lambda: cache.get(key), timeout=timeout)
+        if sql is not None:
+            annotate(path="question_cache")
+            return sql
+        logger.warning("No shared LLM answer within %.0fs, asking LLM directly", timeout)
+
+    try:
+        sql = await _generate_sql(question)
+        await cache.set(key, sql)
+    finally:
+        if token is not None:
+            await state.release_lock(f"llm:{key}", token)
+    return sql
+
+
+async def _generate_sql(question: str) -> str:
     llm = get_llm_client()
-    return llm.generate_sql(question)
+    queue = get_llm_queue()
+    with stage("llm_queue"):
+        await queue.acquire(request_priority.get())
+    try:
+        with stage("llm"):
+            return await asyncio.wait_for(
+                llm.agenerate_sql(question),
+                timeout=settings.llm.llm_timeout_seconds,
+            )
+    finally:
+        queue.release()
@@ -0,0 +1,51 @@
+import logging
+
+from app.core.metrics import annotate, stage
+from app.core.singleflight import SingleFlight
+from app.fast_path import match_template
+from app.memory_store import get_memory_store
+from app.nlp_sql import natural_language_to_sql
+from app.question_normalizer import normalize_question
+from app.result_cache import get_result_cache
+from app.sql_executor import run_sql_and_get_number
+from app.sql_rewrite import rewrite_sql
+
+logger = logging.getLogger(__name__)
+
+
+# одинаковые (после нормализации) вопросы, пришедшие одновременно, делят один вызов LLM и один SQL
+_answers = SingleFlight("answer")
+
+
+async def answer_question(question: str) -> int | float:
+    """
+    Ответ на вопрос; одновременные одинаковые вопросы обрабатываются один раз.
+    """
+    return await _answers.do(normalize_question(question), lambda: _answer(question))
+
+
+async def _answer(question: str) -> int | float:
+    """
+    Полный путь вопроса: шаблон (без LLM; при MEMORY_STORE=true — и без БД) или LLM -> SQL,
+    затем выполнение в БД.
+    """
+    with stage("template"):
+        template = match_template(question)
+    if template is not None:
+        logger.info("Fast path: %s %s", template.intent, template.params)
+        annotate(path="template", sql=template.sql)
+        store = get_memory_store()
+        if store is not None:
+            with stage("memory_store"):
+                value = store.answer(template, get_result_cache().version)
+            if value is not None:
+                return value
+        return await run_sql_and_get_number(template.sql, template.params, trusted=True)
+
+    # ненерируем SQL через ИИ (не блокируя остальные чаты)
+    annotate(path="llm")
+    sql = await natural_language_to_sql(question)
+    with stage("sql_rewrite"):
+        sql = rewrite_sql(sql)
+    annotate(sql=sql)
+    return await run_sql_and_get_number(sql)
@@ -0,0 +1,130 @@
+"""
+Сборка промпта под конкретный вопрос.
+
+Системное сообщение начинается с PROMPT_PREFIX — он одинаков у всех запросов, и провайдеры
+с кэшированием префикса (OpenAI, vLLM, llama.cpp server) его не пересчитывают. За ним идут только
+нужные вопросу части: схема video_snapshots и подсказки, выбранные по ключевым словам
+нормализованного вопроса, всегда в одном порядке — поэтому у похожих вопросов системное сообщение
+совпадает целиком и тоже попадает в кэш. Если ни одна подсказка не подошла, добавляются все,
+чтобы необычный вопрос получил полный контекст. Вопрос — отдельным сообщением пользователя.
+
+LLM_PROMPT_MODE=full — весь SYSTEM_PROMPT для любого вопроса.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.prompts import (
+    PROMPT_PREFIX,
+    RULE_CREATOR,
+    RULE_DATES,
+    RULE_DISTINCT_GROWTH,
+    RULE_SUM_GROWTH,
+    RULE_TOTAL_VIDEOS,
+    RULE_VIEWS_THRESHOLD,
+    SCHEMA_SNAPSHOTS,
+    SYSTEM_PROMPT,
+)
+from app.question_normalizer import normalize_question
+
+
+@dataclass(frozen=True)
+class PromptSnippet:
+    """
+    Подсказка к промпту и признаки вопросов, которым она нужна.
+    """
+    name: str
+    text: str
+    pattern: re.Pattern
+    # подсказка про video_snapshots — вместе с ней нужна схема этой таблицы
+    needs_snapshots: bool = False
+
+
+# Шаблоны сопоставляются с нормализованным вопросом (см. normalize_question):
+# нижний регистр, без пунктуации, даты в YYYY-MM-DD, "id <hex>".
+# Порядок списка — порядок подсказок в промпте: одинаковые наборы дают одинаковый текст промпта.
+SNIPPETS = (
+    PromptSnippet(
+        "dates",
+        RULE_DATES,
+        re.compile(
+            r"\d{4}-\d{2}-\d{2}|\b\d{4}\b|\bдат|\bдн[еяи]|\bдень|период|вчера|сегодня|недел|месяц|\bгод"
+            r"|январ|феврал|\bмарт|апрел|\bма[йяе]\b|\bиюн|\bиюл|август|сентябр|октябр|ноябр|декабр"
+        ),
+    ),
+    PromptSnippet(
+        "creator",
+        RULE_CREATOR,
+        re.compile(r"\bid \w+|креатор|автор|блогер|канал"),
+    ),
+    PromptSnippet(
+        "total_videos",
+        RULE_TOTAL_VIDEOS,
+        re.compile(r"\bвсего\b|в системе|в базе"),
+    ),
+    PromptSnippet(
+        "views_threshold",
+        RULE_VIEWS_THRESHOLD,
+        re.compile(r"\b(?:больше|более|меньше|менее|свыше|от)\b.*\d|\d.*\b(?:и больше|и более)\b"),
+    ),
+    PromptSnippet(
+        "sum_growth",
+        RULE_SUM_GROWTH,
+        re.compile(r"вырос|прирост|\bрост|прибав|в сумме|суммарн"),
+        needs_snapshots=True,
+    ),
+    PromptSnippet(
+        "distinct_growth",
+        RULE_DISTINCT_GROWTH,
+        re.compile(r"разных|уникальн|новые просмотры|получали"),
+        needs_snapshots=True,
+    ),
+)
+
+# признаки вопросов про почасовые замеры, даже если подсказка не нашлась
+SNAPSHOTS_RE = re.compile(r"замер|снапшот|snapshot|по часам|\bчас")
+
+
+def select_snippets(question: str) -> list[PromptSnippet]:
+    """
+    Подсказки, подходящие к вопросу; все, если не подошла ни одна.
+    """
+    normalized = normalize_question(question)
+    selected = [snippet for snippet in SNIPPETS if snippet.pattern.search(normalized)]
+    return selected or list(SNIPPETS)
+
+
+def system_prompt(question: str | None = None) -> str:
+    """
+    Системное сообщение: PROMPT_PREFIX, затем нужные вопросу схема и подсказки.
+    Без вопроса (и в режиме full) — полный промпт.
+    """
+    if question is None or settings.llm.llm_prompt_mode == "full":
+        return SYSTEM_PROMPT
+
+    snippets = select_snippets(question)
+    parts = [PROMPT_PREFIX]
+    if any(snippet.needs_snapshots for snippet in snippets) or SNAPSHOTS_RE.search(question.lower()):
+        parts.append(SCHEMA_SNAPSHOTS)
+    parts.append("\nПодсказки:\n")
+    parts.extend(snippet.text for snippet in snippets)
+    return "".join(parts)
+
+
+def build_messages(question: str) -> list[dict]:
+    return [
+        {"role": "system", "content": system_prompt(question)},
+        {"role": "user", "content": question},
+    ]
+
+
+def prompt_version() -> str:
+    """
+    Хэш текстов, правил выбора подсказок и режима — меняется при любой правке промпта.
+    """
+    payload = "\0".join((
+        settings.llm.llm_prompt_mode, SYSTEM_PROMPT, SNAPSHOTS_RE.pattern,
+        *(snippet.pattern.pattern for snippet in SNIPPETS),
+    ))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,112 @@
+import re
+from datetime import date
+
+# основы названий месяцев в родительном/именительном падеже
+RU_MONTHS = {
+    "январ": 1,
+    "феврал": 2,
+    "март": 3,
+    "апрел": 4,
+    "ма": 5,
+    "июн": 6,
+    "июл": 7,
+    "август": 8,
+    "сентябр": 9,
+    "октябр": 10,
+    "ноябр": 11,
+    "декабр": 12,
+}
+
+MONTH_RE = r"(январ[яь]|феврал[яь]|марта?|апрел[яь]|ма[яй]|июн[яь]|июл[яь]|августа?|сентябр[яь]|октябр[яь]|ноябр[яь]|декабр[яь])"
+
+# "с 1 по 5 ноября 2025", "1-5 ноября 2025" ("1 и 5 ноября" — два отдельных дня, не диапазон)
+DAY_RANGE_RE = re.compile(
+    rf"\b(\d{{1,2}})\s*(?:по|до|-|—|–)\s*(\d{{1,2}})\s+{MONTH_RE}\s+(\d{{4}})(?:\s*(?:года|г\.?)(?!\w))?"
+)
+# "28 ноября 2025" / "28 ноября" (год берём из следующей полной даты)
+RU_DATE_RE = re.compile(rf"\b(\d{{1,2}})\s+{MONTH_RE}(?:\s+(\d{{4}}))?(?:\s*(?:года|г\.?)(?!\w))?")
+# "28.11.2025"
+DOTTED_DATE_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4})\b")
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+# год ближайшей полной даты правее: "5 ноября 2025", "2025-11-05" или "05.11.2025"
+# (не любое четырёхзначное число — "28 ноября, больше 1000 просмотров" без года)
+FOLLOWING_YEAR_RE = re.compile(
+    rf"\b\d{{1,2}}\s+{MONTH_RE}\s+(?P<ru>\d{{4}})\b"
+    r"|\b(?P<iso>\d{4})-\d{2}-\d{2}\b"
+    r"|\b\d{1,2}\.\d{1,2}\.(?P<dotted>\d{4})\b"
+)
+
+# "id aca1...", "id: aca1...", "id=aca1...", "айди aca1..."
+ID_RE = re.compile(r"\b(?:id|айди)\s*(?:[:=№#]\s*)?([0-9a-f]{8,})\b")
+# знаки сравнения меняют смысл вопроса: до удаления пунктуации заменяются словами
+# (длинные раньше коротких: ">=" не должен стать "больше =")
+COMPARISONS = (
+    (">=", " не менее "), ("=>", " не менее "), ("≥", " не менее "),
+    ("<=", " не более "), ("=<", " не более "), ("≤", " не более "),
+    ("!=", " не равно "), ("<>", " не равно "), ("≠", " не равно "),
+    (">", " больше "), ("<", " меньше "), ("=", " равно "),
+)
+PUNCT_RE = re.compile(r"[^\w\s\-]")
+SPACES_RE = re.compile(r"\s+")
+
+
+def month_number(word: str) -> int:
+    """
+    Номер месяца по русскому названию ("ноября" -> 11).
+    """
+    word = word.lower()
+    # "ма" — самая короткая основа, проверяем её последней
+    for stem, number in sorted(RU_MONTHS.items(), key=lambda kv: -len(kv[0])):
+        if word.startswith(stem):
+            return number
+    raise ValueError(f"Unknown month: {word!r}")
+
+
+def _iso(year: int, month: int, day: int) -> str:
+    return date(year, month, day).isoformat()
+
+
+def canonicalize_dates(text: str) -> str:
+    """
+    Переводит даты из русского текста в формат YYYY-MM-DD.
+    "с 1 по 5 ноября 2025" -> "с 2025-11-01 по 2025-11-05".
+    """
+
+    def day_range(m: re.Match) -> str:
+        month, year = month_number(m.group(3)), int(m.group(4))
+        return f"{_iso(year, month, int(m.group(1)))} по {_iso(year, month, int(m.group(2)))}"
+
+    text = DAY_RANGE_RE.sub(day_range, text)
+
+    def ru_date(m: re.Match) -> str:
+        year = m.group(3)
+        if year is None:
+            # "с 1 ноября по 5 ноября 2025": год берём из ближайшей даты правее
+            following = FOLLOWING_YEAR_RE.search(text, m.end())
+            if following is None:
+                return m.group(0)
+            year = following.group("ru") or following.group("iso") or following.group("dotted")
+        return _iso(int(year), month_number(m.group(2)), int(m.group(1)))
+
+    text = RU_DATE_RE.sub(ru_date, text)
+    text = DOTTED_DATE_RE.sub(lambda m: _iso(int(m.group(3)), int(m.group(2)), int(m.group(1))), text)
+    return text
+
+
+def normalize_question(question: str) -> str:
+    """
+    Приводит вопрос к канонической форме для ключей кэша:
+    регистр, "ё", пунктуация (знаки сравнения — словами), пробелы, даты и идентификаторы.
+    """
+    text = question.lower().replace("ё", "е")
+    text = SPACES_RE.sub(" ", text).strip()
+    try:
+        text = canonicalize_dates(text)
+    except ValueError:
+        # несуществующая дата ("31 ноября") — оставляем как есть, LLM разберётся
+        pass
+    text = ID_RE.sub(lambda m: f"id {m.group(1)}", text)
+    for sign, words in COMPARISONS:
+        text = text.replace(sign, words)
+    text = PUNCT_RE.sub(" ", text)
+    return SPACES_RE.sub(" ", text).strip()
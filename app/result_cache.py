@@ -0,0 +1,171 @@
+"""
+Кэш результатов SQL: нормализованный SQL + параметры -> число.
+
+Данные меняются только при загрузке (app/loader.py), поэтому записи живут до следующего
+увеличения data_version. Бот узнаёт о нём через LISTEN data_version; пока версия
+неизвестна (слушатель не запущен или соединение потеряно), кэш не используется.
+"""
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+
+import asyncpg
+
+from app.core.cache import CacheBackend, create_cache
+from app.core.config import settings
+from app.core.db import connect_raw
+from app.ingest.state import DATA_VERSION_CHANNEL
+from app.sql_rewrite import squash_sql
+from app.sql_validator import SqlValidationError, canonical_sql
+
+logger = logging.getLogger(__name__)
+
+
+def query_key(sql: str, params: dict | None = None) -> str:
+    """
+    Ключ запроса: каноническая форма SQL (app/sql_validator.py) + параметры.
+    """
+    try:
+        key = canonical_sql(sql)
+    except SqlValidationError:
+        key = squash_sql(sql)
+    if params:
+        key += ":" + json.dumps(params, sort_keys=True, default=str)
+    return key
+
+
+class ResultCache:
+    """
+    Кэш результатов, привязанный к версии данных.
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        self.backend = backend
+        self.version: int | None = None
+
+    @staticmethod
+    def _key(version: int, sql: str, params: dict | None) -> str:
+        return f"{version}:{query_key(sql, params)}"
+
+    async def get(self, sql: str, params: dict | None = None) -> int | float | None:
+        if self.version is None:
+            return None
+        value = await self.backend.get(self._key(self.version, sql, params))
+        return None if value is None else json.loads(value)
+
+    async def set(self, sql: str, params: dict | None, value: int | float, version: int | None) -> None:
+        """
+        Сохраняет результат, посчитанный на данных версии version (её читают до выполнения запроса).
+        Если версия за время выполнения сменилась, результат мог быть посчитан на старых данных — не сохраняем.
+        """
+        if version is None or version != self.version:
+            return
+        await self.backend.set(self._key(version, sql, params), json.dumps(value))
+
+    async def set_version(self, version: int | None) -> None:
+        if version == self.version:
+            return
+        logger.info("Data version %s -> %s, result cache cleared", self.version, version)
+        self.version = version
+        await self.backend.clear()
+
+
+_result_cache: ResultCache | None = None
+_listener_conn: asyncpg.Connection | None = None
+_background: set[asyncio.Task] = set()
+_version_callbacks: list[Callable[[int], Awaitable[None]]] = []
+
+
+def _spawn(coro) -> None:
+    task = asyncio.get_running_loop().create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            create_cache(
+                maxsize=settings.cache.result_cache_size,
+                ttl=settings.cache.result_cache_ttl_seconds,
+            )
+        )
+    return _result_cache
+
+
+def on_data_version_change(callback: Callable[[int], Awaitable[None]]) -> None:
+    """
+    Регистрирует callback(version), который вызывается в фоне после каждой новой версии данных.
+    """
+    _version_callbacks.append(callback)
+
+
+async def _apply_version(version: int | None) -> None:
+    cache = get_result_cache()
+    changed = version != cache.version
+    await cache.set_version(version)
+    if not changed or version is None:
+        return
+    for callback in _version_callbacks:
+        try:
+            await callback(version)
+        except Exception:
+            logger.exception("Data version %d callback failed", version)
+
+
+# пауза между попытками переподключить слушателя: от первой до последней с удвоением
+_RECONNECT_DELAYS = (1.0, 60.0)
+
+
+async def _listen() -> int:
+    """
+    Открывает соединение слушателя, подписывается на NOTIFY data_version и возвращает текущую версию.
+    """
+    global _listener_conn
+
+    def on_notify(conn, pid, channel, payload: str) -> None:
+        _spawn(_apply_version(int(payload)))
+
+    def on_terminate(conn) -> None:
+        # без уведомлений кэш мог бы отдавать устаревшие числа — выключаем до переподключения
+        logger.warning("Data version listener lost, result cache disabled until it reconnects")
+        _spawn(_reconnect())
+
+    conn = await connect_raw()
+    try:
+        await conn.add_listener(DATA_VERSION_CHANNEL, on_notify)
+        # версия читается после подписки: уведомление о следующей не потеряется
+        version = await conn.fetchval("SELECT version FROM data_version")
+    except BaseException:
+        await conn.close()
+        raise
+    conn.add_termination_listener(on_terminate)
+    _listener_conn = conn
+    return version
+
+
+async def _reconnect() -> None:
+    await get_result_cache().set_version(None)
+    delay, max_delay = _RECONNECT_DELAYS
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            version = await _listen()
+        except Exception as e:
+            delay = min(delay * 2, max_delay)
+            logger.warning("Data version listener reconnect failed, retry in %.0fs: %s", delay, e)
+            continue
+        logger.info("Data version listener reconnected, data version %d", version)
+        # за время разрыва уведомления могли потеряться: копии и массивы перечитываются
+        await _apply_version(version)
+        return
+
+
+async def start_data_version_listener() -> None:
+    """
+    Подписывается на NOTIFY data_version и включает кэш результатов.
+    При потере соединения кэш выключается, а слушатель переподключается с растущей паузой.
+    """
+    await get_result_cache().set_version(await _listen())
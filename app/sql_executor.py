@@ -1,8 +1,38 @@
+from app.core.columnar import get_columnar_store
 from app.core.db import execute_sql_and_get_number
+from app.core.metrics import stage
+from app.core.singleflight import SingleFlight
+from app.result_cache import get_result_cache, query_key
 
+# одинаковые запросы, пришедшие одновременно, выполняются в базе один раз
+_queries = SingleFlight("sql")
 
-async def run_sql_and_get_number(sql: str):
+
+async def _execute(sql: str, params: dict | None, trusted: bool, version: int | None):
+    value = None
+    store = get_columnar_store()
+    if store is not None:
+        with stage("columnar"):
+            value = await store.execute(sql, params, version)
+    if value is None:
+        with stage("db"):
+            value = await execute_sql_and_get_number(sql, params, trusted=trusted)
+    await get_result_cache().set(sql, params, value, version)
+    return value
+
+
+async def run_sql_and_get_number(sql: str, params: dict | None = None, trusted: bool = False):
     """
-    Асинхронный вызов выполнения SQL и получения одного ответа
+    Асинхронный вызов выполнения SQL и получения одного ответа.
+    При SQL_BACKEND=duckdb запрос сначала выполняется в колоночной копии (app/core/columnar.py).
     """
-    return await execute_sql_and_get_number(sql)
+    cache = get_result_cache()
+    value = await cache.get(sql, params)
+    if value is not None:
+        return value
+
+    # версия — до выполнения: результат относится к данным не новее неё
+    version = cache.version
+    return await _queries.do(
+        f"{version}:{query_key(sql, params)}", lambda: _execute(sql, params, trusted, version),
+    )
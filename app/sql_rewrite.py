@@ -0,0 +1,172 @@
+"""
+Пост-обработка SQL от LLM перед выполнением.
+
+1. Запросы, которые считают дневные агрегаты по почасовым video_snapshots, переписываются
+   на дневной роллап video_daily_stats (см. app/ingest/rollup.py).
+2. Фильтры вида column::date = 'YYYY-MM-DD'::date (правило 4 промпта) не могут использовать
+   индексы по timestamptz-колонкам, поэтому превращаются в полуинтервалы
+   column >= <начало дня> AND column < <начало следующего дня> в часовом поясе DB_TIMEZONE.
+
+Всё, что не распознано, возвращается без изменений.
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+from app.sql_validator import canonical_sql
+
+logger = logging.getLogger(__name__)
+
+SPACES_RE = re.compile(r"\s+")
+
+DATE_LIT = r"'(\d{4}-\d{2}-\d{2})'(?:::date)?"
+DAY_EXPR = r"(?:created_at::date|date\(created_at\))"
+DAY_EQ_RE = re.compile(rf"{DAY_EXPR} ?= ?{DATE_LIT}", re.IGNORECASE)
+DAY_BETWEEN_RE = re.compile(rf"{DAY_EXPR} between {DATE_LIT} and {DATE_LIT}", re.IGNORECASE)
+
+# SELECT [COALESCE(]SUM(delta_*_count)[, 0)] AS result FROM video_snapshots WHERE <день>
+SUM_DELTA_RE = re.compile(
+    r"^select (?P<agg>coalesce\(sum\(delta_(?:views|likes|comments|reports)_count\), ?0\)"
+    r"|sum\(delta_(?:views|likes|comments|reports)_count\)) as result "
+    r"from video_snapshots where (?P<pred>.+)$",
+    re.IGNORECASE,
+)
+# SELECT COUNT(DISTINCT video_id) AS result FROM video_snapshots WHERE <день> AND delta_views_count > 0
+DISTINCT_GROWTH_RE = re.compile(
+    r"^select count\(distinct video_id\) as result from video_snapshots where (?P<pred>.+)$",
+    re.IGNORECASE,
+)
+GROWTH_RE = re.compile(r"delta_views_count ?> ?0", re.IGNORECASE)
+
+
+def squash_sql(sql: str) -> str:
+    """
+    Одна строка, одиночные пробелы, без завершающей ";".
+    """
+    sql = SPACES_RE.sub(" ", sql).strip().rstrip(";").strip()
+    return sql.replace("( ", "(").replace(" )", ")")
+
+
+def _day_predicate(pred: str) -> str | None:
+    """
+    Условие по дню для video_daily_stats или None, если pred — не фильтр по дате created_at.
+    """
+    m = DAY_EQ_RE.fullmatch(pred)
+    if m:
+        return f"day = '{m.group(1)}'::date"
+    m = DAY_BETWEEN_RE.fullmatch(pred)
+    if m:
+        return f"day BETWEEN '{m.group(1)}'::date AND '{m.group(2)}'::date"
+    return None
+
+
+def rewrite_to_rollup(sql: str) -> str:
+    """
+    Переписывает дневные агрегаты по video_snapshots на video_daily_stats.
+    """
+    try:
+        canonical = canonical_sql(sql)
+    except ValueError:
+        return sql
+
+    m = SUM_DELTA_RE.match(canonical)
+    if m:
+        day = _day_predicate(m.group("pred"))
+        if day is not None:
+            return f"SELECT {m.group('agg')} AS result FROM video_daily_stats WHERE {day}"
+
+    m = DISTINCT_GROWTH_RE.match(canonical)
+    if m:
+        parts = re.split(r" and ", m.group("pred"), flags=re.IGNORECASE)
+        growth = [p for p in parts if GROWTH_RE.fullmatch(p)]
+        rest = [p for p in parts if not GROWTH_RE.fullmatch(p)]
+        day = _day_predicate(" and ".join(rest)) if len(growth) == 1 else None
+        if day is not None:
+            # за один день пара (day, video_id) уникальна, за диапазон — нет
+            count = "COUNT(*)" if day.startswith("day =") else "COUNT(DISTINCT video_id)"
+            return (
+                f"SELECT {count} AS result FROM video_daily_stats "
+                f"WHERE {day} AND views_growth_snapshots > 0"
+            )
+
+    return sql
+
+
+TS_COLUMN = r"\b(?:\w+\.)?(?:video_created_at|created_at|updated_at)"
+DATE_CAST = rf"(?:(?P<col>{TS_COLUMN})::date|date\((?P<fcol>{TS_COLUMN})\))"
+# за литералом — конец предиката: иначе '2025-11-01'::date + 1 остался бы после диапазона
+DATE_END = r"(?=\s*(?:\band\b|\bor\b|\)|;|$))"
+DATE_BETWEEN_RE = re.compile(
+    rf"{DATE_CAST}\s+between\s+{DATE_LIT}\s+and\s+{DATE_LIT}{DATE_END}",
+    re.IGNORECASE,
+)
+DATE_CMP_RE = re.compile(
+    rf"{DATE_CAST}\s*(?P<op>>=|<=|=|>|<)\s*{DATE_LIT}{DATE_END}",
+    re.IGNORECASE,
+)
+
+
+def day_start(day: date) -> datetime:
+    """
+    Начало дня в часовом поясе DB_TIMEZONE.
+    """
+    return datetime(day.year, day.month, day.day, tzinfo=ZoneInfo(settings.database.db_timezone))
+
+
+def _ts(day: date) -> str:
+    return f"'{day_start(day).isoformat()}'::timestamptz"
+
+
+def _range(column: str, first: date | None, last: date | None) -> str:
+    """
+    Полуинтервал по timestamptz-колонке для дней [first, last] (None — без границы).
+    """
+    bounds = []
+    if first is not None:
+        bounds.append(f"{column} >= {_ts(first)}")
+    if last is not None:
+        bounds.append(f"{column} < {_ts(last + timedelta(days=1))}")
+    return f"({' AND '.join(bounds)})"
+
+
+def rewrite_date_predicates(sql: str) -> str:
+    """
+    Делает фильтры по датам sargable: column::date <op> 'YYYY-MM-DD' -> диапазон по column.
+    """
+
+    def between(m: re.Match) -> str:
+        column = m.group("col") or m.group("fcol")
+        first, last = date.fromisoformat(m.group(3)), date.fromisoformat(m.group(4))
+        return _range(column, first, last)
+
+    def compare(m: re.Match) -> str:
+        column = m.group("col") or m.group("fcol")
+        day, op = date.fromisoformat(m.group(4)), m.group("op")
+        if op == "=":
+            return _range(column, day, day)
+        if op == ">=":
+            return _range(column, day, None)
+        if op == ">":
+            return _range(column, day + timedelta(days=1), None)
+        if op == "<=":
+            return _range(column, None, day)
+        return _range(column, None, day - timedelta(days=1))
+
+    try:
+        sql = DATE_BETWEEN_RE.sub(between, sql)
+        return DATE_CMP_RE.sub(compare, sql)
+    except ValueError:
+        # несуществующая дата — пусть ошибку вернёт Postgres
+        return sql
+
+
+def rewrite_sql(sql: str) -> str:
+    """
+    Все переписывания SQL, которые применяются перед выполнением.
+    """
+    rewritten = rewrite_date_predicates(rewrite_to_rollup(sql))
+    if rewritten != sql:
+        logger.info("Rewritten SQL: %s", rewritten)
+    return rewritten
@@ -0,0 +1,245 @@
+"""
+Проверка SQL от LLM и его каноническая форма.
+
+SQL разбирается на токены (строки, идентификаторы, числа, операторы; комментарии выбрасываются),
+поэтому проверки работают со словами запроса, а не с подстроками: updated_at — это идентификатор,
+а не UPDATE. Разрешён ровно один запрос SELECT (или WITH ... SELECT), только к таблицам
+из ALLOWED_TABLES (и CTE этого же запроса) и только с функциями из ALLOWED_FUNCTIONS.
+
+Каноническая форма — те же токены через одиночные пробелы: ключевые слова в верхнем регистре,
+идентификаторы и функции в нижнем, без комментариев и ";". Она одинакова для запросов,
+отличающихся только оформлением, и используется как ключ кэша результатов и вход переписываний
+(app/sql_rewrite.py).
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+ALLOWED_TABLES = frozenset({"videos", "video_snapshots", "video_daily_stats"})
+
+ALLOWED_FUNCTIONS = frozenset({
+    # агрегаты
+    "count", "sum", "avg", "min", "max", "stddev", "stddev_pop", "stddev_samp", "variance",
+    "var_pop", "var_samp", "percentile_cont", "percentile_disc", "mode", "bool_and", "bool_or",
+    # выражения
+    "coalesce", "nullif", "greatest", "least", "abs", "round", "floor", "ceil", "ceiling", "trunc",
+    "sign", "sqrt", "power", "mod", "cast", "lower", "upper", "length", "substring", "trim",
+    # даты
+    "date", "date_trunc", "date_part", "extract", "make_date", "to_date", "to_char", "age", "now",
+})
+
+# слова, которых не может быть в запросе на чтение, в любой позиции
+FORBIDDEN_WORDS = frozenset({
+    "insert", "update", "delete", "merge", "drop", "alter", "truncate", "create", "grant", "revoke",
+    "copy", "call", "do", "execute", "set", "reset", "lock", "vacuum", "analyze", "cluster", "reindex",
+    "refresh", "comment", "listen", "notify", "unlisten", "prepare", "deallocate", "discard", "into",
+    "returning", "begin", "commit", "rollback", "savepoint", "checkpoint", "load", "import",
+    # TABLE name — сокращение SELECT * FROM name, минующее проверку таблиц после FROM
+    "table",
+})
+
+KEYWORDS = frozenset({
+    "select", "from", "where", "and", "or", "not", "as", "on", "join", "left", "right", "inner",
+    "outer", "full", "cross", "natural", "lateral", "group", "by", "order", "having", "limit",
+    "offset", "distinct", "all", "any", "some", "in", "exists", "between", "like", "ilike",
+    "similar", "escape", "is", "null", "true", "false", "case", "when", "then", "else", "end",
+    "with", "recursive", "union", "intersect", "except", "asc", "desc", "nulls", "first", "last",
+    "filter", "over", "partition", "within", "window", "rows", "range", "preceding", "following",
+    "unbounded", "current", "row", "interval", "at", "time", "zone", "using", "fetch", "next",
+    "only", "for", "current_date", "current_timestamp", "localtimestamp",
+})
+
+# после этих ключевых слов закончился список таблиц FROM текущего уровня
+_FROM_LIST_END = frozenset({
+    "where", "group", "order", "having", "limit", "offset", "union", "intersect", "except",
+    "on", "using", "window", "fetch", "select",
+})
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[eEbBxXnN]?'(?:[^']|'')*')
+    | (?P<qident>"(?:[^"]|"")+")
+    | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<param>(?<!:):[A-Za-z_]\w*)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<op>::|<=|>=|<>|!=|\|\||->>|->|[-+*/%<>=~^&|#@])
+    | (?P<punct>[(),;.\[\]])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class SqlValidationError(ValueError):
+    """
+    SQL от LLM не прошёл проверку.
+    """
+
+
+@dataclass(frozen=True, slots=True)
+class Token:
+    kind: str  # keyword | ident | qident | string | number | param | op | punct
+    value: str
+
+    @property
+    def name(self) -> str:
+        """
+        Имя идентификатора без кавычек, в нижнем регистре для некавыченных.
+        """
+        if self.kind == "qident":
+            return self.value[1:-1].replace('""', '"')
+        return self.value.lower()
+
+
+def tokenize(sql: str) -> list[Token]:
+    tokens = []
+    pos = 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if m is None:
+            raise SqlValidationError(f"Unexpected character {sql[pos]!r} at position {pos}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind in ("space", "comment"):
+            continue
+        value = m.group()
+        if kind == "word":
+            kind = "keyword" if value.lower() in KEYWORDS else "ident"
+        tokens.append(Token(kind, value))
+    return tokens
+
+
+def _render(tokens: list[Token]) -> str:
+    parts: list[str] = []
+    prev: Token | None = None
+    for token in tokens:
+        if token.kind == "keyword":
+            text = token.value.upper()
+        elif token.kind == "ident":
+            text = token.value.lower()
+        else:
+            text = token.value
+
+        if prev is not None and not (
+            prev.value in ("(", "[", "::", ".")
+            or token.value in (")", "]", ",", "::", ".")
+            # вызов функции или тип с модификатором: count(*), numeric(10, 2)
+            or (token.value == "(" and prev.kind in ("ident", "qident"))
+        ):
+            parts.append(" ")
+        parts.append(text)
+        prev = token
+    return "".join(parts)
+
+
+def _strip_semicolons(tokens: list[Token]) -> list[Token]:
+    while tokens and tokens[-1].value == ";":
+        tokens = tokens[:-1]
+    return tokens
+
+
+@lru_cache(maxsize=4096)
+def canonical_sql(sql: str) -> str:
+    """
+    Каноническая форма SQL без проверок (подходит и для шаблонов с :параметрами).
+    """
+    return _render(_strip_semicolons(tokenize(sql)))
+
+
+def replace_params(sql: str, placeholder: str) -> str:
+    """
+    Каноническая форма SQL, где bind-параметры :name заменены на placeholder.format(name=...):
+    для драйверов с другим синтаксисом параметров (DuckDB — $name).
+    """
+    tokens = [
+        Token("param", placeholder.format(name=token.value[1:])) if token.kind == "param" else token
+        for token in _strip_semicolons(tokenize(sql))
+    ]
+    return _render(tokens)
+
+
+def _check(tokens: list[Token]) -> None:
+    if not tokens:
+        raise SqlValidationError("Empty query")
+    if any(token.value == ";" for token in tokens):
+        raise SqlValidationError("Only one statement is allowed")
+    if tokens[0].name not in ("select", "with"):
+        raise SqlValidationError("Only SELECT queries are allowed")
+
+    for token in tokens:
+        if token.kind in ("keyword", "ident") and token.name in FORBIDDEN_WORDS:
+            raise SqlValidationError(f"Forbidden keyword {token.value.upper()}")
+        if token.kind == "param" or (token.kind == "string" and token.value[0] not in "'eE"):
+            raise SqlValidationError(f"Unsupported token {token.value!r}")
+
+    # имена CTE: name AS (
+    ctes = {
+        tokens[i].name
+        for i in range(len(tokens) - 2)
+        if tokens[i].kind in ("ident", "qident") and tokens[i + 1].name == "as" and tokens[i + 2].value == "("
+    }
+
+    # уровни скобок: вызов функции (внутри FROM — часть синтаксиса: extract(day FROM x)) или группа/подзапрос
+    scopes = [{"func": False, "from_list": False}]
+    expect_table = False
+    for i, token in enumerate(tokens):
+        prev = tokens[i - 1] if i else None
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        scope = scopes[-1]
+
+        if token.value == "(":
+            is_call = prev is not None and prev.kind in ("ident", "qident")
+            # FROM (a CROSS JOIN b), JOIN (b) ON ...: скобки в списке таблиц — первое имя внутри тоже таблица
+            grouped = expect_table and not is_call and (nxt is None or nxt.name not in ("select", "with"))
+            scopes.append({"func": is_call, "from_list": grouped})
+            expect_table = grouped
+        elif token.value == ")":
+            if len(scopes) == 1:
+                raise SqlValidationError("Unbalanced parentheses")
+            scopes.pop()
+        elif token.value == "," and scope["from_list"]:
+            expect_table = True
+        elif token.kind == "keyword":
+            name = token.name
+            if name == "from" and not scope["func"]:
+                scope["from_list"] = True
+                expect_table = True
+            elif name == "join":
+                scope["from_list"] = True
+                expect_table = True
+            elif name in _FROM_LIST_END:
+                scope["from_list"] = False
+        elif token.kind in ("ident", "qident"):
+            # "pg_sleep"(1) — тоже вызов функции
+            is_call = nxt is not None and nxt.value == "("
+            # тип с модификатором: ::numeric(10, 2), CAST(x AS numeric(10, 2))
+            is_type = prev is not None and (prev.value == "::" or (prev.name == "as" and scope["func"]))
+            if is_call and not is_type:
+                if token.name.lower() not in ALLOWED_FUNCTIONS:
+                    raise SqlValidationError(f"Function {token.name}() is not allowed")
+                expect_table = False
+            elif expect_table:
+                name = token.name
+                if nxt is not None and nxt.value == ".":
+                    if name != "public":
+                        raise SqlValidationError(f"Schema {name!r} is not allowed")
+                    continue
+                if name not in ALLOWED_TABLES and name not in ctes:
+                    raise SqlValidationError(f"Table {name!r} is not allowed")
+                expect_table = False
+
+    if len(scopes) != 1:
+        raise SqlValidationError("Unbalanced parentheses")
+    if expect_table:
+        raise SqlValidationError("Incomplete FROM clause")
+
+
+def validate_sql(sql: str) -> str:
+    """
+    Проверяет, что SQL — один безопасный SELECT по разрешённым таблицам и функциям.
+    Возвращает каноническую форму запроса.
+    """
+    tokens = _strip_semicolons(tokenize(sql))
+    _check(tokens)
+    return _render(tokens)
@@ -0,0 +1,153 @@
+"""
+Запуск бота в нескольких процессах.
+
+Главный процесс забирает апдейты из Telegram (getUpdates) и кладёт их в общую очередь,
+BOT_WORKERS процессов-обработчиков берут их оттуда и обрабатывают через dp.feed_raw_update.
+Воркер берёт следующий апдейт, только когда у него есть свободный слот
+(BOT_MAX_CONCURRENT_UPDATES), поэтому нагрузка сама распределяется по свободным процессам.
+Кэши, блокировки и лимиты общие, если STATE_BACKEND=sqlite или redis.
+
+Запуск:
+    BOT_WORKERS=4 python -m app.workers
+"""
+import asyncio
+import logging
+import multiprocessing as mp
+import signal
+from multiprocessing.queues import Queue
+
+from aiogram import Bot
+
+from app.bot import create_bot, create_dispatcher, start_services
+from app.core.config import settings
+from app.core.logging_conf import setup_logging
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT_SECONDS = 25
+
+
+async def _worker(index: int, queue: Queue) -> None:
+    bot = create_bot()
+    dp = create_dispatcher()
+    port = settings.metrics.metrics_port
+    # у каждого воркера свой порт метрик: METRICS_PORT + 1 + номер
+    await start_services(metrics_port=port + 1 + index if port else 0)
+    await dp.emit_startup(bot=bot)
+    logger.info("Worker %d started", index)
+
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(settings.bot.bot_max_concurrent_updates)
+    tasks: set[asyncio.Task] = set()
+
+    def done(task: asyncio.Task) -> None:
+        tasks.discard(task)
+        slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Update handling failed", exc_info=task.exception())
+
+    try:
+        while True:
+            await slots.acquire()
+            update = await loop.run_in_executor(None, queue.get)
+            if update is None:
+                slots.release()
+                break
+            task = asyncio.create_task(dp.feed_raw_update(bot, update))
+            tasks.add(task)
+            task.add_done_callback(done)
+    finally:
+        logger.info("Worker %d stopping, %d updates in flight", index, len(tasks))
+        # shutdown диспетчера ждёт начатые апдейты (см. create_dispatcher)
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+
+def _worker_main(index: int, queue: Queue) -> None:
+    # остановкой управляет главный процесс: он пришлёт каждому воркеру None
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    setup_logging()
+    asyncio.run(_worker(index, queue))
+
+
+async def _poll(bot: Bot, queue: Queue, stop: asyncio.Event) -> None:
+    """
+    Long polling в главном процессе: апдейты уходят в очередь воркерам.
+    Если очередь заполнена, новые апдейты не забираются.
+    """
+    allowed_updates = create_dispatcher().resolve_used_update_types()
+    loop = asyncio.get_running_loop()
+    offset: int | None = None
+    stopped = asyncio.ensure_future(stop.wait())
+
+    await bot.delete_webhook()
+    logger.info("Polling updates for %d workers", settings.bot.bot_workers)
+    try:
+        while not stop.is_set():
+            poll = asyncio.ensure_future(
+                bot.get_updates(offset=offset, timeout=POLL_TIMEOUT_SECONDS, allowed_updates=allowed_updates)
+            )
+            await asyncio.wait({poll, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            if not poll.done():
+                poll.cancel()
+                break
+            try:
+                updates = poll.result()
+            except Exception as e:
+                logger.warning("getUpdates failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                await loop.run_in_executor(
+                    None, queue.put, update.model_dump(mode="json", exclude_unset=True)
+                )
+                offset = update.update_id + 1
+
+        if offset is not None:
+            # подтверждаем Telegram последние переданные воркерам апдейты
+            await bot.get_updates(offset=offset, timeout=0, limit=1)
+    finally:
+        stopped.cancel()
+
+
+async def main() -> None:
+    workers = settings.bot.bot_workers
+    if workers < 1:
+        raise ValueError("BOT_WORKERS must be >= 1")
+
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue(maxsize=workers * settings.bot.bot_max_concurrent_updates)
+    processes = [
+        ctx.Process(target=_worker_main, args=(i, queue), name=f"bot-worker-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    bot = create_bot()
+    try:
+        await _poll(bot, queue, stop)
+    finally:
+        logger.info("Stopping %d workers", workers)
+        for _ in processes:
+            await loop.run_in_executor(None, queue.put, None)
+        for process in processes:
+            await loop.run_in_executor(
+                None, process.join, settings.bot.bot_shutdown_timeout_seconds + 5
+            )
+            if process.is_alive():
+                logger.warning("Worker %s did not stop in time, terminating", process.name)
+                process.terminate()
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(main())
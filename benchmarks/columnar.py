@@ -0,0 +1,136 @@
+"""
+Сравнение выполнения запросов в Postgres и в колоночной копии DuckDB (SQL_BACKEND=duckdb).
+
+Копия строится загрузчиком (app/ingest/columnar.py) в --path из базы по настройкам. Затем каждый
+запрос — эталонный SQL корпуса, он же после переписываний (rewrite_sql), шаблоны fast path
+с параметрами и агрегаты по всей истории — выполняется в обоих местах --iterations раз.
+Печатается медиана по каждому движку; результаты должны совпадать, запросы, которые DuckDB
+не выполнил (fallback в Postgres), отмечены отдельно. Скрипт завершается с ошибкой при
+расхождении результатов.
+
+Запуск:
+    python -m benchmarks.columnar [--iterations 5] [--path /tmp/bench.duckdb]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.corpus import CORPUS
+
+# агрегаты по всей истории снапшотов: их и должна ускорять колоночная копия
+ANALYTICS = [
+    "SELECT COALESCE(SUM(delta_views_count), 0) AS result FROM video_snapshots;",
+    "SELECT COUNT(DISTINCT video_id) AS result FROM video_snapshots WHERE delta_likes_count > 0;",
+    "SELECT AVG(delta_views_count) AS result FROM video_snapshots WHERE delta_views_count > 0;",
+    "SELECT MAX(views_count) AS result FROM video_snapshots WHERE created_at::date >= '2025-11-15'::date;",
+    "SELECT COUNT(*) AS result FROM (SELECT video_id FROM video_snapshots "
+    "GROUP BY video_id HAVING SUM(delta_reports_count) > 0) t;",
+    "SELECT COALESCE(SUM(s.delta_views_count), 0) AS result FROM video_snapshots s "
+    "JOIN videos v ON v.id = s.video_id WHERE v.views_count > 10000;",
+    "SELECT COUNT(DISTINCT date_trunc('day', created_at)) AS result FROM video_snapshots;",
+    "SELECT to_char(MAX(created_at), 'YYYYMMDD')::int AS result FROM video_snapshots;",
+    # деление: в Postgres int / int целое, SUM(bigint) / ... дробное — такие запросы копия отдаёт в Postgres
+    "SELECT MAX(views_count) / 7 AS result FROM videos;",
+    "SELECT SUM(likes_count) * 100 / SUM(views_count) AS result FROM videos;",
+]
+
+
+def _queries() -> list[tuple[str, str, dict | None]]:
+    from app.fast_path import match_template
+    from app.sql_rewrite import rewrite_sql
+
+    queries: dict[tuple[str, str], tuple[str, str, dict | None]] = {}
+
+    def add(kind: str, sql: str, params: dict | None = None) -> None:
+        queries.setdefault((sql, repr(params)), (kind, sql, params))
+
+    for question, sql in CORPUS:
+        add("corpus", sql)
+        add("rewritten", rewrite_sql(sql))
+        template = match_template(question)
+        if template is not None:
+            add("template", template.sql, template.params)
+    for sql in ANALYTICS:
+        add("analytics", sql)
+    return list(queries.values())
+
+
+async def _timed(fn, iterations: int):
+    times = []
+    value = None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        value = await fn()
+        times.append(time.perf_counter() - started)
+    return value, statistics.median(times)
+
+
+def _same(a, b) -> bool:
+    return abs(float(a) - float(b)) < 1e-6 * max(1.0, abs(float(a)))
+
+
+async def run(args: argparse.Namespace) -> int:
+    from app.core.columnar import ColumnarStore
+    from app.core.db import connect_raw, engine, execute_sql_and_get_number
+    from app.ingest.columnar import build_columnar_copy
+
+    conn = await connect_raw()
+    try:
+        snapshots = await conn.fetchval("SELECT COUNT(*) FROM video_snapshots")
+        started = time.perf_counter()
+        await build_columnar_copy(conn, args.path)
+        build_seconds = time.perf_counter() - started
+    finally:
+        await conn.close()
+
+    store = ColumnarStore(args.path)
+    store.connection()
+    print(f"snapshots: {snapshots}, copy built in {build_seconds:.1f}s ({os.path.getsize(args.path) / 2**20:.1f} MiB)")
+    print(f"{'kind':<10}{'postgres':>11}{'duckdb':>11}{'speedup':>9}  sql")
+
+    totals = {"postgres": {}, "duckdb": {}}
+    mismatches = fallbacks = 0
+    try:
+        for kind, sql, params in _queries():
+            pg_value, pg_time = await _timed(
+                lambda: execute_sql_and_get_number(sql, params, trusted=True), args.iterations,
+            )
+            duck_value, duck_time = await _timed(
+                lambda: store.execute(sql, params, store.version), args.iterations,
+            )
+            totals["postgres"].setdefault(kind, []).append(pg_time)
+            short = " ".join(sql.split())[:70]
+            if duck_value is None:
+                fallbacks += 1
+                print(f"{kind:<10}{pg_time * 1000:9.2f}ms{'fallback':>11}{'':>9}  {short}")
+                continue
+            totals["duckdb"].setdefault(kind, []).append(duck_time)
+            mark = ""
+            if not _same(pg_value, duck_value):
+                mismatches += 1
+                mark = f"  MISMATCH {pg_value} != {duck_value}"
+            print(f"{kind:<10}{pg_time * 1000:9.2f}ms{duck_time * 1000:9.2f}ms{pg_time / duck_time:8.1f}x  {short}{mark}")
+    finally:
+        await engine.dispose()
+
+    print()
+    for kind in totals["postgres"]:
+        pg, duck = totals["postgres"][kind], totals["duckdb"].get(kind, [])
+        print(f"{kind:<10} postgres median {statistics.median(pg) * 1000:7.2f}ms", end="")
+        print(f", duckdb median {statistics.median(duck) * 1000:7.2f}ms" if duck else "")
+    print(f"fallbacks to Postgres: {fallbacks}, mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--path", default="/tmp/bench_columnar.duckdb", help="куда построить копию")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
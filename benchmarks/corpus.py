@@ -0,0 +1,109 @@
+"""
+Корпус типовых вопросов с эталонным SQL (в том виде, в котором его генерирует LLM по промпту).
+Используется бенчмарками и заглушкой LLM.
+"""
+
+CREATOR_ID = "0d775b4e3388419c8f60f46a37858312"
+
+CORPUS: list[tuple[str, str]] = [
+    (
+        "Сколько всего видео есть в системе?",
+        "SELECT COUNT(*) AS result FROM videos;",
+    ),
+    (
+        "сколько видео всего",
+        "SELECT COUNT(*) AS result FROM videos;",
+    ),
+    (
+        f"Сколько видео у креатора с id {CREATOR_ID} вышло с 1 ноября 2025 по 5 ноября 2025 включительно?",
+        "SELECT COUNT(*) AS result FROM videos "
+        f"WHERE creator_id = '{CREATOR_ID}' "
+        "AND video_created_at::date BETWEEN '2025-11-01'::date AND '2025-11-05'::date;",
+    ),
+    (
+        f"Сколько видео у креатора с id {CREATOR_ID} вышло с 1 по 30 ноября 2025?",
+        "SELECT COUNT(*) AS result FROM videos "
+        f"WHERE creator_id = '{CREATOR_ID}' "
+        "AND video_created_at::date BETWEEN '2025-11-01'::date AND '2025-11-30'::date;",
+    ),
+    (
+        "Сколько видео набрало больше 100000 просмотров за всё время?",
+        "SELECT COUNT(*) AS result FROM videos WHERE views_count > 100000;",
+    ),
+    (
+        "Сколько видео набрало больше 10 000 просмотров?",
+        "SELECT COUNT(*) AS result FROM videos WHERE views_count > 10000;",
+    ),
+    (
+        "На сколько просмотров в сумме выросли все видео 28 ноября 2025?",
+        "SELECT COALESCE(SUM(delta_views_count), 0) AS result FROM video_snapshots "
+        "WHERE created_at::date = '2025-11-28'::date;",
+    ),
+    (
+        "На сколько просмотров выросли все видео 26.11.2025?",
+        "SELECT COALESCE(SUM(delta_views_count), 0) AS result FROM video_snapshots "
+        "WHERE created_at::date = '2025-11-26'::date;",
+    ),
+    (
+        "Сколько разных видео получали новые просмотры 27 ноября 2025?",
+        "SELECT COUNT(DISTINCT video_id) AS result FROM video_snapshots "
+        "WHERE created_at::date = '2025-11-27'::date AND delta_views_count > 0;",
+    ),
+    (
+        "Сколько уникальных видео получили новые просмотры 29 ноября 2025",
+        "SELECT COUNT(DISTINCT video_id) AS result FROM video_snapshots "
+        "WHERE created_at::date = '2025-11-29'::date AND delta_views_count > 0;",
+    ),
+    # вопросы вне шаблонов — только через LLM
+    (
+        "Какое среднее количество лайков у видео?",
+        "SELECT AVG(likes_count) AS result FROM videos;",
+    ),
+    (
+        "Сколько всего жалоб получили видео за всё время?",
+        "SELECT COALESCE(SUM(reports_count), 0) AS result FROM videos;",
+    ),
+    (
+        "Сколько креаторов опубликовали хотя бы одно видео в ноябре 2025?",
+        "SELECT COUNT(DISTINCT creator_id) AS result FROM videos "
+        "WHERE video_created_at::date BETWEEN '2025-11-01'::date AND '2025-11-30'::date;",
+    ),
+    (
+        "На сколько выросло число комментариев 28 ноября 2025?",
+        "SELECT COALESCE(SUM(delta_comments_count), 0) AS result FROM video_snapshots "
+        "WHERE created_at::date = '2025-11-28'::date;",
+    ),
+]
+
+
+def reference_sql() -> dict[str, str]:
+    """
+    Эталонный SQL по нормализованному вопросу — для детерминированной заглушки LLM.
+    """
+    from app.question_normalizer import normalize_question
+
+    return {normalize_question(question): sql for question, sql in CORPUS}
+
+
+def corpus_llm_client(latency: float):
+    """
+    Детерминированная заглушка LLM: ждёт latency секунд и отвечает эталонным SQL из корпуса.
+    """
+    from app.llm.fake_client import DEFAULT_FAKE_SQL, FakeLLMClient
+    from app.question_normalizer import normalize_question
+
+    answers = reference_sql()
+
+    class CorpusLLMClient(FakeLLMClient):
+        def _sql_for(self, question: str) -> str:
+            return answers.get(normalize_question(question), DEFAULT_FAKE_SQL)
+
+        def generate_sql(self, question: str) -> str:
+            super().generate_sql(question)
+            return self._sql_for(question)
+
+        async def agenerate_sql(self, question: str) -> str:
+            await super().agenerate_sql(question)
+            return self._sql_for(question)
+
+    return CorpusLLMClient(latency=latency)
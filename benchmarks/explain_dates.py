@@ -0,0 +1,89 @@
+"""
+Проверка через EXPLAIN, что переписанные фильтры по датам используют индексы.
+
+Для каждого запроса строится план исходного SQL (column::date = ...) и переписанного
+(rewrite_sql) с enable_seqscan = off. Предикат sargable, если в плане есть индексный узел
+с Index Cond, т.е. поиск по диапазону, а не полный проход индекса с Filter. Скрипт завершается
+с ошибкой, если переписанный запрос не использует индекс.
+
+Запуск:
+    python -m benchmarks.explain_dates
+"""
+import asyncio
+import json
+
+from sqlalchemy import text
+
+CREATOR_ID = "0d775b4e3388419c8f60f46a37858312"
+
+QUERIES = [
+    "SELECT COUNT(*) AS result FROM videos "
+    "WHERE video_created_at::date BETWEEN '2025-11-01'::date AND '2025-11-05'::date;",
+    f"SELECT COUNT(*) AS result FROM videos WHERE creator_id = '{CREATOR_ID}' "
+    "AND video_created_at::date BETWEEN '2025-11-01'::date AND '2025-11-05'::date;",
+    "SELECT COUNT(DISTINCT video_id) AS result FROM video_snapshots "
+    "WHERE created_at::date = '2025-11-28'::date AND delta_likes_count > 0;",
+    "SELECT COALESCE(SUM(s.delta_views_count), 0) AS result FROM video_snapshots s "
+    f"JOIN videos v ON v.id = s.video_id WHERE v.creator_id = '{CREATOR_ID}' "
+    "AND s.created_at::date = '2025-11-28'::date;",
+    "SELECT COALESCE(SUM(delta_views_count), 0) AS result FROM video_snapshots "
+    "WHERE created_at::date = '2025-11-28'::date;",
+]
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def _nodes(plan: dict) -> list[dict]:
+    nodes = [plan]
+    for child in plan.get("Plans", ()):
+        nodes.extend(_nodes(child))
+    return nodes
+
+
+async def explain(conn, sql: str) -> list[dict]:
+    result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql.rstrip().rstrip(';')}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return _nodes(plan[0]["Plan"])
+
+
+def _describe(nodes: list[dict]) -> str:
+    return ", ".join(
+        f"{n['Node Type']}({n.get('Index Name') or n.get('Relation Name')}"
+        f"{': ' + n['Index Cond'] if 'Index Cond' in n else ''})"
+        for n in nodes
+        if "Relation Name" in n or "Index Name" in n
+    )
+
+
+def _index_range_scan(nodes: list[dict]) -> bool:
+    return any(n["Node Type"] in INDEX_NODES and "Index Cond" in n for n in nodes)
+
+
+async def run() -> None:
+    from app.core.db import engine
+    from app.sql_rewrite import rewrite_sql
+
+    failed = 0
+    async with engine.connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+        for sql in QUERIES:
+            rewritten = rewrite_sql(sql)
+            before = await explain(conn, sql)
+            after = await explain(conn, rewritten)
+            seq_after = any(n["Node Type"] == "Seq Scan" for n in after)
+            ok = _index_range_scan(after) and not seq_after
+            failed += not ok
+
+            print("OK  " if ok else "FAIL", sql)
+            print("     before:", _describe(before))
+            print("     after: ", _describe(after))
+            print("     sql:   ", rewritten)
+
+    if failed:
+        raise SystemExit(f"{failed} queries do not use indexes")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,122 @@
+"""
+Локальная заглушка OpenAI-совместимого сервера (/v1/chat/completions) для проверки
+маршрутизатора LLM без сети. У каждой модели своя задержка, доля медленных ответов,
+доля ошибок 500 и доля невалидного SQL; SQL берётся из корпуса benchmarks/corpus.py.
+prefill — секунды на 1000 некэшированных токенов промпта: общее начало системного сообщения
+с уже виденными считается закэшированным (как prefix caching у провайдеров); cache=0 выключает
+кэш. Токены оцениваются как символы / 3.
+
+Запуск:
+    python -m benchmarks.fake_openai_server --port 8000 \\
+        --model small,latency=0.3,slow=0.1:3,error=0.05,invalid=0.1 \\
+        --model large,latency=1.0,prefill=0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from benchmarks.corpus import reference_sql
+
+INVALID_SQL = "DELETE FROM videos;"
+DEFAULT_SQL = "SELECT COUNT(*) AS result FROM videos;"
+
+
+@dataclass
+class FakeModel:
+    name: str
+    latency: float = 0.5
+    slow_rate: float = 0.0
+    slow_latency: float = 0.0
+    error_rate: float = 0.0
+    invalid_rate: float = 0.0
+    prefill: float = 0.0
+    prefix_cache: bool = True
+
+    @classmethod
+    def parse(cls, spec: str) -> "FakeModel":
+        """
+        name,latency=0.3,slow=0.1:3,error=0.05,invalid=0.1,prefill=0.2,cache=0
+        """
+        name, *options = spec.split(",")
+        model = cls(name=name)
+        for option in options:
+            key, _, value = option.partition("=")
+            if key == "latency":
+                model.latency = float(value)
+            elif key == "slow":
+                rate, _, latency = value.partition(":")
+                model.slow_rate, model.slow_latency = float(rate), float(latency)
+            elif key == "error":
+                model.error_rate = float(value)
+            elif key == "invalid":
+                model.invalid_rate = float(value)
+            elif key == "prefill":
+                model.prefill = float(value)
+            elif key == "cache":
+                model.prefix_cache = value not in ("0", "false")
+            else:
+                raise ValueError(f"Unknown model option {key!r}")
+        return model
+
+
+def create_app(models: list[FakeModel], seed: int = 42) -> web.Application:
+    from app.question_normalizer import normalize_question
+
+    by_name = {model.name: model for model in models}
+    answers = reference_sql()
+    rnd = random.Random(seed)
+    # уже виденные системные сообщения по моделям — «кэш префиксов»
+    seen_prefixes: dict[str, set[str]] = {model.name: set() for model in models}
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        model = by_name.get(body.get("model"))
+        if model is None:
+            return web.json_response({"error": {"message": "unknown model"}}, status=404)
+
+        messages = body["messages"]
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 3
+        system = messages[0]["content"] if messages[0]["role"] == "system" else ""
+        seen_systems = seen_prefixes[model.name]
+        cached_tokens = max((len(os.path.commonprefix([system, seen])) for seen in seen_systems), default=0) // 3
+        if model.prefix_cache:
+            seen_systems.add(system)
+
+        slow = rnd.random() < model.slow_rate
+        prefill = (prompt_tokens - cached_tokens) / 1000 * model.prefill
+        await asyncio.sleep((model.slow_latency if slow else model.latency) + prefill)
+        if rnd.random() < model.error_rate:
+            return web.json_response({"error": {"message": "internal error"}}, status=500)
+
+        question = messages[-1]["content"]
+        sql = INVALID_SQL if rnd.random() < model.invalid_rate else answers.get(normalize_question(question), DEFAULT_SQL)
+        return web.json_response({
+            "model": model.name,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"```sql\n{sql}\n```"}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(sql) // 3,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", action="append", required=True, help="name,latency=..,slow=rate:sec,error=..,invalid=..,prefill=..,cache=0|1")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    web.run_app(create_app([FakeModel.parse(spec) for spec in args.model], args.seed), port=args.port)
+
+
+if __name__ == "__main__":
+    main()
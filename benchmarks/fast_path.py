@@ -0,0 +1,78 @@
+"""
+Сравнение латентности шаблонного fast path и пути через LLM на корпусе вопросов.
+
+LLM эмулируется заглушкой с задержкой --llm-latency (по умолчанию типичные для Mistral 1.5 с).
+С флагом --db оба пути дополнительно выполняют SQL в базе из настроек.
+
+Запуск:
+    python -m benchmarks.fast_path --llm-latency 1.5 [--db]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ["LLM_PROVIDER"] = "fake"
+
+from benchmarks.corpus import CORPUS  # noqa: E402
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:8.3f} ms"
+
+
+async def run(llm_latency: float, iterations: int, with_db: bool) -> None:
+    from app.fast_path import match_template
+    from app.llm.fake_client import FakeLLMClient
+    from app.sql_executor import run_sql_and_get_number
+
+    fast_times: list[float] = []
+    llm_times: list[float] = []
+    matched = 0
+
+    for question, reference_sql in CORPUS:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            template = match_template(question)
+        parse_time = (time.perf_counter() - started) / iterations
+
+        llm = FakeLLMClient(latency=llm_latency, sql=reference_sql)
+        started = time.perf_counter()
+        sql = await llm.agenerate_sql(question)
+        if with_db:
+            await run_sql_and_get_number(sql)
+        llm_time = time.perf_counter() - started
+        llm_times.append(llm_time)
+
+        if template is None:
+            print(f"LLM   {_ms(llm_time)}  {question}")
+            continue
+
+        matched += 1
+        fast_time = parse_time
+        if with_db:
+            started = time.perf_counter()
+            await run_sql_and_get_number(template.sql, template.params)
+            fast_time += time.perf_counter() - started
+        fast_times.append(fast_time)
+        print(f"FAST  {_ms(fast_time)}  (llm {_ms(llm_time)})  {template.intent}: {question}")
+
+    print()
+    print(f"fast path coverage: {matched}/{len(CORPUS)}")
+    if fast_times:
+        print(f"fast path median:   {_ms(statistics.median(fast_times))}, max {_ms(max(fast_times))}")
+    print(f"llm path median:    {_ms(statistics.median(llm_times))}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-latency", type=float, default=1.5)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--db", action="store_true", help="выполнять SQL в БД")
+    args = parser.parse_args()
+    asyncio.run(run(args.llm_latency, args.iterations, args.db))
+
+
+if __name__ == "__main__":
+    main()
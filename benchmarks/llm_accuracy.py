@@ -0,0 +1,110 @@
+"""
+Латентность и точность генерации SQL разными LLM на корпусе вопросов (benchmarks/corpus.py).
+
+Каждый --provider (как в LLM_ROUTES: mistral[:model], openai[:model], local[:path.gguf])
+по очереди отвечает на все вопросы корпуса, вопросы идут последовательно — меряется
+латентность одного запроса, а не пропускная способность; tok in/out — средние токены
+промпта и ответа по данным провайдера. Точность:
+- exact — канонические формы SQL (app/sql_validator.py) совпадают с эталонной;
+- exec (с --db) — SQL выполняется в базе из настроек и даёт то же число, что эталонный.
+
+LLM_PROMPT_MODE=full и selective (по умолчанию) сравнивают полный промпт и промпт с подсказками под вопрос.
+
+Запуск:
+    python -m benchmarks.llm_accuracy --provider local:/models/qwen2.5-coder-1.5b-q4_k_m.gguf --provider mistral --db
+    LLM_PROMPT_MODE=full python -m benchmarks.llm_accuracy --provider mistral --db
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.corpus import CORPUS
+from benchmarks.pipeline import percentile
+
+
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return abs(float(a) - float(b)) < 1e-6
+
+
+async def evaluate(spec: str, with_db: bool, verbose: bool) -> None:
+    from app.core.db import execute_sql_and_get_number
+    from app.core.metrics import LLM_TOKENS
+    from app.llm.factory import create_llm_client
+    from app.sql_validator import canonical_sql
+
+    started = time.perf_counter()
+    client = create_llm_client(spec)
+    load_time = time.perf_counter() - started
+
+    latencies: list[float] = []
+    invalid = exact = executed_ok = 0
+    prompt_before, completion_before = LLM_TOKENS.total(kind="prompt"), LLM_TOKENS.total(kind="completion")
+    try:
+        for question, reference in CORPUS:
+            started = time.perf_counter()
+            try:
+                sql = await client.agenerate_sql(question)
+            except Exception as e:
+                invalid += 1
+                if verbose:
+                    print(f"  INVALID  {question}: {e!r}")
+                continue
+            latencies.append(time.perf_counter() - started)
+
+            if canonical_sql(sql) == canonical_sql(reference):
+                exact += 1
+                executed_ok += 1
+                continue
+            if with_db:
+                try:
+                    same = _same(
+                        await execute_sql_and_get_number(sql),
+                        await execute_sql_and_get_number(reference, trusted=True),
+                    )
+                except Exception as e:
+                    same = False
+                    if verbose:
+                        print(f"  DB ERROR {question}: {e!r}")
+                if same:
+                    executed_ok += 1
+                    continue
+            if verbose:
+                print(f"  WRONG    {question}\n           {canonical_sql(sql)}")
+    finally:
+        await client.aclose()
+
+    total = len(CORPUS)
+    prompt_tokens = (LLM_TOKENS.total(kind="prompt") - prompt_before) / total
+    completion_tokens = (LLM_TOKENS.total(kind="completion") - completion_before) / total
+    row = f"{spec:<40}{load_time:>7.1f}s{invalid:>9}{exact / total:>8.0%}"
+    row += f"{executed_ok / total:>8.0%}" if with_db else f"{'-':>8}"
+    if latencies:
+        row += "".join(f"{percentile(latencies, p) * 1000:8.0f}ms" for p in (50, 95))
+    row += f"{prompt_tokens:>9.0f}{completion_tokens:>7.0f}"
+    print(row)
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.core.db import engine
+
+    print(f"questions: {len(CORPUS)}")
+    print(f"{'provider':<40}{'load':>8}{'invalid':>9}{'exact':>8}{'exec':>8}{'p50':>10}{'p95':>10}{'tok in':>9}{'out':>7}")
+    try:
+        for spec in args.provider:
+            await evaluate(spec, args.db, args.verbose)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--provider", action="append", required=True, help="provider[:model], как в LLM_ROUTES")
+    parser.add_argument("--db", action="store_true", help="сверять результат выполнения SQL в БД")
+    parser.add_argument("--verbose", action="store_true", help="печатать неверные ответы")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
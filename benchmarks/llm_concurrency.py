@@ -0,0 +1,67 @@
+"""
+Нагрузочный тест LLM-слоя с локальной заглушкой вместо Mistral.
+
+N одновременных вопросов должны обрабатываться примерно за одну задержку LLM
+(пока N <= LLM_MAX_CONCURRENCY), а не за N задержек, как при синхронном вызове.
+
+Запуск:
+    python -m benchmarks.llm_concurrency --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# бенчмарк не ходит ни в БД, ни в Telegram, ни в Mistral
+os.environ["LLM_PROVIDER"] = "fake"
+for _name, _value in {
+    "DB_USER": "bench", "DB_PASSWORD": "bench", "DB_HOST": "localhost",
+    "DB_PORT": "5432", "DB_NAME": "bench",
+    "MISTRAL_API_KEY": "bench", "TELEGRAM_BOT_TOKEN": "bench",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+
+async def run(requests: int, latency: float) -> None:
+    os.environ["FAKE_LLM_LATENCY_SECONDS"] = str(latency)
+    from app.core.config import settings
+    from app.llm.factory import get_llm_client
+    from app.nlp_sql import natural_language_to_sql
+
+    questions = [f"Сколько всего видео есть в системе? #{i}" for i in range(requests)]
+
+    # старый путь: синхронный вызов прямо в event loop
+    llm = get_llm_client()
+    started = time.perf_counter()
+
+    async def blocking(question: str) -> str:
+        return llm.generate_sql(question)
+
+    await asyncio.gather(*(blocking(q) for q in questions))
+    blocking_elapsed = time.perf_counter() - started
+
+    # новый путь: natural_language_to_sql с async-клиентом
+    started = time.perf_counter()
+    await asyncio.gather(*(natural_language_to_sql(q) for q in questions))
+    async_elapsed = time.perf_counter() - started
+
+    limit = settings.llm.llm_max_concurrency
+    expected = latency * -(-requests // limit)
+    print(f"requests={requests} latency={latency:.2f}s max_concurrency={limit}")
+    print(f"blocking generate_sql:    {blocking_elapsed:.2f}s")
+    print(f"natural_language_to_sql:  {async_elapsed:.2f}s (expected ~{expected:.2f}s)")
+
+    if async_elapsed > expected + latency:
+        raise SystemExit("async LLM path is serialized")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
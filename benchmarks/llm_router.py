@@ -0,0 +1,107 @@
+"""
+Бенчмарк маршрутизатора LLM на локальной заглушке OpenAI-совместимого сервера.
+
+Поднимает benchmarks/fake_openai_server.py с двумя моделями:
+- small — быстрая, но с медленным хвостом, ошибками 500 и невалидным SQL;
+- large — медленнее, зато стабильная;
+и прогоняет корпус вопросов через три конфигурации: только small, small -> large (fallback)
+и small -> large с hedging. Печатает p50/p95/p99, долю неудач и число hedge-запросов.
+
+Запуск:
+    python -m benchmarks.llm_router --requests 300 --concurrency 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+# бенчмарк не ходит ни в БД, ни в Telegram, ни в Mistral
+for _name, _value in {
+    "DB_USER": "bench", "DB_PASSWORD": "bench", "DB_HOST": "localhost",
+    "DB_PORT": "5432", "DB_NAME": "bench", "TELEGRAM_BOT_TOKEN": "bench",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+from aiohttp import web
+
+from benchmarks.corpus import CORPUS
+from benchmarks.fake_openai_server import FakeModel, create_app
+from benchmarks.pipeline import percentile
+
+
+async def replay(client, requests: int, concurrency: int) -> tuple[list[float], int]:
+    questions = [CORPUS[i % len(CORPUS)][0] for i in range(requests)]
+    latencies: list[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ask(question: str) -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await client.agenerate_sql(question)
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(ask(q) for q in questions))
+    return latencies, failures
+
+
+async def run(args: argparse.Namespace) -> None:
+    # ошибки маршрутов ожидаемы и видны в итоговой таблице
+    logging.disable(logging.WARNING)
+    from app.llm.openai_compat_client import OpenAICompatLLMClient
+    from app.llm.router import HEDGED, RouterLLMClient
+
+    models = [FakeModel.parse(args.small), FakeModel.parse(args.large)]
+    runner = web.AppRunner(create_app(models, args.seed_value))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    base_url = f"http://127.0.0.1:{port}/v1"
+
+    def client(model: FakeModel) -> OpenAICompatLLMClient:
+        return OpenAICompatLLMClient(model=model.name, base_url=base_url, api_key="")
+
+    small, large = models
+    configs = {
+        "small only": RouterLLMClient([(small.name, client(small))], hedge=False),
+        "fallback": RouterLLMClient([(small.name, client(small)), (large.name, client(large))], hedge=False),
+        "fallback+hedge": RouterLLMClient([(small.name, client(small)), (large.name, client(large))], hedge=True),
+    }
+
+    print(f"small: {args.small}\nlarge: {args.large}")
+    print(f"requests: {args.requests}, concurrency: {args.concurrency}\n")
+    print(f"{'config':<16}{'ok':>6}{'failed':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'hedged':>8}")
+    try:
+        for name, router in configs.items():
+            hedged_before = HEDGED.total()
+            latencies, failures = await replay(router, args.requests, args.concurrency)
+            hedged = HEDGED.total() - hedged_before
+            cells = "".join(f"{percentile(latencies, p) * 1000:8.0f}ms" for p in (50, 95, 99)) if latencies else ""
+            print(f"{name:<16}{len(latencies):>6}{failures:>8}{cells}{hedged:>8.0f}")
+            states = ", ".join(f"{route.name}={route.breaker.state}" for route in router.routes)
+            print(f"{'':<16}breakers: {states}")
+    finally:
+        for router in configs.values():
+            await router.aclose()
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--small", default="small,latency=0.2,slow=0.1:2,error=0.03,invalid=0.05")
+    parser.add_argument("--large", default="large,latency=0.6")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed-value", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
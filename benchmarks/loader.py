@@ -0,0 +1,104 @@
+"""
+Бенчмарк загрузчика на синтетических данных: потоковый COPY-загрузчик против
+прежнего подхода (json.loads всего файла + executemany INSERT в одной транзакции).
+
+ВНИМАНИЕ: очищает таблицы videos и video_snapshots в базе из настроек.
+
+Запуск:
+    python -m benchmarks.loader --videos 2000 --days 7
+"""
+import argparse
+import asyncio
+import json
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from benchmarks.synthetic import write_dataset
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _truncate() -> None:
+    from app.core.db import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE video_daily_stats, video_snapshots, videos"))
+
+
+async def legacy_load(path: str) -> int:
+    """
+    Прежний загрузчик: весь файл в память, executemany INSERT ... ON CONFLICT DO NOTHING.
+    """
+    from app.core.db import async_session_maker
+    from app.ingest.reader import SNAPSHOT_COLUMNS, VIDEO_COLUMNS, snapshot_record, video_record
+
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    videos = data.get("videos", data)
+    video_rows = [dict(zip(VIDEO_COLUMNS, video_record(v))) for v in videos]
+    snapshot_rows = [
+        dict(zip(SNAPSHOT_COLUMNS, snapshot_record(v["id"], s)))
+        for v in videos for s in v["snapshots"]
+    ]
+
+    def insert(table: str, columns: tuple, key: str) -> str:
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + c for c in columns)}) ON CONFLICT ({key}) DO NOTHING"
+        )
+
+    async with async_session_maker() as session:
+        async with session.begin():
+            await session.execute(text(insert("videos", VIDEO_COLUMNS, "id")), video_rows)
+            await session.execute(text(insert("video_snapshots", SNAPSHOT_COLUMNS, "id, created_at")), snapshot_rows)
+    return len(video_rows) + len(snapshot_rows)
+
+
+async def run(videos: int, creators: int, days: int, skip_legacy: bool) -> None:
+    from app.loader import load_json
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "videos.json")
+        write_dataset(path, videos, creators, days)
+        size_mb = Path(path).stat().st_size / 2**20
+        print(f"dataset: {videos} videos x {days * 24} snapshots, {size_mb:.1f} MB")
+
+        await _truncate()
+        rss_before = _max_rss_mb()
+        stats = await load_json(path)
+        print(
+            f"streaming COPY: {stats.rows} rows in {stats.seconds:.2f}s "
+            f"({stats.rows_per_sec:,.0f} rows/sec), max RSS +{_max_rss_mb() - rss_before:.0f} MB"
+        )
+
+        if skip_legacy:
+            return
+        await _truncate()
+        rss_before = _max_rss_mb()
+        started = time.perf_counter()
+        rows = await legacy_load(path)
+        elapsed = time.perf_counter() - started
+        print(
+            f"legacy executemany: {rows} rows in {elapsed:.2f}s "
+            f"({rows / elapsed:,.0f} rows/sec), max RSS +{_max_rss_mb() - rss_before:.0f} MB"
+        )
+        print(f"speedup: x{elapsed / stats.seconds:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--creators", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.videos, args.creators, args.days, args.skip_legacy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Форматы входа загрузчика на синтетических данных: JSON, JSON Lines, JSON Lines в gzip/zstd,
+чтение через mmap и колоночная выгрузка *.duckdb (app/ingest/export.py).
+
+Для каждого формата печатает размер файла и скорость разбора в строки (без БД), затем загружает
+исходный JSON и колоночную выгрузку в пустые таблицы и сравнивает время загрузки и содержимое таблиц.
+Скрипт завершается с ошибкой, если содержимое разошлось.
+
+ВНИМАНИЕ: очищает таблицы videos и video_snapshots в базе из настроек.
+
+Запуск:
+    python -m benchmarks.loader_formats --videos 2000 --days 7
+"""
+import argparse
+import asyncio
+import gzip
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.loader import _truncate
+from benchmarks.synthetic import write_dataset, write_json_lines
+
+# контрольная сумма содержимого таблиц: одинаковые строки — одинаковый результат
+CHECKSUM_SQL = """
+    SELECT (SELECT md5(string_agg(t::text, ',' ORDER BY id)) FROM videos t),
+           (SELECT md5(string_agg(t::text, ',' ORDER BY id)) FROM video_snapshots t),
+           (SELECT md5(string_agg(t::text, ',' ORDER BY day, video_id)) FROM video_daily_stats t)
+"""
+
+
+def _parse(path: str, use_mmap: bool = False) -> tuple[int, float]:
+    from app.ingest.reader import iter_batches, iter_videos
+
+    started = time.perf_counter()
+    rows = sum(len(v) + len(s) for v, s in iter_batches(iter_videos(path, use_mmap=use_mmap), 20000))
+    return rows, time.perf_counter() - started
+
+
+async def _load(path: str) -> tuple[float, tuple]:
+    from app.core.db import connect_raw
+    from app.loader import load_json
+
+    await _truncate()
+    stats = await load_json(path)
+    conn = await connect_raw()
+    try:
+        checksum = tuple(await conn.fetchrow(CHECKSUM_SQL))
+    finally:
+        await conn.close()
+    return stats.seconds, checksum
+
+
+async def run(args: argparse.Namespace) -> int:
+    from app.ingest.export import export_dump
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            "json": str(Path(tmp) / "videos.json"),
+            "jsonl": str(Path(tmp) / "videos.jsonl"),
+            "jsonl.gz": str(Path(tmp) / "videos.jsonl.gz"),
+        }
+        write_dataset(files["json"], args.videos, args.creators, args.days)
+        write_json_lines(files["jsonl"], args.videos, args.creators, args.days)
+        with open(files["jsonl"], "rb") as src, gzip.open(files["jsonl.gz"], "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        try:
+            import zstandard
+        except ImportError:
+            print("zstandard is not installed, skipping .zst")
+        else:
+            files["jsonl.zst"] = str(Path(tmp) / "videos.jsonl.zst")
+            with open(files["jsonl"], "rb") as src, open(files["jsonl.zst"], "wb") as dst:
+                zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+
+        export = str(Path(tmp) / "videos.duckdb")
+        started = time.perf_counter()
+        export_dump(files["jsonl"], export, 20000)
+        export_seconds = time.perf_counter() - started
+
+        print(f"{'format':<14}{'size':>10}{'parse':>10}{'rows/sec':>12}")
+        for name, path in files.items():
+            rows, seconds = _parse(path)
+            print(f"{name:<14}{Path(path).stat().st_size / 2**20:8.1f}MB{seconds:9.2f}s{rows / seconds:12,.0f}")
+        for name in ("json", "jsonl"):
+            rows, seconds = _parse(files[name], use_mmap=True)
+            print(f"{name + ' mmap':<14}{'':>10}{seconds:9.2f}s{rows / seconds:12,.0f}")
+        print(f"{'duckdb':<14}{Path(export).stat().st_size / 2**20:8.1f}MB   export {export_seconds:.2f}s")
+
+        json_seconds, json_checksum = await _load(files["json"])
+        export_load_seconds, export_checksum = await _load(export)
+
+    same = json_checksum == export_checksum
+    print(f"load json: {json_seconds:.2f}s, load duckdb export: {export_load_seconds:.2f}s "
+          f"(x{json_seconds / export_load_seconds:.2f}), same tables: {same}")
+    return 0 if same else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--creators", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Параллельная загрузка JSON Lines (LOADER_WORKERS) на синтетических данных.
+
+Генерирует выгрузку в формате JSON Lines, измеряет скорость разбора в одном процессе
+(с кэшем parse_dt и без) и затем для каждого числа процессов из --workers загружает её в пустые
+таблицы, печатая rows/sec и ускорение относительно одного процесса. Выигрыш ограничен числом
+ядер машины (печатается) и тем, сколько ядер получает сам Postgres.
+
+ВНИМАНИЕ: очищает таблицы videos и video_snapshots в базе из настроек.
+
+Запуск:
+    python -m benchmarks.loader_parallel --videos 2000 --days 7 --workers 1,2,4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.loader import _truncate
+from benchmarks.synthetic import write_json_lines
+
+
+def _parse_rate(path: str) -> float:
+    from app.ingest.reader import iter_batches, iter_videos
+
+    started = time.perf_counter()
+    rows = sum(len(v) + len(s) for v, s in iter_batches(iter_videos(path), 20000))
+    return rows / (time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.core.config import settings
+    from app.ingest import reader
+    from app.loader import load_json
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "videos.jsonl")
+        write_json_lines(path, args.videos, args.creators, args.days)
+        size_mb = Path(path).stat().st_size / 2**20
+        print(f"dataset: {args.videos} videos x {args.days * 24} snapshots, {size_mb:.1f} MB, cpu cores: {os.cpu_count()}")
+
+        cached = _parse_rate(path)
+        parse_dt = reader.parse_dt
+        reader.parse_dt = parse_dt.__wrapped__
+        try:
+            uncached = _parse_rate(path)
+        finally:
+            reader.parse_dt = parse_dt
+        print(f"parse only, 1 process: {cached:,.0f} rows/sec (without parse_dt cache {uncached:,.0f})")
+
+        baseline = None
+        for workers in args.workers:
+            settings.loader.loader_workers = workers
+            await _truncate()
+            stats = await load_json(path)
+            baseline = baseline or stats.rows_per_sec
+            print(
+                f"workers {workers:>2}: {stats.rows} rows in {stats.seconds:.2f}s "
+                f"({stats.rows_per_sec:,.0f} rows/sec, x{stats.rows_per_sec / baseline:.2f})"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--creators", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--workers", type=lambda s: [int(w) for w in s.split(",")], default=[1, 2, 4])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Ответы на шаблонные вопросы из массивов в памяти (MEMORY_STORE=true) против SQL в Postgres.
+
+Строит хранилище по базе из настроек, генерирует --queries случайных шаблонных запросов всех пяти
+интентов (креаторы, даты и пороги берутся из данных) и отвечает на каждый обоими способами:
+печатает время построения и дочитывания массивов, их размер, медиану и p99 одного ответа.
+Скрипт завершается с ошибкой, если ответы расходятся.
+
+Запуск:
+    python -m benchmarks.memory_store --queries 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+os.environ["MEMORY_STORE"] = "true"
+
+from benchmarks.pipeline import percentile  # noqa: E402
+
+
+async def _random_templates(count: int, seed: int) -> list:
+    from app.core.db import connect_raw
+    from app.fast_path import (
+        SQL_CREATOR_VIDEOS,
+        SQL_DISTINCT_VIDEOS_WITH_VIEWS,
+        SQL_SUM_DELTA_VIEWS,
+        SQL_TOTAL_VIDEOS,
+        SQL_VIDEOS_OVER_VIEWS,
+        TemplateQuery,
+    )
+    from app.sql_rewrite import day_start
+
+    conn = await connect_raw()
+    try:
+        creators = [row[0] for row in await conn.fetch("SELECT DISTINCT creator_id FROM videos")]
+        first, last = await conn.fetchrow("SELECT min(day), max(day) FROM video_daily_stats")
+        max_views = await conn.fetchval("SELECT max(views_count) FROM videos")
+    finally:
+        await conn.close()
+
+    rnd = random.Random(seed)
+
+    def some_day():
+        # с запасом по краям — дни без данных тоже должны давать 0
+        return first + timedelta(days=rnd.randint(-2, (last - first).days + 2))
+
+    templates = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            templates.append(TemplateQuery("total_videos", SQL_TOTAL_VIDEOS))
+        elif kind == 1:
+            start = some_day()
+            end = start + timedelta(days=rnd.randint(0, 10))
+            creator = rnd.choice(creators) if rnd.random() < 0.9 else "0" * 32
+            templates.append(TemplateQuery("creator_videos_in_range", SQL_CREATOR_VIDEOS, {
+                "creator_id": creator,
+                "created_from": day_start(start),
+                "created_to": day_start(end + timedelta(days=1)),
+            }))
+        elif kind == 2:
+            templates.append(TemplateQuery(
+                "videos_over_views", SQL_VIDEOS_OVER_VIEWS, {"threshold": rnd.randint(0, max_views or 1)},
+            ))
+        elif kind == 3:
+            templates.append(TemplateQuery("sum_delta_views_on_date", SQL_SUM_DELTA_VIEWS, {"day": some_day()}))
+        else:
+            templates.append(TemplateQuery(
+                "distinct_videos_with_views_on_date", SQL_DISTINCT_VIDEOS_WITH_VIEWS, {"day": some_day()},
+            ))
+    return templates
+
+
+async def run(args: argparse.Namespace) -> int:
+    from app.core.db import engine, execute_sql_and_get_number
+    from app.memory_store import get_memory_store
+
+    store = get_memory_store()
+    started = time.perf_counter()
+    await store.refresh()
+    load_seconds = time.perf_counter() - started
+    snapshot = store.snapshot
+    nbytes = sum(
+        getattr(snapshot, name).nbytes
+        for name in ("published", "views", "views_sorted", "days", "day_delta_views", "day_growth_videos")
+    )
+
+    started = time.perf_counter()
+    await store.refresh()
+    refresh_seconds = time.perf_counter() - started
+    mode = "incremental" if snapshot.watermark is not None else "full (no ingested_files watermark)"
+
+    print(f"videos: {len(snapshot.video_ids)}, days: {len(snapshot.days)}, creators: {len(snapshot.creators)}")
+    print(f"load: {load_seconds * 1000:.1f} ms, refresh {mode}: {refresh_seconds * 1000:.1f} ms, "
+          f"numeric arrays: {nbytes / 1024:.0f} KiB")
+
+    templates = await _random_templates(args.queries, args.seed)
+    store_times: list[float] = []
+    db_times: list[float] = []
+    mismatches = 0
+    try:
+        for template in templates:
+            started = time.perf_counter()
+            value = store.answer(template, snapshot.version)
+            store_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            expected = await execute_sql_and_get_number(template.sql, template.params, trusted=True)
+            db_times.append(time.perf_counter() - started)
+
+            if value is None or float(value) != float(expected):
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"  MISMATCH {template.intent} {template.params}: {value} != {expected}")
+    finally:
+        await engine.dispose()
+
+    for name, times in (("memory store", store_times), ("postgres", db_times)):
+        print(f"{name:<14} median {statistics.median(times) * 1e6:9.1f} µs   p99 {percentile(times, 99) * 1e6:9.1f} µs")
+    print(f"queries: {len(templates)}, mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Сквозной бенчмарк пайплайна бота без Telegram и Mistral.
+
+1. (опционально) наполняет базу из настроек синтетическими данными (benchmarks/synthetic.py)
+   через обычный загрузчик;
+2. прогоняет корпус вопросов (benchmarks/corpus.py) через answer_question с заданной
+   конкурентностью; LLM заменена детерминированной заглушкой с задержкой --llm-latency;
+3. печатает p50/p95/p99 латентности, пропускную способность и время по стадиям
+   (шаблон, LLM, переписывание SQL, БД).
+
+По умолчанию кэши вопросов и результатов выключены, чтобы мерить холодный путь;
+--cache включает их (повторы вопросов из корпуса начнут попадать в кэш).
+
+ВНИМАНИЕ: с --seed очищает videos, video_snapshots и video_daily_stats в базе из настроек.
+
+Запуск:
+    python -m benchmarks.pipeline --seed --videos 500 --days 30 --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import contextvars
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.corpus import CORPUS, corpus_llm_client
+from benchmarks.synthetic import write_dataset
+
+# время по стадиям текущего запроса: стадия -> секунды
+_stages: contextvars.ContextVar[dict[str, float]] = contextvars.ContextVar("stages")
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Перцентиль методом ближайшего ранга.
+    """
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:9.2f} ms"
+
+
+def _timed(stage: str, fn: Callable, is_async: bool) -> Callable:
+    """
+    Обёртка, которая добавляет время вызова fn к стадии текущего запроса.
+    """
+
+    def record(started: float) -> None:
+        stages = _stages.get(None)
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - started
+
+    if is_async:
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                record(started)
+        return async_wrapper
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record(started)
+    return wrapper
+
+
+def _instrument(llm_latency: float) -> None:
+    """
+    Подменяет LLM заглушкой и оборачивает стадии пайплайна замером времени.
+    """
+    from app import nlp_sql, pipeline, sql_executor
+
+    llm = corpus_llm_client(llm_latency)
+    nlp_sql.get_llm_client = lambda: llm
+
+    pipeline.match_template = _timed("template", pipeline.match_template, is_async=False)
+    pipeline.natural_language_to_sql = _timed("llm", pipeline.natural_language_to_sql, is_async=True)
+    pipeline.rewrite_sql = _timed("rewrite", pipeline.rewrite_sql, is_async=False)
+    sql_executor.execute_sql_and_get_number = _timed(
+        "db", sql_executor.execute_sql_and_get_number, is_async=True
+    )
+
+
+async def seed(videos: int, creators: int, days: int, seed_value: int) -> None:
+    """
+    Пересоздаёт данные в базе из синтетической выгрузки.
+    """
+    from sqlalchemy import text
+
+    from app.core.db import engine
+    from app.loader import load_json
+
+    async with engine.begin() as conn:
+        await conn.execute(text("TRUNCATE video_daily_stats, video_snapshots, videos"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "videos.json")
+        write_dataset(path, videos, creators, days, seed_value)
+        stats = await load_json(path)
+    print(f"seeded: {stats.videos} videos, {stats.snapshots} snapshots in {stats.seconds:.1f}s")
+
+
+async def replay(requests: int, concurrency: int) -> None:
+    from app.core.db import get_pool_stats
+    from app.pipeline import answer_question
+
+    questions = [CORPUS[i % len(CORPUS)][0] for i in range(requests)]
+    latencies: list[float] = []
+    per_stage: dict[str, list[float]] = defaultdict(list)
+    paths: Counter[str] = Counter()
+    errors: Counter[str] = Counter()
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for question in questions:
+        queue.put_nowait(question)
+
+    async def worker() -> None:
+        while not queue.empty():
+            question = queue.get_nowait()
+            stages: dict[str, float] = {}
+            _stages.set(stages)
+            started = time.perf_counter()
+            try:
+                await answer_question(question)
+            except Exception as e:
+                errors[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            for stage, seconds in stages.items():
+                per_stage[stage].append(seconds)
+            if "llm" in stages:
+                paths["llm"] += 1
+            elif "template" in stages and "db" in stages:
+                paths["template"] += 1
+            else:
+                paths["coalesced/cached"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    print(f"requests: {requests}, concurrency: {concurrency}, wall {wall:.2f}s")
+    print(f"throughput: {len(latencies) / wall:.1f} req/s")
+    print("paths: " + ", ".join(f"{name} {count}" for name, count in sorted(paths.items())))
+    if errors:
+        print("errors: " + ", ".join(f"{name} {count}" for name, count in sorted(errors.items())))
+    if latencies:
+        print(
+            f"latency: p50 {_ms(percentile(latencies, 50))}  p95 {_ms(percentile(latencies, 95))}  "
+            f"p99 {_ms(percentile(latencies, 99))}  max {_ms(max(latencies))}"
+        )
+    print()
+    print(f"{'stage':<10}{'calls':>7}{'mean':>13}{'p50':>13}{'p95':>13}{'total':>11}")
+    for stage in ("template", "llm", "rewrite", "db"):
+        values = per_stage.get(stage)
+        if not values:
+            continue
+        print(
+            f"{stage:<10}{len(values):>7}{_ms(sum(values) / len(values))}"
+            f"{_ms(percentile(values, 50))}{_ms(percentile(values, 95))}{sum(values):>10.2f}s"
+        )
+    print()
+    print(f"pool: {get_pool_stats()}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    if not args.cache:
+        # размер 0 — каждая запись сразу вытесняется; кэш результатов выключен, пока нет версии данных
+        os.environ["QUESTION_CACHE_SIZE"] = "0"
+
+    from app.core.db import engine, warm_up_pool
+    from app.result_cache import start_data_version_listener
+
+    if args.seed:
+        await seed(args.videos, args.creators, args.days, args.seed_value)
+
+    _instrument(args.llm_latency)
+    await warm_up_pool()
+    if args.cache:
+        await start_data_version_listener()
+    try:
+        await replay(args.requests, args.concurrency)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true", help="пересоздать данные в базе")
+    parser.add_argument("--videos", type=int, default=500)
+    parser.add_argument("--creators", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed-value", type=int, default=42)
+    parser.add_argument("--llm-latency", type=float, default=1.5)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--cache", action="store_true", help="включить кэши вопросов и результатов")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
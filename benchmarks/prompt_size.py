@@ -0,0 +1,51 @@
+"""
+Размер промпта по вопросам корпуса: полный SYSTEM_PROMPT против неизменного префикса
+с подсказками под вопрос (app/prompt_builder.py). Ничего не вызывает, только считает.
+
+Токены оцениваются по длине текста (--chars-per-token, для русского текста у BPE-токенизаторов
+около 3); точные значения по провайдеру печатает benchmarks.llm_accuracy.
+
+Запуск:
+    python -m benchmarks.prompt_size
+"""
+import argparse
+import os
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+
+from benchmarks.corpus import CORPUS  # noqa: E402
+
+
+def run(chars_per_token: float) -> None:
+    from app.prompt_builder import select_snippets, system_prompt
+    from app.prompts import PROMPT_PREFIX, SYSTEM_PROMPT
+
+    prefix = len(PROMPT_PREFIX)
+    full_total = selective_total = 0
+    print(f"full system prompt: {len(SYSTEM_PROMPT)} chars, stable prefix: {prefix} chars\n")
+    print(f"{'full':>7}{'select':>8}{'~tok':>7}  snippets / question")
+    for question, _ in CORPUS:
+        full = len(SYSTEM_PROMPT) + len(question)
+        selective = len(system_prompt(question)) + len(question)
+        full_total += full
+        selective_total += selective
+        names = ",".join(snippet.name for snippet in select_snippets(question))
+        print(f"{full:>7}{selective:>8}{selective / chars_per_token:>7.0f}  {names} / {question[:60]}")
+
+    print()
+    print(
+        f"mean prompt: full {full_total / len(CORPUS):.0f} chars, selective {selective_total / len(CORPUS):.0f} chars "
+        f"({1 - selective_total / full_total:.0%} smaller); beyond the stable prefix: "
+        f"{(selective_total / len(CORPUS) - prefix):.0f} chars"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars-per-token", type=float, default=3.0)
+    args = parser.parse_args()
+    run(args.chars_per_token)
+
+
+if __name__ == "__main__":
+    main()
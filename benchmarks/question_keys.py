@@ -0,0 +1,60 @@
+"""
+Проверка ключей кэша по нормализованному вопросу (app/question_normalizer.py): по этому ключу
+кэшируется SQL от LLM и объединяются одновременные одинаковые вопросы, поэтому вопросы с разным
+смыслом не должны получать один ключ, а перефразировки одного вопроса — должны.
+
+Печатает нарушения и долю вопросов корпуса с уникальным ключом; завершается с ошибкой, если
+хоть одна пара нарушена.
+
+Запуск:
+    python -m benchmarks.question_keys
+"""
+import os
+import sys
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+
+from benchmarks.corpus import CORPUS  # noqa: E402
+
+# разный смысл — разные ключи
+DIFFERENT = [
+    ("Сколько видео набрало > 100000 просмотров?", "Сколько видео набрало < 100000 просмотров?"),
+    ("Сколько видео набрало >= 100000 просмотров?", "Сколько видео набрало <= 100000 просмотров?"),
+    ("Сколько видео набрало > 100000 просмотров?", "Сколько видео набрало >= 100000 просмотров?"),
+    ("Сколько видео с лайками = 0?", "Сколько видео с лайками != 0?"),
+    ("Сколько видео вышло 1 и 5 ноября 2025?", "Сколько видео вышло с 1 по 5 ноября 2025?"),
+    ("Сколько видео вышло 28 ноября, больше 1000 просмотров?", "Сколько видео вышло 1000-11-28?"),
+]
+
+# один смысл — один ключ
+SAME = [
+    ("Сколько видео набрало > 100000 просмотров?", "сколько видео набрало больше 100000 просмотров"),
+    ("Сколько видео вышло с 1 по 5 ноября 2025?", "сколько видео вышло с 1 по 5 ноября 2025 года"),
+    ("Сколько видео вышло с 1 ноября по 5 ноября 2025?", "Сколько видео вышло с 2025-11-01 по 2025-11-05?"),
+    ("На сколько выросли просмотры 28 ноября 2025?", "на сколько выросли просмотры 28.11.2025"),
+]
+
+
+def main() -> None:
+    from app.question_normalizer import normalize_question
+
+    failed = 0
+    for first, second in DIFFERENT:
+        key = normalize_question(first)
+        if key == normalize_question(second):
+            failed += 1
+            print(f"merged:   {first!r} / {second!r} -> {key!r}")
+    for first, second in SAME:
+        keys = normalize_question(first), normalize_question(second)
+        if keys[0] != keys[1]:
+            failed += 1
+            print(f"split:    {first!r} -> {keys[0]!r} / {second!r} -> {keys[1]!r}")
+
+    keys = {normalize_question(question) for question, _ in CORPUS}
+    print(f"pairs: {failed} failed of {len(DIFFERENT) + len(SAME)}, "
+          f"corpus: {len(keys)} keys for {len(CORPUS)} questions")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Сравнение проверки SQL по токенам (app/sql_validator.py) со старым чёрным списком подстрок
+на наборе безопасных и опасных запросов: ложные отказы (каждый — лишний запрос к LLM),
+пропущенные опасные запросы и время одной проверки.
+
+Запуск:
+    python -m benchmarks.sql_validation
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+
+from benchmarks.corpus import CORPUS  # noqa: E402
+
+SAFE = [sql for _, sql in CORPUS] + [
+    "SELECT MAX(updated_at) AS result FROM videos;",
+    "SELECT COUNT(*) AS result FROM videos WHERE updated_at::date = '2025-11-28'::date;",
+    "SELECT COUNT(*) AS result FROM video_snapshots WHERE created_at > '2025-11-28' -- delete later\n;",
+    "SELECT EXTRACT(DAY FROM MAX(video_created_at)) AS result FROM videos;",
+    "SELECT CAST(AVG(likes_count) AS numeric(10, 2)) AS result FROM videos;",
+    "WITH daily AS (SELECT video_id, SUM(delta_views_count) AS d FROM video_snapshots GROUP BY video_id) "
+    "SELECT COUNT(*) AS result FROM daily WHERE d > 0;",
+    "SELECT COUNT(*) AS result FROM videos v JOIN video_snapshots s ON s.video_id = v.id "
+    "WHERE s.delta_likes_count > 0;",
+    "SELECT COUNT(*) AS result FROM videos WHERE video_created_at >= now() - INTERVAL '7 days';",
+    "SELECT COUNT(*) AS result FROM (videos v JOIN video_snapshots s ON s.video_id = v.id);",
+    "SELECT COUNT(*) AS result FROM (SELECT id FROM videos WHERE likes_count > 0) t;",
+]
+
+DANGEROUS = [
+    "DELETE FROM videos;",
+    "SELECT COUNT(*) AS result FROM videos; DROP TABLE videos;",
+    "SELECT pg_sleep(30);",
+    "SELECT COUNT(*) AS result FROM pg_catalog.pg_authid;",
+    "SELECT COUNT(*) AS result FROM information_schema.tables;",
+    "SELECT pg_read_file('/etc/passwd');",
+    "SELECT COUNT(*) INTO stolen FROM videos;",
+    "SELECT set_config('statement_timeout', '0', false);",
+    "SELECT COUNT(*) AS result FROM generate_series(1, 1000000000);",
+    "SELECT lo_import('/etc/passwd');",
+    'SELECT "pg_sleep"(10);',
+    'SELECT COUNT(*) AS result FROM videos WHERE "pg_sleep"(5) IS NOT NULL;',
+    """SELECT "set_config"('statement_timeout', '0', false);""",
+    "SELECT COUNT(*) AS result FROM videos WHERE creator_id IN (TABLE pg_user);",
+    "SELECT count(*) FROM (pg_authid CROSS JOIN videos);",
+    "SELECT count(*) FROM videos JOIN (pg_shadow) ON true;",
+    "SELECT count(*) FROM (pg_user);",
+    "SELECT count(*) FROM ((videos CROSS JOIN (pg_roles)));",
+]
+
+
+def legacy_validate(sql: str) -> str:
+    """
+    Прежняя проверка из MistralLLMClient: поиск подстрок.
+    """
+    lowered = sql.lower()
+    if any(word in lowered for word in ("insert", "update", "delete", "drop", "alter", "truncate")):
+        raise ValueError("Generated query contains forbidden keyword")
+    return sql
+
+
+def _accepts(validate, sql: str) -> bool:
+    try:
+        validate(sql)
+    except ValueError:
+        return False
+    return True
+
+
+def run(iterations: int) -> None:
+    from app.sql_validator import validate_sql
+
+    print(f"{'validator':<12}{'false rejects':>15}{'missed':>8}{'per query':>12}")
+    for name, validate in (("substring", legacy_validate), ("tokens", validate_sql)):
+        false_rejects = [sql for sql in SAFE if not _accepts(validate, sql)]
+        missed = [sql for sql in DANGEROUS if _accepts(validate, sql)]
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for sql in SAFE:
+                _accepts(validate, sql)
+        per_query = (time.perf_counter() - started) / (iterations * len(SAFE))
+
+        print(f"{name:<12}{len(false_rejects):>9}/{len(SAFE):<5}{len(missed):>4}/{len(DANGEROUS):<3}"
+              f"{per_query * 1e6:>9.1f} us")
+        for sql in false_rejects:
+            print(f"    false reject: {sql[:90]}")
+        for sql in missed:
+            print(f"    missed:       {sql[:90]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
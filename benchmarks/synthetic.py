@@ -0,0 +1,107 @@
+"""
+Генератор синтетической выгрузки в формате data/videos.json или JSON Lines (по расширению .jsonl).
+
+Запуск:
+    python -m benchmarks.synthetic /tmp/videos.json --videos 1000 --creators 50 --days 10
+"""
+import argparse
+import json
+import random
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+
+START = datetime(2025, 11, 1, tzinfo=timezone.utc)
+
+
+def _hex_id(rnd: random.Random) -> str:
+    return f"{rnd.getrandbits(128):032x}"
+
+
+def _ts(value: datetime) -> str:
+    return value.isoformat()
+
+
+def generate_videos(
+    videos: int,
+    creators: int,
+    days: int,
+    seed: int = 42,
+    start: datetime = START,
+) -> Iterator[dict]:
+    """
+    Отдаёт видео по одному: у каждого ролика почасовые снапшоты за days дней после публикации.
+    """
+    rnd = random.Random(seed)
+    creator_ids = [_hex_id(rnd) for _ in range(creators)]
+
+    for _ in range(videos):
+        published = start + timedelta(hours=rnd.randrange(days * 24))
+        counters = {"views_count": 0, "likes_count": 0, "comments_count": 0, "reports_count": 0}
+        snapshots = []
+        for hour in range(days * 24):
+            deltas = {
+                "views_count": rnd.choice((0, 0, rnd.randrange(1, 500))),
+                "likes_count": rnd.randrange(0, 20),
+                "comments_count": rnd.randrange(0, 3),
+                "reports_count": 1 if rnd.random() < 0.01 else 0,
+            }
+            for name, delta in deltas.items():
+                counters[name] += delta
+            taken = published + timedelta(hours=hour + 1)
+            snapshots.append({
+                "id": _hex_id(rnd),
+                **counters,
+                **{f"delta_{name}": delta for name, delta in deltas.items()},
+                "created_at": _ts(taken),
+                "updated_at": _ts(taken),
+            })
+
+        last = published + timedelta(hours=days * 24)
+        yield {
+            "id": _hex_id(rnd),
+            "creator_id": rnd.choice(creator_ids),
+            "video_created_at": _ts(published),
+            **counters,
+            "created_at": _ts(published),
+            "updated_at": _ts(last),
+            "snapshots": snapshots,
+        }
+
+
+def write_dataset(path: str, videos: int, creators: int, days: int, seed: int = 42) -> None:
+    """
+    Пишет выгрузку {"videos": [...]} потоково, не собирая её в памяти.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"videos": [')
+        for i, video in enumerate(generate_videos(videos, creators, days, seed)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(video))
+        f.write("]}\n")
+
+
+def write_json_lines(path: str, videos: int, creators: int, days: int, seed: int = 42) -> None:
+    """
+    Пишет выгрузку в формате JSON Lines: одна строка — одно видео со своими snapshots.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for video in generate_videos(videos, creators, days, seed):
+            f.write(json.dumps(video))
+            f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--videos", type=int, default=1000)
+    parser.add_argument("--creators", type=int, default=50)
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    write = write_json_lines if args.path.endswith(".jsonl") else write_dataset
+    write(args.path, args.videos, args.creators, args.days, args.seed)
+
+
+if __name__ == "__main__":
+    main()